@@ -1,7 +1,24 @@
 from copy import deepcopy
-from solution import SingleSolution
+from solution import SingleSolution, MoveTable
+from tracing import Trace
+from presolve import presolve as deduce_cells
+from schedule import Schedule, calibrate_temperature
+from observer import Observer
+from rng import chain_generator, acceptance_thresholds
+from exact import finish
+from checkpoint import (
+    checkpoint_path,
+    load_checkpoint,
+    save_checkpoint,
+    remove_checkpoint,
+)
 import numpy as np
-import random
+import math
+import time
+
+# Why a run ended: solved, out of its iteration or time budget, stagnated after its restarts,
+# cooled down to min_temp, or stopped by the stop flag.
+RUN_STATUSES = ("solved", "budget", "stagnated", "cooled", "stopped")
 
 
 class SimulatedAnnealing:
@@ -19,6 +36,21 @@ class SimulatedAnnealing:
         min_temp: float,
         max_temp: float,
         cooling_rate: float = 0.999,
+        trace: Trace = None,
+        max_iterations: int = None,
+        time_limit: float = None,
+        stop_flag=None,
+        presolve: bool = False,
+        schedule: Schedule = None,
+        calibrate: float = None,
+        observer: Observer = None,
+        checkpoint_dir: str = None,
+        checkpoint_every: int = 100_000,
+        seed=None,
+        finish_below: int = None,
+        finish_patience: int = 10_000,
+        restart_patience: int = None,
+        max_restarts: int = 3,
     ) -> None:
         """
         Initializes the SimulatedAnnealing instance with a Sudoku puzzle and parameters for the algorithm.
@@ -28,7 +60,35 @@ class SimulatedAnnealing:
             min_temp (float): The minimum temperature at which the algorithm will stop running.
             max_temp (float): The initial (maximum) temperature at which the algorithm starts.
             cooling_rate (float): The rate at which the temperature decreases after each iteration.
+            trace (Trace): The policy used to record the run history. Defaults to recording every iteration.
+            max_iterations (int): Optional limit on the number of iterations of a run.
+            time_limit (float): Optional limit on the wall-clock duration of a run, in seconds.
+            stop_flag: Optional shared flag (such as a multiprocessing.Value) whose value becomes true
+                       when the run should stop, for example because a competing restart solved the puzzle.
+            presolve (bool): Whether to fill the cells that can be deduced with naked and hidden singles
+                             before annealing. The deduced cells become fixed, so only the rest is annealed.
+            schedule (Schedule): The cooling schedule. Defaults to geometric cooling with cooling_rate.
+            calibrate (float): If given, the starting temperature is calibrated on the puzzle so that an average
+                               worsening move is accepted with this probability, instead of using max_temp.
+            observer (Observer): Optional observer notified of every iteration, for instrumentation and callbacks.
+            checkpoint_dir (str): If given, the state of the chain is saved in this directory every checkpoint_every
+                                  iterations, and a run finding a checkpoint of its process ID resumes from it.
+            checkpoint_every (int): The period of the checkpoints, in iterations.
+            seed: The seed of the batch (an int or a sequence of ints). Together with the process ID given to run(),
+                  it determines every random draw of the run, so a run can be reproduced exactly.
+                  Defaults to fresh entropy.
+            finish_below (int): If given, a run whose best fitness is at most finish_below, but not 0, is completed
+                                by an exact search (see exact.finish) instead of returning an invalid grid.
+                                The run stops annealing as soon as such a best fitness has not improved for
+                                finish_patience iterations.
+            finish_patience (int): The iterations without improvement after which a run near a solution is finished.
+            restart_patience (int): If given, the chain restarts from a new random board at the starting temperature
+                                    when its best fitness since the last restart has not improved for this many
+                                    iterations. The best board of the run is kept across restarts.
+            max_restarts (int): The number of restarts of a run; a run stagnating once more ends as "stagnated".
         """
+        if presolve:
+            table = deduce_cells(table)
         self.table = table  # The current state of the Sudoku puzzle.
         self.original = deepcopy(
             table
@@ -36,10 +96,51 @@ class SimulatedAnnealing:
         self.min_temp = min_temp  # Minimum temperature for the annealing process.
         self.max_temp = max_temp  # Starting (maximum) temperature.
         self.cooling_rate = cooling_rate  # Rate at which the temperature decreases.
+        self.schedule = (
+            schedule  # Cooling schedule; None means inline geometric cooling.
+        )
+        self.calibrate = (
+            calibrate  # Target initial acceptance of the calibration, if any.
+        )
+        self.start_temp = max_temp  # Starting temperature of the last run.
+        self.observer = observer  # Receives the events of each run, if any.
+        self.checkpoint_dir = (
+            checkpoint_dir  # Directory of the chain checkpoints, if any.
+        )
+        self.checkpoint_every = checkpoint_every  # Iterations between checkpoints.
+        self.resumed = False  # Whether the last run resumed from a checkpoint.
+        self.seed = seed  # Seed of the batch; None draws fresh entropy.
+        self.finish_below = (
+            finish_below  # Largest best fitness completed by the exact search, if any.
+        )
+        self.finish_patience = finish_patience  # Stagnation before the exact search.
+        self.finished = False  # Whether the last run was completed by the exact search.
+        self.restart_patience = restart_patience  # Stagnation before a restart, if any.
+        self.max_restarts = max_restarts  # Restarts allowed per run.
+        self.restarts = 0  # Number of restarts of the last run.
+        self.status = None  # Why the last run ended, one of RUN_STATUSES.
+        self.trace = (
+            trace if trace is not None else Trace()
+        )  # Records (iteration, temperature, best fitness) for analysis.
+        self.max_iterations = max_iterations  # Iteration budget of a run, if any.
+        self.time_limit = time_limit  # Wall-clock budget of a run in seconds, if any.
+        self.stop_flag = (
+            stop_flag  # Shared flag polled every few iterations to cancel the run.
+        )
+        self.iterations = 0  # Number of iterations performed by the last run.
+        self.moves = MoveTable(
+            self.original
+        )  # Legal swaps of the puzzle, built once and shared by every state.
         self.actual_state = SingleSolution(
-            table, original=self.original
+            table, original=self.original, moves=self.moves
         )  # The current solution state.
         self.best_state = self.actual_state  # The best solution state found so far.
+        self.size = (
+            self.actual_state.size
+        )  # Number of rows, columns and digits of the grid.
+        self.best_table = [0] * (
+            self.size * self.size
+        )  # Flat buffer holding the best table, overwritten only when the best fitness improves.
         self.next_state = None  # Placeholder for the next state, used in the generation of new states.
 
     def run(self, process_id: int) -> tuple:
@@ -48,45 +149,257 @@ class SimulatedAnnealing:
 
         Args:
             process_id (int): An identifier for the process, useful for debugging or logging.
+                              It selects the random stream of the run among those of the seed.
 
         Returns:
-            tuple: Contains the best solution found, its fitness, and additional data about the run (for analysis purposes).
+            tuple: Contains the best solution found, its fitness, and the Trace of the run (for analysis purposes).
         """
-        self.actual_state.generate_solution()  # Initializes the actual state with a generated solution.
-        temp = self.max_temp
-        best_fitness = self.best_state.fitness()
+        started = time.perf_counter()
+        state = (
+            self.actual_state
+        )  # Mutated in place; moves are only applied once accepted.
+        checkpoint = (
+            checkpoint_path(self.checkpoint_dir, process_id)
+            if self.checkpoint_dir is not None
+            else None
+        )
+        saved = load_checkpoint(checkpoint) if checkpoint is not None else None
+        self.resumed = saved is not None
+        # Moves and acceptance thresholds are drawn in blocks from the generator of the chain.
+        generator = chain_generator(self.seed, process_id)
+        self.moves.use_generator(generator)
+        thresholds = []
+        if saved is None:
+            # Initializes the actual state with a generated solution.
+            state.generate_solution(generator)
+            temp = self.max_temp
+            if self.calibrate is not None and state.has_moves():
+                temp = calibrate_temperature(state, self.calibrate) or temp
+            self.start_temp = temp
+            best_fitness = state.energy
+            state.snapshot(self.best_table)
+
+            schedule = self.schedule
+            if schedule is not None:
+                schedule.reset(temp, self.min_temp)
+
+            additional_info_data = (
+                self.trace
+            )  # To store data for analysis, like temperature and fitness over iterations.
+            additional_info_data.reset(self.expected_iterations(temp))
+            iterations = 0
+            elapsed = 0.0  # Seconds spent by the previous runs of a resumed chain.
+            chain_best = best_fitness  # Best fitness since the last restart.
+            last_improvement = 0  # Iteration of the last improvement of chain_best.
+            restarts = 0
+        else:
+            if saved["original"] != self.original:
+                raise ValueError(f"Checkpoint {checkpoint} belongs to another puzzle.")
+            for row, saved_row in zip(state.table, saved["table"]):
+                row[:] = saved_row
+            state.recount()
+            self.best_table[:] = saved["best_table"]
+            best_fitness = saved["best_fitness"]
+            temp = saved["temp"]
+            self.start_temp = saved["start_temp"]
+            schedule = saved["schedule"]
+            additional_info_data = self.trace = saved["trace"]
+            iterations = saved["iterations"]
+            elapsed = saved["elapsed"]
+            generator.bit_generator.state = saved["rng"]
+            self.moves.block = saved["moves"]
+            thresholds = saved["thresholds"]
+            chain_best = saved["chain_best"]
+            last_improvement = saved["last_improvement"]
+            restarts = saved["restarts"]
+
+        max_iterations = (
+            self.max_iterations if self.max_iterations is not None else math.inf
+        )
+        deadline = (
+            started + self.time_limit - elapsed if self.time_limit is not None else None
+        )
+        next_checkpoint = (
+            iterations + self.checkpoint_every if checkpoint is not None else -1
+        )
 
-        additional_info_data = (
-            []
-        )  # To store data for analysis, like temperature and fitness over iterations.
+        stop_flag = self.stop_flag
+        observer = self.observer
+        finish_below = self.finish_below if self.finish_below is not None else -1
+        finish_patience = self.finish_patience
+        restart_patience = (
+            self.restart_patience if self.restart_patience is not None else math.inf
+        )
+        status = None
+        if observer is not None:
+            observer.start(temp, best_fitness)
 
-        iterations = 0
-        while temp > self.min_temp:
+        next_threshold = (
+            0  # Index in thresholds of the threshold of the next iteration.
+        )
+        last_temp = temp
+        # A board without any legal swap (for example fully deduced by the presolve) is final as generated.
+        if not state.has_moves():
+            max_iterations = 0
+        while temp > self.min_temp and iterations < max_iterations:
+            # The stop flag and the stagnation are polled every 16 iterations; reading the clock is slower,
+            # so the time budget is only checked every 1024 iterations.
+            if iterations & 15 == 0:
+                if stop_flag is not None and stop_flag.value:
+                    status = "stopped"
+                    break
+                if (
+                    deadline is not None
+                    and iterations & 1023 == 0
+                    and time.perf_counter() > deadline
+                ):
+                    status = "budget"
+                    break
+                stalled = iterations - last_improvement
+                if stalled >= finish_patience and best_fitness <= finish_below:
+                    status = "stagnated"  # Unless the exact search completes the run.
+                    break
+                if stalled >= restart_patience:
+                    if restarts == self.max_restarts:
+                        status = "stagnated"
+                        break
+                    # A fresh board at the starting temperature; the best board of the run is kept.
+                    restarts += 1
+                    state.generate_solution(generator)
+                    chain_best = state.energy
+                    last_improvement = iterations
+                    temp = self.start_temp
+                    if schedule is not None:
+                        schedule.reset(temp, self.min_temp)
             iterations += 1
-            new_state = self.generate_nxt_state(self.actual_state)
+            last_temp = temp
 
-            actual_energy = self.actual_state.fitness()
-            new_energy = new_state.fitness()
+            actual_energy = state.energy
+            if observer is None:
+                new_energy = actual_energy + state.propose_move()
+            else:
+                new_energy = actual_energy + observer.propose(state)
 
-            if random.random() < self.accept_prob(actual_energy, new_energy, temp):
-                self.actual_state = new_state
-                if new_energy < best_fitness:
-                    best_fitness = new_energy
-                    self.best_state = new_state
+            if next_threshold == len(thresholds):
+                thresholds = acceptance_thresholds(generator)
+                next_threshold = 0
+            # Same test as random() < accept_prob(actual_energy, new_energy, temp), see acceptance_thresholds().
+            improved = False
+            accepted = new_energy - actual_energy < temp * thresholds[next_threshold]
+            next_threshold += 1
+            if accepted:
+                state.apply_move()
+                if new_energy < chain_best:
+                    chain_best = new_energy
+                    last_improvement = iterations
+                    if new_energy < best_fitness:
+                        best_fitness = new_energy
+                        state.snapshot(self.best_table)
+                        improved = True
 
-            additional_info_data.append((iterations, temp, best_fitness))
+            additional_info_data.record(iterations, temp, best_fitness, improved)
+            if observer is not None:
+                observer.iteration(
+                    iterations, temp, new_energy - actual_energy, accepted, best_fitness
+                )
 
             if best_fitness == 0:
                 print(f"Optimal solution found at iteration {iterations}.")
                 break
 
-            temp *= self.cooling_rate
+            if schedule is None:
+                temp *= self.cooling_rate
+            else:
+                temp = schedule.update(temp, accepted, improved)
+
+            if iterations == next_checkpoint:
+                save_checkpoint(
+                    checkpoint,
+                    {
+                        "original": self.original,
+                        "table": state.table,
+                        "best_table": self.best_table,
+                        "best_fitness": best_fitness,
+                        "temp": temp,
+                        "start_temp": self.start_temp,
+                        "schedule": schedule,
+                        "trace": additional_info_data,
+                        "iterations": iterations,
+                        "elapsed": elapsed + time.perf_counter() - started,
+                        "rng": generator.bit_generator.state,
+                        "moves": self.moves.block[self.moves.position :],
+                        "thresholds": thresholds[next_threshold:],
+                        "chain_best": chain_best,
+                        "last_improvement": last_improvement,
+                        "restarts": restarts,
+                    },
+                )
+                next_checkpoint += self.checkpoint_every
+
+        self.finished = False
+        if 0 < best_fitness <= finish_below:
+            # The conflicts left are resolved by an exact search around the consistent cells of the best state.
+            best_table = [
+                self.best_table[start : start + self.size]
+                for start in range(0, self.size * self.size, self.size)
+            ]
+            solution = finish(self.original, best_table)
+            if solution is not None:
+                self.best_table[:] = [value for row in solution for value in row]
+                best_fitness = 0
+                self.finished = True
+                print(f"Solution completed by exact search at iteration {iterations}.")
+
+        if best_fitness == 0:
+            status = "solved"
+        elif status is None:
+            status = (
+                "budget"
+                if self.max_iterations is not None and iterations >= self.max_iterations
+                else "cooled"
+            )
+        self.status = status
+        self.restarts = restarts
+
+        additional_info_data.finish(iterations, last_temp, best_fitness)
+        if observer is not None:
+            observer.finish(iterations, best_fitness)
+        # The chain is over, so a later run of this process ID starts afresh.
+        if checkpoint is not None:
+            remove_checkpoint(checkpoint)
+        self.iterations = iterations
 
+        best_table = [
+            self.best_table[start : start + self.size]
+            for start in range(0, self.size * self.size, self.size)
+        ]
+        self.best_state = SingleSolution(best_table, self.original, self.moves)
         return self.best_state.table, best_fitness, additional_info_data
 
+    def expected_iterations(self, start_temp: float = None) -> int:
+        """
+        Calculates the number of iterations the cooling schedule takes to go from the starting temperature down to min_temp.
+
+        Args:
+            start_temp (float): The starting temperature. Defaults to max_temp.
+
+        Returns:
+            int: The number of iterations of a run that does not stop early.
+        """
+        if start_temp is None:
+            start_temp = self.max_temp
+        schedule = (
+            self.schedule if self.schedule is not None else Schedule(self.cooling_rate)
+        )
+        iterations = schedule.expected_iterations(start_temp, self.min_temp)
+        if self.max_iterations is not None:
+            iterations = min(iterations, self.max_iterations)
+        return iterations
+
     def generate_nxt_state(self, actual_state: SingleSolution) -> SingleSolution:
         """
-        Generates a new state by mutating the current solution.
+        Generates a new state by mutating a copy of the current solution.
+        run() does not use it, since it mutates a single state in place through propose_move()/apply_move().
 
         Args:
             actual_state (SingleSolution): The current solution state.
@@ -94,7 +407,7 @@ class SimulatedAnnealing:
         Returns:
             SingleSolution: A new solution state after mutation.
         """
-        new_state = SingleSolution(actual_state.table, self.original)
+        new_state = actual_state.copy()
         new_state.mutate()
         return new_state
 
@@ -0,0 +1,345 @@
+from SA import RUN_STATUSES
+from solution import TABLE_SIZE
+import json
+import mmap
+import os
+import struct
+import numpy as np
+
+# Layout of a run archive file, every section starting on a multiple of 8 bytes:
+#   header     32 bytes: magic, format version, table size, padding, run count, trace length, metadata length
+#   index      count records of INDEX_DTYPE, sorted by process ID
+#   solutions  count * table_size**2 bytes, one byte per cell in row-major order, in the order of the index
+#   traces     the iterations (int64), temperatures (float64) and best fitness values (int32) of every trace,
+#              concatenated column by column; the trace of a run is its slice trace_start:trace_start + trace_length
+#   metadata   UTF-8 JSON object describing the batch
+ARCHIVE_MAGIC = b"SDKA"
+ARCHIVE_VERSION = 1
+ARCHIVE_EXTENSION = ".sda"
+HEADER_FORMAT = "<4sBB2xQQQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)  # 32
+INDEX_DTYPE = np.dtype(
+    [
+        ("process_id", "<i8"),
+        ("trace_start", "<i8"),
+        ("trace_length", "<i8"),
+        ("iterations", "<i8"),
+        ("elapsed", "<f8"),
+        ("fitness", "<i4"),
+        ("status", "u1"),
+        ("padding", "u1", 3),
+    ]
+)
+TRACE_COLUMNS = (("iterations", "<i8"), ("temps", "<f8"), ("best", "<i4"))
+# Status codes of the index: None for runs without a status, such as those that raised an error.
+STATUS_CODES = (None, "error", *RUN_STATUSES)
+
+
+def aligned(size: int) -> int:
+    """
+    Rounds a section size up to a multiple of 8 bytes, so that every section can be viewed as a typed array.
+    """
+    return (size + 7) & ~7
+
+
+class RunArchive:
+    """
+    This class gives read-only, memory-mapped access to a run archive, which holds the results of a whole batch
+    in a single file: the best board of every puzzle, its fitness, iterations, solve time and status, its trace
+    as typed arrays, and the metadata of the batch. Opening an archive only parses its header and metadata;
+    a solution or a trace is a view over the mapped file, read from disk when it is accessed.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Opens and maps a run archive.
+
+        Args:
+            path (str): Path of the archive file.
+        """
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            header = self.file.read(HEADER_SIZE)
+            if len(header) != HEADER_SIZE:
+                raise ValueError(f"{path} is too short to be a run archive.")
+            magic, version, table_size, count, trace_length, metadata_length = (
+                struct.unpack(HEADER_FORMAT, header)
+            )
+            if magic != ARCHIVE_MAGIC:
+                raise ValueError(f"{path} is not a run archive.")
+            if version != ARCHIVE_VERSION:
+                raise ValueError(
+                    f"Unsupported run archive version {version} in {path}."
+                )
+
+            self.table_size = table_size
+            self.count = count
+            cells = table_size * table_size
+            # Start of the index, the solutions, each trace column and the metadata.
+            sizes = [count * INDEX_DTYPE.itemsize, count * cells]
+            sizes += [
+                trace_length * np.dtype(dtype).itemsize for _, dtype in TRACE_COLUMNS
+            ]
+            starts = [HEADER_SIZE]
+            for size in sizes:
+                starts.append(starts[-1] + aligned(size))
+            if os.fstat(self.file.fileno()).st_size < starts[-1] + metadata_length:
+                raise ValueError(f"{path} is truncated.")
+
+            self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.index = np.frombuffer(self.mmap, INDEX_DTYPE, count, starts[0])
+            self.solutions = np.frombuffer(
+                self.mmap, np.uint8, count * cells, starts[1]
+            ).reshape(count, table_size, table_size)
+            self.traces = {
+                name: np.frombuffer(self.mmap, dtype, trace_length, start)
+                for (name, dtype), start in zip(TRACE_COLUMNS, starts[2:])
+            }
+            self.metadata = json.loads(
+                self.mmap[starts[-1] : starts[-1] + metadata_length].decode()
+            )
+        except Exception:
+            self.file.close()
+            raise
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def process_ids(self) -> np.ndarray:
+        """
+        The process IDs of the runs, in increasing order.
+        """
+        return self.index["process_id"]
+
+    def position(self, process_id: int) -> int:
+        """
+        Returns the position of a run in the index.
+
+        Raises:
+            KeyError: If the archive has no run with this process ID.
+        """
+        position = int(np.searchsorted(self.index["process_id"], process_id))
+        if position == self.count or self.index[position]["process_id"] != process_id:
+            raise KeyError(f"No run with process ID {process_id} in {self.path}.")
+        return position
+
+    def __contains__(self, process_id: int) -> bool:
+        try:
+            self.position(process_id)
+        except KeyError:
+            return False
+        return True
+
+    def solution(self, process_id: int) -> list[list[int]]:
+        """
+        Returns the best board of a run as a list of lists of integers.
+        """
+        return self.solutions[self.position(process_id)].tolist()
+
+    def result(self, process_id: int) -> dict:
+        """
+        Returns the fitness, iterations, solve time in seconds and status of a run.
+        """
+        record = self.index[self.position(process_id)]
+        return {
+            "fitness": int(record["fitness"]),
+            "iterations": int(record["iterations"]),
+            "elapsed": float(record["elapsed"]),
+            "status": STATUS_CODES[record["status"]],
+        }
+
+    def trace(self, process_id: int) -> tuple:
+        """
+        Returns the trace of a run as three arrays viewing the mapped file, with the recorded iterations,
+        temperatures and best fitness values, in chronological order. They are empty if the run was not traced.
+        """
+        record = self.index[self.position(process_id)]
+        start = record["trace_start"]
+        end = start + record["trace_length"]
+        return tuple(self.traces[name][start:end] for name, _ in TRACE_COLUMNS)
+
+    def close(self) -> None:
+        """
+        Closes the archive. The file stays mapped while arrays returned by the archive are alive.
+        """
+        self.index = self.solutions = self.traces = None
+        if self.mmap is not None:
+            try:
+                self.mmap.close()
+            except BufferError:
+                pass  # Views are still exported; the mapping is released with the last of them.
+            self.mmap = None
+        self.file.close()
+
+    def __enter__(self) -> "RunArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class RunArchiveWriter:
+    """
+    This class writes a run archive as the results of a batch come in, in any order. Traces are spooled to one
+    temporary file per column, and the index and solutions are kept in memory (about 130 bytes per 9x9 run).
+    close() sorts the runs by process ID and writes the archive, through a temporary file replacing the previous one.
+    When a process ID is added twice, the last run wins.
+    """
+
+    def __init__(
+        self, path: str, table_size: int = None, metadata: dict = None
+    ) -> None:
+        """
+        Args:
+            path (str): Path of the archive file to create.
+            table_size (int): The size of each side of the grids; None takes the size of the first solution added.
+            metadata (dict): JSON-serializable description of the batch, such as its parameters and timings.
+                             It can be updated until the archive is closed.
+        """
+        self.path = path
+        self.table_size = table_size
+        self.metadata = dict(metadata or {})
+        self.records = []  # Index records, in the order of add().
+        self.solutions = (
+            []
+        )  # Flat solutions as bytes, or None for runs without one, in the same order.
+        self.trace_length = 0
+        self.spool_paths = [f"{path}.{name}.tmp" for name, _ in TRACE_COLUMNS]
+        self.spools = [open(spool_path, "wb") for spool_path in self.spool_paths]
+
+    def add(
+        self,
+        process_id: int,
+        solution,
+        fitness: int,
+        iterations: int,
+        elapsed: float,
+        status: str = None,
+        trace=None,
+    ) -> None:
+        """
+        Adds the result of one run.
+
+        Args:
+            process_id (int): The process ID of the puzzle.
+            solution: The best board, of shape (size, size), or None if the run produced none.
+            fitness (int): Its fitness; ignored without a solution.
+            iterations (int): The number of iterations of the run.
+            elapsed (float): The solve time in seconds.
+            status (str): One of STATUS_CODES.
+            trace: The iterations, temperatures and best fitness values recorded by the run (for example
+                   Trace.as_arrays()), or None.
+
+        Raises:
+            ValueError: If the solution does not have the size of the grids of the archive.
+        """
+        if solution is None:
+            self.solutions.append(None)
+            fitness = -1
+        else:
+            solution = np.asarray(solution, dtype=np.uint8)
+            if self.table_size is None:
+                self.table_size = len(solution)
+            if solution.shape != (self.table_size, self.table_size):
+                raise ValueError(
+                    f"Solution of shape {solution.shape} in an archive of {self.table_size}x{self.table_size} grids."
+                )
+            self.solutions.append(solution.tobytes())
+        length = 0
+        if trace is not None:
+            length = len(trace[0])
+            for spool, column, (_, dtype) in zip(self.spools, trace, TRACE_COLUMNS):
+                spool.write(np.asarray(column, dtype=dtype).tobytes())
+        self.records.append(
+            (
+                process_id,
+                self.trace_length,
+                length,
+                iterations or 0,
+                elapsed or 0.0,
+                fitness if fitness is not None else -1,
+                STATUS_CODES.index(status),
+                (0, 0, 0),
+            )
+        )
+        self.trace_length += length
+
+    def extend(self, archive: RunArchive) -> None:
+        """
+        Adds every run of an existing archive, for example the runs of an interrupted batch being resumed.
+        """
+        for position, record in enumerate(archive.index):
+            solution = archive.solutions[position] if record["fitness"] >= 0 else None
+            start = record["trace_start"]
+            end = start + record["trace_length"]
+            self.add(
+                int(record["process_id"]),
+                solution,
+                int(record["fitness"]),
+                int(record["iterations"]),
+                float(record["elapsed"]),
+                STATUS_CODES[record["status"]],
+                tuple(archive.traces[name][start:end] for name, _ in TRACE_COLUMNS),
+            )
+
+    def close(self) -> None:
+        """
+        Writes the archive and removes the spooled traces.
+        """
+        if not self.spools:
+            return
+        for spool in self.spools:
+            spool.close()
+        self.spools = []
+
+        table_size = self.table_size or TABLE_SIZE
+        empty = bytes(table_size * table_size)
+        index = np.array(self.records, dtype=INDEX_DTYPE)
+        # The last run of each process ID, sorted by process ID.
+        order = np.lexsort((-np.arange(len(index)), index["process_id"]))
+        keep = np.ones(len(order), dtype=bool)
+        keep[1:] = index["process_id"][order][1:] != index["process_id"][order][:-1]
+        order = order[keep]
+        index = index[order]
+        solutions = b"".join(self.solutions[position] or empty for position in order)
+        metadata = json.dumps(self.metadata).encode()
+
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "wb") as file:
+            file.write(
+                struct.pack(
+                    HEADER_FORMAT,
+                    ARCHIVE_MAGIC,
+                    ARCHIVE_VERSION,
+                    table_size,
+                    len(index),
+                    self.trace_length,
+                    len(metadata),
+                )
+            )
+            write_section(file, index.tobytes())
+            write_section(file, solutions)
+            for spool_path in self.spool_paths:
+                with open(spool_path, "rb") as spool:
+                    while block := spool.read(1 << 24):
+                        file.write(block)
+                write_section(file, b"")
+                os.remove(spool_path)
+            file.write(metadata)
+        os.replace(temporary_path, self.path)
+
+    def __enter__(self) -> "RunArchiveWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_section(file, data: bytes) -> None:
+    """
+    Writes a section of an archive, followed by the padding to the next multiple of 8 bytes.
+    """
+    file.write(data)
+    file.write(bytes(aligned(file.tell()) - file.tell()))
@@ -0,0 +1,308 @@
+from solution import TABLE_SIZE, box_size_for
+from functools import lru_cache
+import numpy as np
+import math
+import time
+
+
+@lru_cache(maxsize=None)
+def box_cells(size: int) -> np.ndarray:
+    """
+    Returns the flat (row-major) cell indices of every box of a size x size grid:
+    box_cells(size)[k] lists the cells of box k.
+    """
+    box_size = box_size_for(size)
+    return np.array(
+        [
+            [
+                (box_row + i) * size + box_col + j
+                for i in range(box_size)
+                for j in range(box_size)
+            ]
+            for box_row in range(0, size, box_size)
+            for box_col in range(0, size, box_size)
+        ]
+    )
+
+
+BOX_CELLS = box_cells(TABLE_SIZE)  # The boxes of the standard 9x9 grid.
+
+
+def grid_size(shape: tuple) -> int:
+    """
+    Returns the side of the grids of a batch of puzzles from the shape of its array.
+    A 3-D array holds P grids of N x N cells, and a 2-D array P flat grids of N * N cells,
+    so a single grid is passed as (1, N, N) or (1, N * N).
+
+    Args:
+        shape (tuple): The shape of the puzzles: (P, N, N) or (P, N * N).
+
+    Raises:
+        ValueError: If the shape does not describe N x N grids with square boxes.
+    """
+    if len(shape) == 3 and shape[1] == shape[2]:
+        size = shape[-1]
+    elif len(shape) == 2:
+        size = math.isqrt(shape[-1])
+        if size * size != shape[-1]:
+            raise ValueError(f"Flat puzzles of {shape[-1]} cells are not square grids.")
+    else:
+        raise ValueError(
+            f"Puzzles of shape {shape} are neither (P, N, N) nor (P, N * N) grids."
+        )
+    box_size_for(size)
+    return size
+
+
+class BatchSimulatedAnnealing:
+    """
+    This class runs many Simulated Annealing chains in lockstep on a (B, N, N) array of boards (9x9 or any other square-box size).
+    Chains can be different puzzles, several independent restarts of the same puzzle, or both.
+    Every step proposes one in-box swap per chain, computes all energy deltas from per-row and per-column
+    digit counts, and takes the Metropolis accept/reject decisions with array operations.
+    Chains that reach fitness 0 are masked out and no longer advanced.
+    """
+
+    def __init__(
+        self,
+        tables,
+        min_temp: float,
+        max_temp: float,
+        cooling_rate: float = 0.999,
+        restarts: int = 1,
+        seed: int = None,
+        max_iterations: int = None,
+        time_limit: float = None,
+    ) -> None:
+        """
+        Initializes the batch with the puzzles to solve and the parameters of the shared cooling schedule.
+
+        Args:
+            tables: The puzzles, as a list of N x N lists of integers, an array of shape (P, N, N),
+                    or flat puzzles of shape (P, N * N). Every puzzle of a batch has the same size.
+            min_temp (float): The minimum temperature at which the chains stop running.
+            max_temp (float): The initial (maximum) temperature at which the chains start.
+            cooling_rate (float): The rate at which the temperature decreases after each step.
+            restarts (int): The number of independent chains started for each puzzle.
+            seed: Seed for the random generator, for reproducible runs: an int, or a np.random.Generator used as is.
+            max_iterations (int): Optional limit on the number of steps of a run.
+            time_limit (float): Optional limit on the wall-clock duration of a run, in seconds.
+        """
+        puzzles = np.asarray(tables, dtype=np.uint8)
+        # Number of rows, columns and digits of the grids.
+        self.size = grid_size(puzzles.shape)
+        puzzles = puzzles.reshape(-1, self.size, self.size)
+        self.boxes = box_cells(self.size)  # Flat cell indices of every box of the grid.
+        self.digits = np.arange(self.size + 1, dtype=np.uint8)
+        self.min_temp = min_temp
+        self.max_temp = max_temp
+        self.cooling_rate = cooling_rate
+        self.restarts = restarts
+        self.rng = np.random.default_rng(seed)
+        self.max_iterations = max_iterations  # Step budget of a run, if any.
+        self.time_limit = time_limit  # Wall-clock budget of a run in seconds, if any.
+        self.status = (
+            None  # Why the last run stopped the unsolved chains: "cooled" or "budget".
+        )
+
+        self.num_puzzles = len(puzzles)
+        self.puzzle_index = np.repeat(
+            np.arange(self.num_puzzles), restarts
+        )  # The puzzle solved by each chain.
+        # Clues of each chain, shape (B, N, N).
+        self.original = puzzles[self.puzzle_index]
+        self.boards = self.original.copy()  # Current board of each chain.
+        self.best_boards = self.original.copy()  # Best board found by each chain.
+
+        num_chains = len(self.boards)
+        self.energy = np.zeros(num_chains, dtype=np.int64)
+        self.best_energy = np.zeros(num_chains, dtype=np.int64)
+        self.iterations = np.zeros(
+            num_chains, dtype=np.int64
+        )  # Steps taken by each chain before it stopped.
+        self.active = np.ones(num_chains, dtype=bool)
+        # row_counts[b, r, d] and col_counts[b, c, d] count the occurrences of digit d
+        # in row r and column c of chain b; they are built by recount().
+        self.row_counts = None
+        self.col_counts = None
+
+        self._build_move_tables()
+
+    def _build_move_tables(self) -> None:
+        """
+        Lists, for every chain, the mutable cells of each box and the boxes with at least two of them.
+        """
+        mutable = (self.original.reshape(-1, self.size * self.size) == 0)[:, self.boxes]
+        # Stable sort puts the mutable cells of each box first, in their original order.
+        order = np.argsort(~mutable, axis=2, kind="stable")
+        self.box_cells = np.take_along_axis(
+            np.broadcast_to(self.boxes, mutable.shape), order, axis=2
+        )
+        self.box_sizes = mutable.sum(axis=2)
+
+        eligible = self.box_sizes >= 2
+        self.eligible_boxes = np.argsort(~eligible, axis=1, kind="stable")
+        self.num_eligible = eligible.sum(axis=1)
+
+    def generate_solutions(self) -> None:
+        """
+        Fills the empty cells of every box of every chain with a random permutation of the missing digits,
+        then rebuilds the count tables and energies.
+        """
+        flat = self.boards.reshape(-1, self.size * self.size)
+        flat[:] = self.original.reshape(flat.shape)
+        for cells in self.boxes:
+            values = flat[:, cells]
+            present = (values[:, :, None] == self.digits[1:]).any(axis=1)
+
+            # Missing digits get random keys below 1, so sorting puts them first in random order.
+            keys = self.rng.random(present.shape)
+            keys[present] = 2.0
+            missing = np.argsort(keys, axis=1).astype(np.uint8) + 1
+
+            empty = values == 0
+            rank = np.cumsum(empty, axis=1) - 1
+            fill = np.take_along_axis(missing, np.maximum(rank, 0), axis=1)
+            flat[:, cells] = np.where(empty, fill, values)
+
+        self.recount()
+        self.best_boards[:] = self.boards
+        self.best_energy[:] = self.energy
+
+    def recount(self) -> None:
+        """
+        Rebuilds the per-row and per-column digit counts and the energy of every chain from the boards.
+        """
+        one_hot = self.boards[..., None] == self.digits
+        self.row_counts = one_hot.sum(axis=2, dtype=np.int16)
+        self.col_counts = one_hot.sum(axis=1, dtype=np.int16)
+        self.energy = 2 * self.size * self.size - (
+            (self.row_counts > 0).sum(axis=(1, 2))
+            + (self.col_counts > 0).sum(axis=(1, 2))
+        )
+
+    def run(self) -> tuple:
+        """
+        Executes the batch annealing until every chain is solved, the temperature reaches min_temp,
+        or a budget is exhausted.
+
+        Returns:
+            tuple: The best board of each chain (B, N, N), their fitness (B,), and the number of steps each chain ran (B,).
+        """
+        self.generate_solutions()
+        # Chains without any legal move, or already solved, never need to be advanced.
+        self.active = (self.num_eligible > 0) & (self.best_energy > 0)
+
+        max_iterations = (
+            self.max_iterations if self.max_iterations is not None else math.inf
+        )
+        deadline = (
+            time.perf_counter() + self.time_limit
+            if self.time_limit is not None
+            else None
+        )
+        self.status = "cooled"
+        temp = self.max_temp
+        steps = 0
+        while temp > self.min_temp and self.active.any():
+            if steps >= max_iterations or (
+                deadline is not None and time.perf_counter() > deadline
+            ):
+                self.status = "budget"
+                break
+            self.step(temp)
+            temp *= self.cooling_rate
+            steps += 1
+
+        return self.best_boards, self.best_energy, self.iterations
+
+    def step(self, temp: float) -> None:
+        """
+        Proposes one swap for every active chain and applies those accepted by the Metropolis criterion.
+
+        Args:
+            temp (float): The current temperature.
+        """
+        chains = np.flatnonzero(self.active)
+        self.iterations[chains] += 1
+        uniforms = self.rng.random((4, len(chains)))
+
+        # Draw a box with at least two mutable cells, then two distinct mutable cells within it.
+        box = self.eligible_boxes[
+            chains, (uniforms[0] * self.num_eligible[chains]).astype(np.intp)
+        ]
+        size = self.box_sizes[chains, box]
+        first = (uniforms[1] * size).astype(np.intp)
+        second = (uniforms[2] * (size - 1)).astype(np.intp)
+        second += second >= first
+        cell1 = self.box_cells[chains, box, first]
+        cell2 = self.box_cells[chains, box, second]
+        row1, col1 = np.divmod(cell1, self.size)
+        row2, col2 = np.divmod(cell2, self.size)
+
+        flat = self.boards.reshape(-1, self.size * self.size)
+        value1 = flat[chains, cell1]
+        value2 = flat[chains, cell2]
+
+        delta = self._line_delta(self.row_counts, chains, row1, row2, value1, value2)
+        delta += self._line_delta(self.col_counts, chains, col1, col2, value1, value2)
+        delta *= value1 != value2
+
+        # Worse moves are accepted with probability exp(-delta / temp); better or equal ones always are.
+        with np.errstate(over="ignore"):
+            accept = uniforms[3] < np.exp(-np.maximum(delta, 0) / temp)
+        accept |= delta <= 0
+        if not accept.any():
+            return
+
+        chains, delta = chains[accept], delta[accept]
+        row1, col1, row2, col2 = row1[accept], col1[accept], row2[accept], col2[accept]
+        cell1, cell2 = cell1[accept], cell2[accept]
+        value1, value2 = value1[accept], value2[accept]
+
+        # Each chain appears once per statement, so fancy-index updates never collide.
+        # When both cells share a line, the four updates cancel out as they should.
+        for counts, line1, line2 in (
+            (self.row_counts, row1, row2),
+            (self.col_counts, col1, col2),
+        ):
+            counts[chains, line1, value1] -= 1
+            counts[chains, line1, value2] += 1
+            counts[chains, line2, value2] -= 1
+            counts[chains, line2, value1] += 1
+        flat[chains, cell1] = value2
+        flat[chains, cell2] = value1
+        self.energy[chains] += delta
+
+        improved = chains[self.energy[chains] < self.best_energy[chains]]
+        self.best_energy[improved] = self.energy[improved]
+        self.best_boards[improved] = self.boards[improved]
+        self.active[improved[self.best_energy[improved] == 0]] = False
+
+    @staticmethod
+    def _line_delta(counts, chains, line1, line2, value1, value2):
+        """
+        Calculates the fitness change of swapping value1 and value2 between two rows (or two columns).
+
+        Returns:
+            np.ndarray: The change for each chain; zero where both cells lie on the same line.
+        """
+        delta = (
+            (counts[chains, line1, value1] == 1).astype(np.int64)
+            - (counts[chains, line1, value2] == 0)
+            + (counts[chains, line2, value2] == 1)
+            - (counts[chains, line2, value1] == 0)
+        )
+        delta *= line1 != line2
+        return delta
+
+    def best_per_puzzle(self) -> tuple:
+        """
+        Selects, for every puzzle, the best board found across all of its restarts.
+
+        Returns:
+            tuple: The best boards (P, N, N), their fitness (P,), and the index of the chain that found each one (P,).
+        """
+        energy = self.best_energy.reshape(self.num_puzzles, self.restarts)
+        chain = np.arange(self.num_puzzles) * self.restarts + energy.argmin(axis=1)
+        return self.best_boards[chain], self.best_energy[chain], chain
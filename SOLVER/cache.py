@@ -0,0 +1,193 @@
+from canonical import canonicalize, format_table, parse_puzzle
+from solution import box_size_for
+from collections import OrderedDict
+import os
+import sqlite3
+
+
+class LRU:
+    """
+    A dictionary of bounded size that forgets the least recently used entries first.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class SolutionCache:
+    """
+    This class remembers the solutions of the puzzles already solved, so that repeated puzzles, and puzzles
+    equivalent to them by a symmetry (see canonical.canonicalize), are not annealed again.
+
+    Solutions are stored under the canonical form of their puzzle, transformed like it, in a SQLite database
+    shared by every process, with the most recent ones also kept in memory. A puzzle seen before by the process
+    is found under its own string without computing its canonical form; a hit costs a few microseconds.
+    Otherwise the canonical form costs about half a millisecond, and a hit maps the stored solution back through
+    the inverse of the transform. Only complete solutions are stored, and every solution returned is checked
+    against the puzzle.
+    """
+
+    def __init__(self, path: str = None, capacity: int = 100_000) -> None:
+        """
+        Args:
+            path (str): The path of the SQLite database, created if needed; None keeps the cache in memory only.
+            capacity (int): The number of solutions kept in memory.
+        """
+        self.path = path
+        # Solution table of each puzzle string seen by this process.
+        self.exact = LRU(capacity)
+        self.canonical = LRU(capacity)  # Canonical solution of each canonical puzzle.
+        self.hits = 0  # Puzzles found in the cache.
+        self.misses = 0  # Puzzles not found.
+        self.connection = None
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            # Several workers write to the database; WAL lets them read while another one writes.
+            self.connection = sqlite3.connect(path, timeout=60)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS solutions (puzzle TEXT PRIMARY KEY, solution TEXT NOT NULL)"
+            )
+            self.connection.commit()
+
+    def get(self, table: list[list[int]]) -> list[list[int]]:
+        """
+        Looks up the solution of a puzzle.
+
+        Args:
+            table (list[list[int]]): The puzzle, with 0 for the empty cells.
+
+        Returns:
+            list[list[int]]: A solution of the puzzle, or None if no equivalent puzzle was solved before.
+        """
+        puzzle = format_table(table)
+        solution = self.exact.get(puzzle)
+        if solution is None:
+            solution = self.find_equivalent(table, puzzle)
+            if solution is None:
+                self.misses += 1
+                return None
+            self.exact.put(puzzle, solution)
+        self.hits += 1
+        return [row[:] for row in solution]
+
+    def find_equivalent(self, table: list[list[int]], puzzle: str) -> list[list[int]]:
+        """
+        Looks up the solution stored under the canonical form of a puzzle, and maps it back to the puzzle.
+
+        Returns:
+            list[list[int]]: A solution of the puzzle, or None.
+        """
+        canonical = canonicalize(table)
+        key = canonical[0] if canonical is not None else puzzle
+        stored = self.canonical.get(key)
+        if stored is None:
+            stored = self.load(key)
+            if stored is None:
+                return None
+            self.canonical.put(key, stored)
+        solution = parse_puzzle(stored)
+        if canonical is not None:
+            solution = canonical[1].invert(solution)
+        return solution if solves(table, solution) else None
+
+    def put(self, table: list[list[int]], solution: list[list[int]]) -> None:
+        """
+        Stores the solution of a puzzle. Solutions that do not solve the puzzle are ignored.
+
+        Args:
+            table (list[list[int]]): The puzzle, with 0 for the empty cells.
+            solution (list[list[int]]): Its solution.
+        """
+        if not solves(table, solution):
+            return
+        puzzle = format_table(table)
+        self.exact.put(puzzle, [row[:] for row in solution])
+        canonical = canonicalize(table)
+        if canonical is None:
+            key, stored = puzzle, format_table(solution)
+        else:
+            key, transform = canonical
+            stored = format_table(transform.apply(solution))
+        self.canonical.put(key, stored)
+        if self.connection is not None:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO solutions VALUES (?, ?)", (key, stored)
+                )
+
+    def load(self, key: str) -> str:
+        """
+        Reads a canonical solution from the database, or returns None.
+        """
+        if self.connection is None:
+            return None
+        row = self.connection.execute(
+            "SELECT solution FROM solutions WHERE puzzle = ?", (key,)
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def solves(table: list[list[int]], solution: list[list[int]]) -> bool:
+    """
+    Checks that a solution keeps the clues of a puzzle and has every value once in each row, column and box.
+    """
+    size = len(table)
+    if len(solution) != size:
+        return False
+    box_size = box_size_for(size)
+    values = set(range(1, size + 1))
+    for row, solution_row in zip(table, solution):
+        if set(solution_row) != values or len(solution_row) != size:
+            return False
+        if any(value and value != solved for value, solved in zip(row, solution_row)):
+            return False
+    if any(set(column) != values for column in zip(*solution)):
+        return False
+    return all(
+        {
+            solution[row][col]
+            for row in range(top, top + box_size)
+            for col in range(left, left + box_size)
+        }
+        == values
+        for top in range(0, size, box_size)
+        for left in range(0, size, box_size)
+    )
+
+
+_caches = {}  # The cache of each database opened by this process, by absolute path.
+
+
+def open_cache(path: str) -> SolutionCache:
+    """
+    Returns the cache of a database for this process, opening it on first use. Each worker process
+    opens its own connection, since SQLite connections cannot be shared across processes.
+    """
+    path = os.path.abspath(path)
+    cache = _caches.get(path)
+    if cache is None:
+        cache = _caches[path] = SolutionCache(path)
+    return cache
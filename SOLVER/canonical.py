@@ -0,0 +1,255 @@
+from solution import box_size_for
+from itertools import permutations, product
+from typing import NamedTuple
+import math
+
+# Characters of the cell values in puzzle strings: 1-9, then letters for the grids larger than 9x9.
+CELL_CHARACTERS = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+EMPTY_CHARACTERS = "0."
+CELL_VALUES = {
+    **{character: value for value, character in enumerate(CELL_CHARACTERS, start=1)},
+    **dict.fromkeys(EMPTY_CHARACTERS, 0),
+}
+
+# Transforms compared at most by canonicalize() before giving up on a puzzle.
+MAX_CANDIDATES = 5000
+REFINEMENTS = 3  # Rounds of refinement of the row and column keys.
+
+
+def parse_puzzle(puzzle) -> list[list[int]]:
+    """
+    Reads a puzzle given as a string with one character per cell (row after row, 0 or . for the empty cells,
+    letters for the values above 9) or as a list of rows.
+
+    Args:
+        puzzle (str or list): The puzzle.
+
+    Returns:
+        list[list[int]]: The puzzle as a table, with 0 for the empty cells.
+
+    Raises:
+        ValueError: If the puzzle is not a square grid with square boxes, or has a value out of range.
+    """
+    if isinstance(puzzle, str):
+        text = puzzle.strip()
+        size = math.isqrt(len(text))
+        if size * size != len(text):
+            raise ValueError(f"{len(text)} cells do not form a square grid.")
+        try:
+            values = [CELL_VALUES[character] for character in text.upper()]
+        except KeyError as error:
+            raise ValueError(f"Unknown cell character {error.args[0]!r}.") from None
+        table = [values[start : start + size] for start in range(0, len(values), size)]
+    elif isinstance(puzzle, list) and all(isinstance(row, list) for row in puzzle):
+        table = [[int(value) for value in row] for row in puzzle]
+        size = len(table)
+        if any(len(row) != size for row in table):
+            raise ValueError("The rows of the puzzle do not form a square grid.")
+    else:
+        raise ValueError("A puzzle must be a string or a list of rows.")
+
+    box_size_for(size)
+    if any(not 0 <= value <= size for row in table for value in row):
+        raise ValueError(f"A {size}x{size} puzzle only holds the values 1 to {size}.")
+    return table
+
+
+def format_table(table: list[list[int]]) -> str:
+    """
+    Writes a table as a string with one character per cell, 0 for the empty cells.
+    """
+    return "".join(
+        CELL_CHARACTERS[value - 1] if value else "0" for row in table for value in row
+    )
+
+
+class Transform(NamedTuple):
+    """
+    A symmetry of Sudoku grids: an optional transposition, then a reordering of the rows and columns that keeps
+    the bands and stacks together, then a relabelling of the digits.
+    """
+
+    transpose: bool  # Whether the grid is transposed first.
+    rows: tuple  # rows[i] is the row of the (transposed) grid moved to row i.
+    cols: tuple  # cols[j] is the column of the (transposed) grid moved to column j.
+    digits: tuple  # digits[value] is the new label of a value; digits[0] is 0.
+
+    def apply(self, table: list[list[int]]) -> list[list[int]]:
+        """
+        Returns the image of a table (a puzzle or one of its solutions) by the transform.
+        """
+        if self.transpose:
+            table = [list(column) for column in zip(*table)]
+        digits = self.digits
+        return [[digits[table[row][col]] for col in self.cols] for row in self.rows]
+
+    def invert(self, table: list[list[int]]) -> list[list[int]]:
+        """
+        Returns the table whose image by the transform is the given table.
+        """
+        labels = [0] * len(self.digits)
+        for value, label in enumerate(self.digits):
+            labels[label] = value
+        size = len(self.rows)
+        original = [[0] * size for _ in range(size)]
+        for row, values in zip(self.rows, table):
+            original_row = original[row]
+            for col, value in zip(self.cols, values):
+                original_row[col] = labels[value]
+        if self.transpose:
+            original = [list(column) for column in zip(*original)]
+        return original
+
+
+def canonicalize(table: list[list[int]]) -> tuple:
+    """
+    Reduces a puzzle to a canonical form shared by the puzzles equivalent to it through transposition,
+    permutations of bands, stacks, and rows and columns within them, and relabelling of the digits.
+
+    The canonical form is the smallest grid, in row-major order with digits relabelled by first appearance,
+    among the transforms that sort the bands, stacks, rows and columns by keys preserved by every symmetry:
+    their numbers of clues, refined with the keys of the lines they cross and the frequency of their digits.
+    Only lines with equal keys are permuted in every way, which leaves few transforms to compare.
+    Equivalent puzzles have the same candidates, up to the symmetry relating them, so they get the same form.
+
+    Args:
+        table (list[list[int]]): The puzzle, with 0 for the empty cells.
+
+    Returns:
+        tuple: The canonical puzzle as a string (see format_table) and the Transform mapping the puzzle to it,
+               or None if the puzzle is too symmetric to be canonicalized within MAX_CANDIDATES transforms.
+    """
+    size = len(table)
+    box_size = box_size_for(size)
+    frequencies = [0] * (size + 1)
+    for row in table:
+        for value in row:
+            frequencies[value] += 1
+    frequencies[0] = 0
+
+    orientations = []
+    total = 0
+    for transpose in (False, True):
+        grid = [list(column) for column in zip(*table)] if transpose else table
+        row_keys, col_keys = line_keys(grid, frequencies)
+        row_orders = line_orders(row_keys, box_size)
+        col_orders = line_orders(col_keys, box_size)
+        total += len(row_orders) * len(col_orders)
+        if total > MAX_CANDIDATES:
+            return None
+        orientations.append((transpose, grid, row_orders, col_orders))
+
+    best = None
+    for transpose, grid, row_orders, col_orders in orientations:
+        for rows in row_orders:
+            lines = [grid[row] for row in rows]
+            for cols in col_orders:
+                digits = [0] * (size + 1)
+                label = 0
+                cells = []
+                for line in lines:
+                    for col in cols:
+                        value = line[col]
+                        if value and not digits[value]:
+                            label += 1
+                            digits[value] = label
+                        cells.append(digits[value])
+                if best is None or cells < best[0]:
+                    best = (cells, transpose, rows, cols, digits)
+
+    cells, transpose, rows, cols, digits = best
+    # Values missing from the clues get the labels left, in increasing order.
+    label = max(digits)
+    for value in range(1, size + 1):
+        if not digits[value]:
+            label += 1
+            digits[value] = label
+    key = "".join(CELL_CHARACTERS[value - 1] if value else "0" for value in cells)
+    return key, Transform(transpose, tuple(rows), tuple(cols), tuple(digits))
+
+
+def line_keys(grid: list[list[int]], frequencies: list[int]) -> tuple:
+    """
+    Computes keys of the rows and columns of a grid that do not change under the symmetries: starting from
+    the number of clues of each line and the frequencies of their digits, each round adds to the key of a line
+    the sorted keys of the lines crossing it at its clues. Keys are replaced by their rank after each round.
+
+    Returns:
+        tuple: The list of the keys of the rows and the list of the keys of the columns.
+    """
+    size = len(grid)
+    clues = [(row, col) for row in range(size) for col in range(size) if grid[row][col]]
+    row_keys = [[] for _ in range(size)]
+    col_keys = [[] for _ in range(size)]
+    for row, col in clues:
+        frequency = frequencies[grid[row][col]]
+        row_keys[row].append(frequency)
+        col_keys[col].append(frequency)
+    row_keys = ranks([tuple(sorted(key)) for key in row_keys])
+    col_keys = ranks([tuple(sorted(key)) for key in col_keys])
+
+    for _ in range(REFINEMENTS):
+        row_crossings = [[] for _ in range(size)]
+        col_crossings = [[] for _ in range(size)]
+        for row, col in clues:
+            row_crossings[row].append(col_keys[col])
+            col_crossings[col].append(row_keys[row])
+        row_keys = ranks(
+            [(row_keys[row], tuple(sorted(row_crossings[row]))) for row in range(size)]
+        )
+        col_keys = ranks(
+            [(col_keys[col], tuple(sorted(col_crossings[col]))) for col in range(size)]
+        )
+    return row_keys, col_keys
+
+
+def ranks(keys: list) -> list[int]:
+    """
+    Replaces keys by their rank among the distinct keys.
+    """
+    order = {key: rank for rank, key in enumerate(sorted(set(keys)))}
+    return [order[key] for key in keys]
+
+
+def line_orders(keys: list[int], box_size: int) -> list[tuple]:
+    """
+    Lists the orders of the lines of a grid (rows or columns) that keep bands (or stacks) together and sort
+    the groups by their sorted keys, then the lines of each group by their key. Groups or lines with equal keys
+    are taken in every order.
+
+    Returns:
+        list of tuple: The candidate orders, each giving the line moved to every position.
+    """
+    groups = [
+        sorted(range(start, start + box_size), key=keys.__getitem__)
+        for start in range(0, len(keys), box_size)
+    ]
+    group_keys = [[keys[line] for line in group] for group in groups]
+
+    # Every order of the lines of each group, then every order of the groups.
+    group_orders = [tied_orders(group, keys.__getitem__) for group in groups]
+    arrangements = tied_orders(list(range(len(groups))), group_keys.__getitem__)
+    orders = []
+    for arrangement in arrangements:
+        for choice in product(*(group_orders[group] for group in arrangement)):
+            orders.append(tuple(line for lines in choice for line in lines))
+            if len(orders) > MAX_CANDIDATES:
+                return orders
+    return orders
+
+
+def tied_orders(items: list, key) -> list[tuple]:
+    """
+    Lists the orders of items sorted by key, with the items of equal key in every order.
+    """
+    items = sorted(items, key=key)
+    runs = []
+    for item in items:
+        if runs and key(runs[-1][0]) == key(item):
+            runs[-1].append(item)
+        else:
+            runs.append([item])
+    return [
+        tuple(item for run in choice for item in run)
+        for choice in product(*(permutations(run) for run in runs))
+    ]
@@ -0,0 +1,79 @@
+import glob
+import os
+import pickle
+
+CHECKPOINT_VERSION = 4  # Bumped whenever the content of a checkpoint changes.
+
+
+def checkpoint_path(directory: str, process_id: int) -> str:
+    """
+    Returns the path of the checkpoint of a puzzle.
+
+    Args:
+        directory (str): The directory holding the checkpoints.
+        process_id (int): The process ID of the puzzle.
+    """
+    return os.path.join(directory, f"checkpoint_{process_id}.pkl")
+
+
+def save_checkpoint(path: str, checkpoint: dict) -> None:
+    """
+    Saves the state of a chain. The file is written next to its destination and then renamed over it,
+    so a process killed while saving leaves the previous checkpoint intact. The directory is created if needed.
+
+    Args:
+        path (str): The path of the checkpoint.
+        checkpoint (dict): The state of the chain; any picklable values.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        pickle.dump(
+            {"version": CHECKPOINT_VERSION, **checkpoint},
+            file,
+            pickle.HIGHEST_PROTOCOL,
+        )
+    os.replace(temporary_path, path)
+
+
+def load_checkpoint(path: str) -> dict:
+    """
+    Loads the state of a chain saved by save_checkpoint.
+
+    Args:
+        path (str): The path of the checkpoint.
+
+    Returns:
+        dict: The state of the chain, or None if there is no checkpoint at path.
+
+    Raises:
+        ValueError: If the checkpoint was written by an incompatible version.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as file:
+        checkpoint = pickle.load(file)
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Checkpoint {path} has an unsupported version.")
+    return checkpoint
+
+
+def remove_checkpoint(path: str) -> None:
+    """
+    Deletes a checkpoint once its chain has finished. Missing checkpoints are ignored.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def clear_checkpoints(directory: str) -> int:
+    """
+    Deletes every checkpoint of a directory, so that a fresh batch does not resume stale chains.
+
+    Returns:
+        int: The number of checkpoints deleted.
+    """
+    paths = glob.glob(os.path.join(directory, "checkpoint_*.pkl"))
+    for path in paths:
+        os.remove(path)
+    return len(paths)
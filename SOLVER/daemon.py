@@ -0,0 +1,355 @@
+from SA import SimulatedAnnealing
+from canonical import format_table, parse_puzzle
+from runner import available_cpus
+from tracing import NoTrace
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+
+# Keyword arguments of SimulatedAnnealing that a request may set, besides its id and puzzle.
+REQUEST_OPTIONS = (
+    "min_temp",
+    "max_temp",
+    "cooling_rate",
+    "max_iterations",
+    "time_limit",
+    "presolve",
+    "calibrate",
+    "seed",
+    "finish_below",
+    "restart_patience",
+    "max_restarts",
+)
+
+
+def parse_request(line: str, number: int) -> tuple:
+    """
+    Reads one request: either a bare puzzle string, or a JSON object with the puzzle under "puzzle",
+    an optional "id" echoed in the response, and any of REQUEST_OPTIONS.
+
+    Args:
+        line (str): The line of the request.
+        number (int): The position of the request in its stream, used as its id when it has none.
+
+    Returns:
+        tuple: The id of the request, the puzzle table and the dict of solver options.
+
+    Raises:
+        ValueError: If the request cannot be read.
+    """
+    text = line.strip()
+    if not text.startswith("{"):
+        return number, parse_puzzle(text), {}
+
+    request = json.loads(text)  # json.JSONDecodeError is a ValueError.
+    if not isinstance(request, dict) or "puzzle" not in request:
+        raise ValueError('A JSON request must be an object with a "puzzle".')
+    unknown = set(request) - {"id", "puzzle", *REQUEST_OPTIONS}
+    if unknown:
+        raise ValueError(f"Unknown request fields: {', '.join(sorted(unknown))}.")
+    options = {key: request[key] for key in REQUEST_OPTIONS if key in request}
+    return request.get("id", number), parse_puzzle(request["puzzle"]), options
+
+
+def init_daemon_worker() -> None:
+    """
+    Prepares a worker of the daemon. The solver prints its progress to the standard output,
+    which carries the responses in stdio mode, so the workers print to the standard error instead.
+    """
+    sys.stdout = sys.stderr
+
+
+def solve_request(params: tuple) -> dict:
+    """
+    Solves the puzzle of one request on a worker. Nothing is written to disk.
+
+    Args:
+        params (tuple): The random stream of the request, which selects the stream of a seeded run,
+                        the puzzle table, and the keyword arguments of SimulatedAnnealing.
+
+    Returns:
+        dict: The fields of the response: status, solution, fitness, iterations, solve time and
+              the status of the run (see SA.RUN_STATUSES).
+    """
+    stream, table, options = params
+    start = time.perf_counter()
+    options = dict(options)
+    algorithm = SimulatedAnnealing(
+        table,
+        options.pop("min_temp"),
+        options.pop("max_temp"),
+        options.pop("cooling_rate"),
+        trace=NoTrace(),
+        **options,
+    )
+    best_table, fitness, _ = algorithm.run(stream)
+    return {
+        "status": "solved" if fitness == 0 else "unsolved",
+        "solution": format_table(best_table),
+        "fitness": fitness,
+        "iterations": algorithm.iterations,
+        "elapsed": round(time.perf_counter() - start, 6),
+        "run_status": algorithm.status,
+    }
+
+
+class SolverDaemon:
+    """
+    This class serves solve requests from long-lived streams, so that a client pays neither the start of Python
+    nor the spawn of the workers for every puzzle. The workers are started and warmed up once, the requests of all
+    the streams are solved concurrently on them, and each response is written as soon as its puzzle is solved,
+    so responses can come back out of order; they carry the id of their request.
+
+    Requests are lines holding a puzzle string or a JSON object (see parse_request), and responses are JSON lines
+    with the id, status ("solved", "unsolved" or "error"), solution string, fitness, iterations, solve time
+    ("elapsed") and time since the request was read ("latency"), in seconds.
+    """
+
+    def __init__(self, processes: int = None, defaults: dict = None) -> None:
+        """
+        Args:
+            processes (int): Number of worker processes; defaults to the available CPUs.
+            defaults (dict): Solver options of the requests that do not set them; see REQUEST_OPTIONS.
+        """
+        self.processes = processes or available_cpus()
+        self.defaults = {
+            "min_temp": 1e-7,
+            "max_temp": 1e8,
+            "cooling_rate": 0.999,
+            **(defaults or {}),
+        }
+        self.executor = None  # Pool of the workers, created by start().
+        self.received = 0  # Number of requests read from all the streams, which numbers their random streams.
+        self.served = 0  # Number of responses written.
+
+    def start(self) -> None:
+        """
+        Starts the workers and waits until each of them is running, so the first requests find them ready.
+        """
+        self.executor = ProcessPoolExecutor(
+            self.processes, initializer=init_daemon_worker
+        )
+        # Tasks submitted together start one worker each.
+        for future in [self.executor.submit(os.getpid) for _ in range(self.processes)]:
+            future.result()
+
+    def close(self) -> None:
+        """
+        Stops the workers, dropping the requests that have not started yet.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    async def handle(self, lines, write) -> None:
+        """
+        Serves one stream of requests until its end, then waits for its last responses.
+
+        Args:
+            lines: An asynchronous iterable of request lines (bytes or str), such as an asyncio.StreamReader.
+            write: A function called with the bytes of every response line.
+        """
+        pending = set()
+        number = 0
+        async for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode()
+            if not line.strip():
+                continue
+            task = asyncio.create_task(self.answer(line, number, self.received, write))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            number += 1
+            self.received += 1
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def answer(self, line: str, number: int, stream: int, write) -> None:
+        """
+        Solves one request on the workers and writes its response.
+
+        Args:
+            line (str): The line of the request.
+            number (int): The position of the request in its stream, its id when it has none.
+            stream (int): The position of the request among all the requests of the daemon, which selects
+                          its random stream, so that no two requests of a seeded daemon share one.
+            write: A function called with the bytes of the response line.
+        """
+        received = time.perf_counter()
+        request_id = number
+        try:
+            request_id, table, options = parse_request(line, number)
+            response = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                solve_request,
+                (stream, table, {**self.defaults, **options}),
+            )
+        except Exception as error:
+            # A bad request or a failed solve is reported, without stopping the stream.
+            response = {"status": "error", "error": f"{type(error).__name__}: {error}"}
+        response = {
+            "id": request_id,
+            **response,
+            "latency": round(time.perf_counter() - received, 6),
+        }
+        write((json.dumps(response) + "\n").encode())
+        self.served += 1
+
+    async def serve_unix(self, path: str, stop: asyncio.Event = None) -> None:
+        """
+        Accepts clients on a Unix socket until stop is set. Each connection is a stream of requests,
+        closed once its last response is written.
+
+        Args:
+            path (str): The path of the socket; a stale socket file is replaced.
+            stop (asyncio.Event): Event ending the service; by default, SIGINT or SIGTERM.
+        """
+        if stop is None:
+            stop = stop_on_signals()
+
+        async def connection(reader, writer):
+            try:
+                await self.handle(reader, writer.write)
+                await writer.drain()
+            except ConnectionError:
+                pass  # The client left before its responses.
+            finally:
+                writer.close()
+
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(connection, path)
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    async def serve_stdio(self) -> None:
+        """
+        Serves the requests of the standard input, writing the responses to the standard output,
+        until the end of the input.
+        """
+
+        def write(data):
+            sys.stdout.buffer.write(data)
+            sys.stdout.flush()
+
+        await self.handle(stdin_lines(), write)
+
+
+async def stdin_lines():
+    """
+    Yields the lines of the standard input. They are read on a thread, which works for pipes, terminals and files.
+    """
+    while line := await asyncio.to_thread(sys.stdin.buffer.readline):
+        yield line
+
+
+def stop_on_signals() -> asyncio.Event:
+    """
+    Returns an event set when the process receives SIGINT or SIGTERM.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stop.set)
+    return stop
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parses the command line options of the daemon.
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve Sudoku solve requests from a warm pool of annealing workers."
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="Serve clients on this Unix socket instead of the standard input and output.",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=available_cpus(),
+        help="Number of worker processes (default: available CPUs).",
+    )
+    parser.add_argument("--min-temp", type=float, default=1e-7)
+    parser.add_argument("--max-temp", type=float, default=1e8)
+    parser.add_argument("--cooling-rate", type=float, default=0.999)
+    parser.add_argument(
+        "--max-iterations", type=int, help="Iteration budget per puzzle."
+    )
+    parser.add_argument(
+        "--time-limit", type=float, help="Wall-clock budget per puzzle, in seconds."
+    )
+    parser.add_argument(
+        "--presolve",
+        action="store_true",
+        help="Fill the cells deduced by constraint propagation before annealing.",
+    )
+    parser.add_argument(
+        "--calibrate",
+        type=float,
+        nargs="?",
+        const=0.8,
+        metavar="ACCEPTANCE",
+        help="Calibrate the starting temperature on each puzzle (default acceptance 0.8).",
+    )
+    parser.add_argument(
+        "--finish-below",
+        type=int,
+        metavar="FITNESS",
+        help="Complete the runs stalled at a best fitness of at most FITNESS with an exact search.",
+    )
+    parser.add_argument(
+        "--restart-after",
+        type=int,
+        metavar="PATIENCE",
+        help="Restart a chain from a new random board when it has not improved for PATIENCE iterations.",
+    )
+    parser.add_argument("--max-restarts", type=int, default=3)
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Seed of the requests that do not set one. Each request draws from its own random stream, selected by "
+        "the order in which the daemon reads the requests of all its clients.",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    daemon = SolverDaemon(
+        args.processes,
+        {
+            "min_temp": args.min_temp,
+            "max_temp": args.max_temp,
+            "cooling_rate": args.cooling_rate,
+            "max_iterations": args.max_iterations,
+            "time_limit": args.time_limit,
+            "presolve": args.presolve,
+            "calibrate": args.calibrate,
+            "seed": args.seed,
+            "finish_below": args.finish_below,
+            "restart_patience": args.restart_after,
+            "max_restarts": args.max_restarts,
+        },
+    )
+    daemon.start()
+    print(f"Solver daemon ready with {daemon.processes} workers.", file=sys.stderr)
+    try:
+        if args.socket:
+            asyncio.run(daemon.serve_unix(args.socket))
+        else:
+            asyncio.run(daemon.serve_stdio())
+    finally:
+        daemon.close()
+    print(f"{daemon.served} requests served.", file=sys.stderr)
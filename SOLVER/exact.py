@@ -0,0 +1,170 @@
+from presolve import presolve, all_digits, box_index
+from solution import box_size_for
+
+MAX_NODES = 200_000  # Search nodes explored by solve_exact() before giving up.
+
+
+def solve_exact(table: list[list[int]], max_nodes: int = MAX_NODES) -> list[list[int]]:
+    """
+    Solves a puzzle exactly by backtracking: the singles are first deduced by the presolve, then the search
+    always branches on the empty cell with the fewest candidates (the minimum remaining values heuristic),
+    trying its candidate digits in increasing order. Candidates are bitmasks, as in the presolve.
+
+    Args:
+        table (list[list[int]]): The puzzle, with 0 for the empty cells. It is not modified.
+        max_nodes (int): The number of digits placed by the search before it gives up; None for no limit.
+
+    Returns:
+        list[list[int]]: A solution of the puzzle, or None if it has none or the search ran out of nodes.
+    """
+    if not consistent(table):
+        return None
+    try:
+        grid = presolve(table)
+    except ValueError:
+        return None
+    size = len(grid)
+    box_size = box_size_for(size)
+    digits = all_digits(size)
+    rows = [0] * size
+    cols = [0] * size
+    boxes = [0] * size
+    empty = []
+    for row in range(size):
+        for col in range(size):
+            box = box_index(row, col, box_size)
+            if grid[row][col]:
+                bit = 1 << grid[row][col]
+                rows[row] |= bit
+                cols[col] |= bit
+                boxes[box] |= bit
+            else:
+                empty.append((row, col, box))
+    budget = [max_nodes if max_nodes is not None else -1]
+
+    def search(remaining: int) -> bool:
+        if remaining == 0:
+            return True
+        # Moves the cell with the fewest candidates to the end of the empty cells still to fill.
+        best = -1
+        best_mask = 0
+        best_count = size + 1
+        for index in range(remaining):
+            row, col, box = empty[index]
+            mask = digits & ~(rows[row] | cols[col] | boxes[box])
+            count = mask.bit_count()
+            if count < best_count:
+                best, best_mask, best_count = index, mask, count
+                if count <= 1:
+                    break
+        if best_count == 0:
+            return False
+        last = remaining - 1
+        empty[best], empty[last] = empty[last], empty[best]
+        row, col, box = empty[last]
+
+        mask = best_mask
+        while mask:
+            if budget[0] == 0:
+                return False
+            budget[0] -= 1
+            bit = mask & -mask
+            mask ^= bit
+            rows[row] |= bit
+            cols[col] |= bit
+            boxes[box] |= bit
+            if search(last):
+                grid[row][col] = bit.bit_length() - 1
+                return True
+            rows[row] ^= bit
+            cols[col] ^= bit
+            boxes[box] ^= bit
+        return False
+
+    return grid if search(len(empty)) else None
+
+
+def consistent(table: list[list[int]]) -> bool:
+    """
+    Checks that no digit of a grid appears twice in a row, column or box. Empty cells are ignored.
+    """
+    size = len(table)
+    box_size = box_size_for(size)
+    rows = [0] * size
+    cols = [0] * size
+    boxes = [0] * size
+    for row in range(size):
+        for col in range(size):
+            value = table[row][col]
+            if not value:
+                continue
+            bit = 1 << value
+            box = box_index(row, col, box_size)
+            if (rows[row] | cols[col] | boxes[box]) & bit:
+                return False
+            rows[row] |= bit
+            cols[col] |= bit
+            boxes[box] |= bit
+    return True
+
+
+def consistent_cells(
+    original: list[list[int]], table: list[list[int]]
+) -> list[list[int]]:
+    """
+    Keeps the cells of an annealing state that are not in conflict: the clues, and the cells whose digit
+    appears once in their row and once in their column (the boxes of a state never hold a digit twice).
+
+    Args:
+        original (list[list[int]]): The puzzle, with 0 for the empty cells.
+        table (list[list[int]]): A complete grid of the annealing, that may still have conflicts.
+
+    Returns:
+        list[list[int]]: The puzzle with the consistent cells of the state filled in.
+    """
+    size = len(table)
+    row_counts = [[0] * (size + 1) for _ in range(size)]
+    col_counts = [[0] * (size + 1) for _ in range(size)]
+    for row in range(size):
+        for col in range(size):
+            value = table[row][col]
+            row_counts[row][value] += 1
+            col_counts[col][value] += 1
+    return [
+        [
+            (
+                original[row][col]
+                or (
+                    table[row][col]
+                    if row_counts[row][table[row][col]] == 1
+                    and col_counts[col][table[row][col]] == 1
+                    else 0
+                )
+            )
+            for col in range(size)
+        ]
+        for row in range(size)
+    ]
+
+
+def finish(
+    original: list[list[int]], table: list[list[int]], max_nodes: int = MAX_NODES
+) -> list[list[int]]:
+    """
+    Completes an annealing state that is close to a solution. The consistent cells of the state are kept and the
+    others are solved exactly, which takes a few milliseconds when only a handful of cells are in conflict.
+    If the consistent cells cannot be completed, because the state sits next to a wrong solution, the whole
+    puzzle is solved exactly instead.
+
+    Args:
+        original (list[list[int]]): The puzzle, with 0 for the empty cells.
+        table (list[list[int]]): The best grid found by the annealing.
+        max_nodes (int): The budget of each exact search, see solve_exact.
+
+    Returns:
+        list[list[int]]: A solution of the puzzle, or None if none was found within the budget.
+    """
+    solution = solve_exact(consistent_cells(original, table), max_nodes)
+    if solution is None:
+        solution = solve_exact(original, max_nodes)
+    return solution
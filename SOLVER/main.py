@@ -1,7 +1,93 @@
 from SA import SimulatedAnnealing
+from archive import ARCHIVE_EXTENSION, RunArchive, RunArchiveWriter
+from batch_SA import BatchSimulatedAnnealing
+from checkpoint import clear_checkpoints
+from manifest import Manifest
+from observer import RunStats
+from presolve import presolve
+from puzzle_store import (
+    PuzzleRef,
+    PuzzleStore,
+    STORE_EXTENSION,
+    open_store,
+    write_puzzle_store,
+)
+from rng import chain_generator
+from runner import (
+    available_cpus,
+    iter_puzzles,
+    iter_sudoku_csv,
+    solve_puzzle,
+)
+from schedule import make_schedule, SCHEDULES
+from shared import SharedBatch
+from tempering import ParallelTempering
+from tracing import make_trace, NoTrace, TRACE_POLICIES
+from typing import NamedTuple
+import argparse
 import csv
+import json
 import os
-from multiprocessing import Pool
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import partial
+from itertools import islice
+from multiprocessing import Pool, Value
+
+_stop_flag = None  # Flag shared by the restarts of a race, installed in every worker by init_race_worker.
+_shared_task = None  # Batch and solver parameters of a shared batch, installed in every worker by init_shared_worker.
+
+RESULTS_HEADER = [
+    "Process ID",
+    "Status",
+    "Fitness",
+    "Iterations",
+    "Elapsed",
+    "Error",
+    "Run Status",
+]
+
+
+class PuzzleResult(NamedTuple):
+    """
+    The outcome of solving one puzzle. The first two fields are the output paths, as returned before.
+    """
+
+    final_solution_path: str
+    additional_info_path: str
+    fitness: int
+    iterations: int
+    elapsed: float
+    process_id: int
+    error: str = None  # Description of the exception raised while solving, if any.
+    run_status: str = (
+        None  # Why the annealing ended, one of SA.RUN_STATUSES, when known.
+    )
+
+    @property
+    def status(self) -> str:
+        """
+        Returns "error" if solving raised, "solved" if the fitness is 0, and "unsolved" otherwise.
+        """
+        return (
+            "error" if self.error else ("solved" if self.fitness == 0 else "unsolved")
+        )
+
+    def row(self) -> list:
+        """
+        Returns the result as a row of the results CSV file.
+        """
+        return [
+            self.process_id,
+            self.status,
+            self.fitness,
+            self.iterations,
+            f"{self.elapsed:.3f}",
+            self.error or "",
+            self.run_status or "",
+        ]
 
 
 def run_simulated_annealing(params: tuple):
@@ -9,81 +95,1244 @@ def run_simulated_annealing(params: tuple):
     Executes the Simulated Annealing algorithm on a single Sudoku puzzle.
 
     Args:
-        params (tuple): A tuple containing the Sudoku puzzle, the minimum and maximum temperatures,
-                        the cooling rate, and a process ID for file naming.
+        params (tuple): A tuple containing the Sudoku puzzle (or a PuzzleRef to it), the minimum and maximum temperatures,
+                        the cooling rate, and a process ID for file naming. An optional sixth element
+                        is a dict of extra keyword arguments for SimulatedAnnealing (for example a trace policy);
+                        its "cache" entry, if any, is the path of a solution cache consulted before annealing.
 
     Returns:
-        A tuple with paths to the final solution and additional information files.
+        A PuzzleResult, whose first two fields are the paths to the final solution and additional information files.
+        The additional information path is None when the trace recorded nothing, or the solution came from the cache.
     """
-    sudoku_table, min_temp, max_temp, cooling_rate, process_id = params
-    algorithm = SimulatedAnnealing(sudoku_table, min_temp, max_temp, cooling_rate)
+    start = time.perf_counter()
+    sudoku_table, min_temp, max_temp, cooling_rate, process_id, *rest = params
+    solver_options = rest[0] if rest else {}
+    if isinstance(sudoku_table, PuzzleRef):
+        sudoku_table = sudoku_table.load()
+
+    best_state, fitness, additional_info_data, algorithm = solve_puzzle(
+        sudoku_table, min_temp, max_temp, cooling_rate, process_id, solver_options
+    )
+    final_solution_path, additional_info_path = save_outputs(
+        process_id, best_state, additional_info_data
+    )
+    if algorithm is None:  # Answered by the cache.
+        return PuzzleResult(
+            final_solution_path,
+            additional_info_path,
+            0,
+            0,
+            time.perf_counter() - start,
+            process_id,
+            run_status="solved",
+        )
+    if isinstance(algorithm.observer, RunStats):
+        save_stats(process_id, algorithm.observer)
+    return PuzzleResult(
+        final_solution_path,
+        additional_info_path,
+        fitness,
+        algorithm.iterations,
+        time.perf_counter() - start,
+        process_id,
+        run_status=algorithm.status,
+    )
+
+
+def init_race_worker(stop_flag) -> None:
+    """
+    Installs the flag shared by the restarts of a race. Used as the initializer of the racing pool,
+    since shared values cannot be pickled with the tasks.
+
+    Args:
+        stop_flag: A multiprocessing.Value set to 1 once a restart solves the puzzle.
+    """
+    global _stop_flag
+    _stop_flag = stop_flag
+
+
+def run_restart(params: tuple) -> tuple:
+    """
+    Runs one restart of a race on a worker process. The restart stops early when another one
+    raises the shared flag, and raises the flag itself if it solves the puzzle.
+
+    Args:
+        params (tuple): The parameters of run_simulated_annealing.
+
+    Returns:
+        tuple: The best solution found, its fitness, the Trace of the run, the number of iterations
+               and the status of the run.
+    """
+    sudoku_table, min_temp, max_temp, cooling_rate, process_id, *rest = params
+    solver_options = rest[0] if rest else {}
+    algorithm = SimulatedAnnealing(
+        sudoku_table,
+        min_temp,
+        max_temp,
+        cooling_rate,
+        stop_flag=_stop_flag,
+        **solver_options,
+    )
     best_state, fitness, additional_info_data = algorithm.run(process_id)
+    if fitness == 0:
+        _stop_flag.value = 1
+    return (
+        best_state,
+        fitness,
+        additional_info_data,
+        algorithm.iterations,
+        algorithm.status,
+    )
+
+
+def race_simulated_annealing(params: tuple, pool: Pool, restarts: int) -> PuzzleResult:
+    """
+    Launches independent randomized restarts of one puzzle across the pool of a race. The first restart
+    to reach fitness 0 signals the others through the shared flag, so they stop within a few iterations.
+    Only the best result and its trace are written.
+
+    Args:
+        params (tuple): The parameters of run_simulated_annealing.
+        pool (Pool): A pool created with init_race_worker as initializer.
+        restarts (int): The number of restarts.
+
+    Returns:
+        A PuzzleResult, like run_simulated_annealing.
+    """
+    start = time.perf_counter()
+    sudoku_table, process_id = params[0], params[4]
+    if isinstance(sudoku_table, PuzzleRef):
+        sudoku_table = sudoku_table.load()
+        params = (sudoku_table, *params[1:])
+
+    # Each restart gets its own random stream: the seed of the batch, if any, is extended with the restart number.
+    solver_options = params[5] if len(params) > 5 else {}
+    seed = solver_options.get("seed")
+    tasks = [
+        (
+            *params[:5],
+            {**solver_options, "seed": None if seed is None else [seed, restart]},
+        )
+        for restart in range(restarts)
+    ]
+
+    _stop_flag.value = 0
+    outcomes = pool.map(run_restart, tasks)
+    best_state, fitness, additional_info_data, iterations, run_status = min(
+        outcomes, key=lambda outcome: outcome[1]
+    )
+
+    final_solution_path, additional_info_path = save_outputs(
+        process_id, best_state, additional_info_data
+    )
+    return PuzzleResult(
+        final_solution_path,
+        additional_info_path,
+        fitness,
+        iterations,
+        time.perf_counter() - start,
+        process_id,
+        run_status=run_status,
+    )
+
+
+def run_parallel_tempering(params: tuple, pool: Pool = None) -> PuzzleResult:
+    """
+    Executes parallel tempering on a single Sudoku puzzle, advancing its replicas on the given pool.
+
+    Args:
+        params (tuple): A tuple containing the Sudoku puzzle (or a PuzzleRef to it), the temperatures of the
+                        coldest and hottest replicas, the number of replicas, a process ID for file naming,
+                        and optionally a dict of extra keyword arguments for ParallelTempering.
+        pool (Pool): The worker pool shared by the replicas.
+
+    Returns:
+        A PuzzleResult, like run_simulated_annealing.
+    """
+    start = time.perf_counter()
+    sudoku_table, min_temp, max_temp, replicas, process_id, *rest = params
+    solver_options = rest[0] if rest else {}
+    if isinstance(sudoku_table, PuzzleRef):
+        sudoku_table = sudoku_table.load()
+    algorithm = ParallelTempering(
+        sudoku_table, min_temp, max_temp, replicas, **solver_options
+    )
+    best_state, fitness, additional_info_data = algorithm.run(process_id, pool)
+
+    final_solution_path, additional_info_path = save_outputs(
+        process_id, best_state, additional_info_data
+    )
+    return PuzzleResult(
+        final_solution_path,
+        additional_info_path,
+        fitness,
+        algorithm.iterations,
+        time.perf_counter() - start,
+        process_id,
+        run_status=algorithm.status,
+    )
+
+
+def save_outputs(process_id: int, best_state: list[list[int]], additional_info_data):
+    """
+    Saves the best solution of a puzzle and, unless it is empty, the trace of its run.
+
+    Args:
+        process_id (int): The process ID used to name the files.
+        best_state (list[list[int]]): The best solution found.
+        additional_info_data: The Trace of the run.
 
-    # Ensure output directories exist
+    Returns:
+        A tuple with the paths of the final solution and additional information files.
+        The additional information path is None when the trace recorded nothing.
+    """
     final_solution_path = os.path.join("final_solutions", f"solution_{process_id}.csv")
     additional_info_path = os.path.join(
         "additional_info", f"additional_info_{process_id}.csv"
     )
 
     # Save the best solution for each puzzle to a CSV file
-    with open(final_solution_path, "w", newline="") as file:
-        writer = csv.writer(file)
-        for row in best_state:
-            writer.writerow(row)
+    save_solution(final_solution_path, best_state)
 
     # Save additional information about the process for each puzzle
+    if len(additional_info_data) == 0:
+        return final_solution_path, None
     with open(additional_info_path, "w", newline="") as file:
         writer = csv.writer(file)
         writer.writerow(["Iteration", "Temperature", "Best Fitness"])
-        for data in additional_info_data:
-            writer.writerow(data)
-
+        writer.writerows(additional_info_data)
     return final_solution_path, additional_info_path
 
 
-def read_sudoku_csv(file_path: str) -> list:
+def save_stats(process_id: int, stats: RunStats) -> str:
     """
-    Reads Sudoku puzzles from a CSV file.
+    Saves the counters collected during the run of a puzzle as JSON.
 
     Args:
-        file_path (str): Path to the CSV file containing Sudoku puzzles.
+        process_id (int): The process ID used to name the file.
+        stats (RunStats): The observer of the run.
 
     Returns:
-        A list of Sudoku puzzles, each represented as a list of lists of integers.
-    """
-    sudokus = []
-    with open(file_path, "r") as file:
-        reader = csv.reader(file)
-        sudoku = []
-        for row in reader:
-            if row:  # Non-empty row indicates part of a puzzle
-                sudoku.append([int(num) for num in row])
-            else:  # Empty row indicates separation between puzzles
-                if sudoku:  # If a puzzle is accumulated, add it to the list
-                    sudokus.append(sudoku)
-                    sudoku = []
-        if sudoku:  # Add the last puzzle if the file doesn't end with an empty row
-            sudokus.append(sudoku)
-    return sudokus
+        The path of the statistics file.
+    """
+    stats_path = os.path.join("additional_info", f"stats_{process_id}.json")
+    with open(stats_path, "w") as file:
+        json.dump(stats.as_dict(), file, indent=2)
+    return stats_path
+
+
+def print_progress(stats: RunStats, iteration: int, temp: float, best_fitness: int):
+    """
+    Reports the progress of a run; used as the periodic callback of RunStats with --progress.
+    """
+    print(
+        f"[pid {os.getpid()}] iteration {iteration}: temperature {temp:.3g}, "
+        f"best fitness {best_fitness}, acceptance {stats.acceptance_rate:.2f}"
+    )
+
+
+def run_task(params: tuple) -> PuzzleResult:
+    """
+    Runs run_simulated_annealing on one puzzle, capturing any exception so that a bad puzzle
+    does not abort the rest of the batch.
+
+    Args:
+        params (tuple): The parameters of run_simulated_annealing.
+
+    Returns:
+        The PuzzleResult of the puzzle, with the error field set if solving it failed.
+    """
+    start = time.perf_counter()
+    try:
+        return run_simulated_annealing(params)
+    except Exception as exc:
+        return PuzzleResult(
+            None,
+            None,
+            None,
+            None,
+            time.perf_counter() - start,
+            params[4],
+            f"{type(exc).__name__}: {exc}",
+        )
+
+
+def run_archived_task(params: tuple) -> tuple:
+    """
+    Solves one puzzle like run_task, but returns its best board and trace instead of writing them to files,
+    so that the parent adds them to a run archive.
+
+    Args:
+        params (tuple): The parameters of run_simulated_annealing.
+
+    Returns:
+        tuple: The PuzzleResult of the puzzle, without paths, its best board (None if solving raised),
+               and the arrays of its trace (None if it recorded nothing).
+    """
+    start = time.perf_counter()
+    sudoku_table, min_temp, max_temp, cooling_rate, process_id, *rest = params
+    try:
+        if isinstance(sudoku_table, PuzzleRef):
+            sudoku_table = sudoku_table.load()
+        best_state, fitness, trace, algorithm = solve_puzzle(
+            sudoku_table,
+            min_temp,
+            max_temp,
+            cooling_rate,
+            process_id,
+            rest[0] if rest else {},
+        )
+    except Exception as exc:
+        result = PuzzleResult(
+            None,
+            None,
+            None,
+            None,
+            time.perf_counter() - start,
+            process_id,
+            f"{type(exc).__name__}: {exc}",
+        )
+        return result, None, None
+    if algorithm is not None and isinstance(algorithm.observer, RunStats):
+        save_stats(process_id, algorithm.observer)
+    result = PuzzleResult(
+        None,
+        None,
+        fitness,
+        algorithm.iterations if algorithm is not None else 0,
+        time.perf_counter() - start,
+        process_id,
+        run_status=algorithm.status if algorithm is not None else "solved",
+    )
+    return result, best_state, trace.as_arrays() if len(trace) else None
+
+
+def run_batch_simulated_annealing(params: tuple) -> list:
+    """
+    Executes the vectorized batch annealer on a group of Sudoku puzzles, running several restarts of each one in lockstep.
+
+    Args:
+        params (tuple): A tuple containing the list of Sudoku puzzles (or PuzzleRefs to them), the minimum and maximum
+                        temperatures, the cooling rate, the number of restarts per puzzle, the list of the process IDs
+                        of the puzzles, and a dict of solver options: "seed" (the seed of the batch), "max_iterations",
+                        "time_limit" and "presolve", as for SimulatedAnnealing. Other options are ignored.
+
+    Returns:
+        A list with the PuzzleResult of each puzzle, in the order of the group. Their elapsed time is that of the whole group.
+    """
+    start = time.perf_counter()
+    (
+        sudoku_tables,
+        min_temp,
+        max_temp,
+        cooling_rate,
+        restarts,
+        process_ids,
+        solver_options,
+    ) = params
+    sudoku_tables = [
+        table.load() if isinstance(table, PuzzleRef) else table
+        for table in sudoku_tables
+    ]
+    if solver_options.get("presolve"):
+        sudoku_tables = [presolve(table) for table in sudoku_tables]
+    # The group draws from the stream of its first puzzle, so a seeded batch is reproducible.
+    algorithm = BatchSimulatedAnnealing(
+        sudoku_tables,
+        min_temp,
+        max_temp,
+        cooling_rate,
+        restarts,
+        chain_generator(solver_options.get("seed"), process_ids[0]),
+        solver_options.get("max_iterations"),
+        solver_options.get("time_limit"),
+    )
+    algorithm.run()
+    best_states, best_fitness, chains = algorithm.best_per_puzzle()
+    elapsed = time.perf_counter() - start
+
+    results = []
+    for process_id, best_state, fitness, chain in zip(
+        process_ids, best_states, best_fitness, chains
+    ):
+        final_solution_path = os.path.join(
+            "final_solutions", f"solution_{process_id}.csv"
+        )
+        save_solution(final_solution_path, best_state.tolist())
+        results.append(
+            PuzzleResult(
+                final_solution_path,
+                None,
+                int(fitness),
+                int(algorithm.iterations[chain]),
+                elapsed,
+                process_id,
+                run_status="solved" if fitness == 0 else algorithm.status,
+            )
+        )
+    return results
+
+
+def run_batch_task(params: tuple) -> list:
+    """
+    Runs run_batch_simulated_annealing on a group of puzzles, capturing any exception like run_task.
+
+    Args:
+        params (tuple): The parameters of run_batch_simulated_annealing.
+
+    Returns:
+        A list with the PuzzleResult of each puzzle of the group; if solving the group failed,
+        every result has the error field set.
+    """
+    start = time.perf_counter()
+    try:
+        return run_batch_simulated_annealing(params)
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        elapsed = time.perf_counter() - start
+        return [
+            PuzzleResult(None, None, None, None, elapsed, process_id, error)
+            for process_id in params[5]
+        ]
+
+
+def group_puzzles(processes_parameters, group_size: int, restarts: int = 1):
+    """
+    Groups the parameter tuples of single puzzles, as taken by run_simulated_annealing, into the parameter tuples
+    of run_batch_simulated_annealing. A group takes its temperatures, cooling rate and solver options from its first puzzle.
+
+    Args:
+        processes_parameters: An iterable of run_simulated_annealing parameter tuples.
+        group_size (int): The maximum number of puzzles in a group.
+        restarts (int): The number of restarts of each puzzle.
+
+    Yields:
+        The parameter tuple of each group.
+    """
+    processes_parameters = iter(processes_parameters)
+    while group := list(islice(processes_parameters, group_size)):
+        _, min_temp, max_temp, cooling_rate, _, *rest = group[0]
+        yield (
+            [params[0] for params in group],
+            min_temp,
+            max_temp,
+            cooling_rate,
+            restarts,
+            [params[4] for params in group],
+            rest[0] if rest else {},
+        )
+
+
+def save_solution(final_solution_path: str, table: list[list[int]]) -> None:
+    """
+    Saves a Sudoku table to a CSV file, one row of the grid per line.
+
+    Args:
+        final_solution_path (str): Path of the CSV file to write.
+        table (list[list[int]]): The Sudoku table to save.
+    """
+    with open(final_solution_path, "w", newline="") as file:
+        writer = csv.writer(file)
+        for row in table:
+            writer.writerow(row)
+
+
+def solve_all(
+    processes_parameters,
+    processes: int,
+    chunksize: int = 1,
+    results_path: str = "results.csv",
+    task=run_task,
+    manifest: Manifest = None,
+    retry_failed: bool = False,
+    archive: RunArchiveWriter = None,
+    group=None,
+):
+    """
+    Solves puzzles on a process pool, streaming tasks in and results out.
+
+    Tasks are submitted lazily with a bounded number in flight, so the parameters are never all materialized.
+    Each result is appended to the results CSV file (and flushed) as soon as its puzzle finishes.
+    With a manifest, the puzzles it records as completed are skipped and every change of status is recorded.
+    With a run archive, every run is added to it and the results point to it as their solution path.
+
+    Args:
+        processes_parameters: An iterable of run_simulated_annealing parameter tuples.
+        processes (int): The number of worker processes.
+        chunksize (int): The number of tasks sent to a worker at a time.
+        results_path (str): Path of the CSV file summarizing every puzzle.
+        task: The function run on every parameter tuple; it must return a PuzzleResult, or with an archive
+              the tuple returned by run_archived_task.
+        manifest (Manifest): Optional manifest of the batch.
+        retry_failed (bool): Whether to solve again the puzzles the manifest records as failed.
+        archive (RunArchiveWriter): Optional run archive receiving the solution and trace of every puzzle.
+        group: Optional function turning the parameter tuples of the puzzles left to solve into those of groups
+               of puzzles, such as group_puzzles; task then returns a list of PuzzleResults per group.
+
+    Returns:
+        A list with the PuzzleResult of every puzzle solved by this call, in completion order.
+    """
+    # The pool's feeder thread pulls tasks through this generator and blocks once
+    # enough tasks are in flight; every completed result releases one slot.
+    in_flight = threading.BoundedSemaphore(max(4 * processes * chunksize, 1))
+
+    tasks = pending_tasks(processes_parameters, manifest, retry_failed)
+    if group is not None:
+        tasks = group(tasks)
+
+    def bounded_tasks():
+        for params in tasks:
+            in_flight.acquire()
+            yield params
+
+    results = []
+    with open_results(results_path, manifest) as (file, writer), Pool(
+        processes=processes
+    ) as pool:
+        for output in pool.imap_unordered(task, bounded_tasks(), chunksize):
+            in_flight.release()
+            for result in output if group is not None else [output]:
+                if archive is not None:
+                    result, best_state, trace = result
+                    archive.add(
+                        result.process_id,
+                        best_state,
+                        result.fitness,
+                        result.iterations,
+                        result.elapsed,
+                        "error" if result.error else result.run_status,
+                        trace,
+                    )
+                    result = result._replace(final_solution_path=archive.path)
+                results.append(result)
+                report_result(result, writer, file, len(results), manifest)
+    return results
+
+
+def solve_one_by_one(
+    processes_parameters,
+    processes: int,
+    results_path: str = "results.csv",
+    task=run_parallel_tempering,
+    initializer=None,
+    initargs=(),
+    manifest: Manifest = None,
+    retry_failed: bool = False,
+):
+    """
+    Solves puzzles one after the other, each one using the whole process pool (as parallel tempering does).
+    A manifest is used as in solve_all.
+
+    Args:
+        processes_parameters: An iterable of parameter tuples for task.
+        processes (int): The number of worker processes.
+        results_path (str): Path of the CSV file summarizing every puzzle.
+        task: The function run on every parameter tuple with the pool; it must return a PuzzleResult.
+        initializer: Optional function run by every worker process when it starts.
+        initargs (tuple): The arguments of initializer.
+        manifest (Manifest): Optional manifest of the batch.
+        retry_failed (bool): Whether to solve again the puzzles the manifest records as failed.
+
+    Returns:
+        A list with the PuzzleResult of every puzzle solved by this call.
+    """
+    results = []
+    with open_results(results_path, manifest) as (file, writer), Pool(
+        processes, initializer, initargs
+    ) as pool:
+        for params in pending_tasks(processes_parameters, manifest, retry_failed):
+            start = time.perf_counter()
+            try:
+                result = task(params, pool)
+            except Exception as exc:
+                result = PuzzleResult(
+                    None,
+                    None,
+                    None,
+                    None,
+                    time.perf_counter() - start,
+                    params[4],
+                    f"{type(exc).__name__}: {exc}",
+                )
+            results.append(result)
+            report_result(result, writer, file, len(results), manifest)
+    return results
+
+
+def init_shared_worker(
+    batch: SharedBatch,
+    min_temp: float,
+    max_temp: float,
+    cooling_rate: float,
+    solver_options: dict,
+) -> None:
+    """
+    Installs a shared batch and the parameters of its runs in a worker, so that its tasks are bare indices.
+    Used as the initializer of the pool of solve_shared.
+    """
+    global _shared_task
+    _shared_task = (batch, min_temp, max_temp, cooling_rate, solver_options)
+
+
+def run_shared_task(index: int) -> tuple:
+    """
+    Solves one puzzle of the shared batch on a worker and writes its result into the results block.
+
+    Args:
+        index (int): The index of the puzzle in the batch, also its process ID.
+
+    Returns:
+        tuple: The index, and the description of the exception raised while solving, if any.
+    """
+    start = time.perf_counter()
+    batch, min_temp, max_temp, cooling_rate, solver_options = _shared_task
+    try:
+        best_state, fitness, _, algorithm = solve_puzzle(
+            batch.puzzle(index),
+            min_temp,
+            max_temp,
+            cooling_rate,
+            index,
+            solver_options,
+        )
+    except Exception as exc:
+        batch.store_result(index, None, -1, 0, time.perf_counter() - start, "error")
+        return index, f"{type(exc).__name__}: {exc}"
+    batch.store_result(
+        index,
+        best_state,
+        fitness,
+        algorithm.iterations if algorithm is not None else 0,
+        time.perf_counter() - start,
+        algorithm.status if algorithm is not None else "solved",
+    )
+    return index, None
+
+
+def solve_shared(
+    batch: SharedBatch,
+    processes: int,
+    min_temp: float,
+    max_temp: float,
+    cooling_rate: float,
+    solver_options: dict = None,
+    chunksize: int = 1,
+    results_path: str = "results.csv",
+    solutions_path: str = os.path.join(
+        "final_solutions", "solutions" + STORE_EXTENSION
+    ),
+    manifest: Manifest = None,
+    retry_failed: bool = False,
+) -> list:
+    """
+    Solves the puzzles of a shared batch on a process pool. Workers receive only the indices of the puzzles
+    and write their results into the shared results block; the parent reports each result from the block as it
+    completes, then writes every solution at once to a puzzle store (with the puzzles and their solutions),
+    instead of one CSV file per puzzle. No trace files are written.
+
+    Args:
+        batch (SharedBatch): The puzzles; their indices are their process IDs.
+        processes (int): The number of worker processes.
+        min_temp, max_temp, cooling_rate: The parameters of the runs.
+        solver_options (dict): Keyword arguments for SimulatedAnnealing, shared by every run, as in solve_puzzle.
+        chunksize (int): The number of indices sent to a worker at a time.
+        results_path (str): Path of the CSV file summarizing every puzzle.
+        solutions_path (str): Path of the puzzle store receiving the solutions. When resuming, the solutions
+                              of the puzzles completed by the previous runs are read back from it.
+        manifest (Manifest): Optional manifest of the batch.
+        retry_failed (bool): Whether to solve again the puzzles the manifest records as failed.
+
+    Returns:
+        A list with the PuzzleResult of every puzzle solved by this call, in completion order.
+    """
+    if manifest is not None and manifest.entries and os.path.exists(solutions_path):
+        with PuzzleStore(solutions_path) as previous:
+            if (
+                previous.solutions is not None
+                and previous.puzzles.shape == batch.puzzles.shape
+            ):
+                batch.results["solution"] = previous.solutions
+
+    def pending_indices():
+        for index in range(len(batch)):
+            if manifest is not None:
+                if manifest.completed(index, retry_failed):
+                    continue
+                manifest.mark(index, "running")
+            yield index
+
+    options = dict(solver_options or {})
+    options["trace"] = NoTrace()
+    results = []
+    try:
+        with open_results(results_path, manifest) as (file, writer), Pool(
+            processes,
+            init_shared_worker,
+            (batch, min_temp, max_temp, cooling_rate, options),
+        ) as pool:
+            for index, error in pool.imap_unordered(
+                run_shared_task, pending_indices(), chunksize
+            ):
+                record = batch.results[index]
+                result = PuzzleResult(
+                    solutions_path,
+                    None,
+                    None if error else int(record["fitness"]),
+                    None if error else int(record["iterations"]),
+                    float(record["elapsed"]),
+                    index,
+                    error,
+                    None if error else batch.status(index),
+                )
+                results.append(result)
+                report_result(result, writer, file, len(results), manifest)
+    finally:
+        # One write for the whole batch, even if it was interrupted, so that resuming keeps the solutions.
+        temporary_path = solutions_path + ".tmp"
+        write_puzzle_store(
+            temporary_path,
+            batch.puzzles,
+            batch.results["solution"],
+            batch.table_size,
+        )
+        os.replace(temporary_path, solutions_path)
+    return results
+
+
+def read_shared_batch(file_path: str) -> SharedBatch:
+    """
+    Reads all the puzzles of a puzzle store or CSV file into a new SharedBatch.
+    """
+    if file_path.endswith(STORE_EXTENSION):
+        store = open_store(file_path)
+        batch = SharedBatch(len(store), store.table_size)
+        batch.puzzles[:] = store.puzzles
+        return batch
+    return SharedBatch.from_puzzles(list(iter_sudoku_csv(file_path)))
+
+
+def pending_tasks(processes_parameters, manifest: Manifest = None, retry_failed=False):
+    """
+    Filters out the puzzles a manifest records as completed, and marks the others as running
+    as they are handed out.
+
+    Args:
+        processes_parameters: An iterable of parameter tuples, whose fifth element is the process ID.
+        manifest (Manifest): The manifest of the batch. Without one, every puzzle is yielded.
+        retry_failed (bool): Whether to yield the puzzles the manifest records as failed.
+
+    Yields:
+        The parameter tuples of the puzzles left to solve.
+    """
+    for params in processes_parameters:
+        if manifest is not None:
+            if manifest.completed(params[4], retry_failed):
+                continue
+            manifest.mark(params[4], "running")
+        yield params
+
+
+@contextmanager
+def open_results(results_path: str, manifest: Manifest = None):
+    """
+    Opens the results CSV file of a batch. A batch resumed from a manifest with records appends to the file
+    of the previous runs; otherwise the file is created with its header.
+
+    Yields:
+        tuple: The file and its csv.writer.
+    """
+    append = (
+        manifest is not None and bool(manifest.entries) and os.path.exists(results_path)
+    )
+    with open(results_path, "a" if append else "w", newline="") as file:
+        writer = csv.writer(file)
+        if not append:
+            writer.writerow(RESULTS_HEADER)
+        yield file, writer
+
+
+def report_result(
+    result: PuzzleResult, writer, file, done: int, manifest: Manifest = None
+) -> None:
+    """
+    Appends a result to the results CSV file, flushes it, and prints a progress line.
+
+    Args:
+        result (PuzzleResult): The result to report.
+        writer (csv.writer): The writer of the results file.
+        file: The results file, flushed so that results are visible while the batch runs.
+        done (int): The number of puzzles completed so far.
+        manifest (Manifest): Optional manifest of the batch, where the result is recorded too.
+    """
+    writer.writerow(result.row())
+    file.flush()
+    if manifest is not None:
+        manifest.record_result(result)
+    if result.error:
+        print(f"Puzzle {result.process_id} failed: {result.error}")
+    else:
+        print(
+            f"Puzzle {result.process_id}: fitness {result.fitness} after "
+            f"{result.iterations} iterations in {result.elapsed:.2f}s "
+            f"({done} done)."
+        )
+
+
+def batch_metadata(args: argparse.Namespace, file_path: str) -> dict:
+    """
+    Describes a batch for its run archive: the puzzle file, the schedule and budget of the runs, and when
+    the batch started. Each chain draws from the stream of its process ID in the batch seed (see rng.chain_generator),
+    so the seed and the process ID of a run are enough to reproduce it.
+    """
+    return {
+        "puzzles": os.path.abspath(file_path),
+        "mode": args.mode,
+        "min_temp": args.min_temp,
+        "max_temp": args.max_temp,
+        "cooling_rate": args.cooling_rate,
+        "schedule": args.schedule,
+        "schedule_iterations": args.schedule_iterations,
+        "reheat": args.reheat,
+        "calibrate": args.calibrate,
+        "seed": args.seed,
+        "presolve": args.presolve,
+        "finish_below": args.finish_below,
+        "restart_after": args.restart_after,
+        "max_restarts": args.max_restarts,
+        "max_iterations": args.max_iterations,
+        "time_limit": args.time_limit,
+        "trace": args.trace,
+        "trace_value": args.trace_value,
+        "processes": args.processes,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parses the command line options of the solver.
+    """
+    parser = argparse.ArgumentParser(
+        description="Solve Sudoku puzzles in parallel with Simulated Annealing."
+    )
+    parser.add_argument(
+        "file_path",
+        nargs="?",
+        help="Puzzle store or CSV file with the puzzles. Defaults to ../quiz/sudoku_quiz"
+        f"{STORE_EXTENSION} if it exists, otherwise ../quiz/sudoku_quiz.csv.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=("anneal", "tempering", "race", "batch"),
+        default="anneal",
+        help="'anneal' runs one chain per puzzle with one puzzle per process; "
+        "'tempering' solves one puzzle at a time with replicas on every process; "
+        "'race' solves one puzzle at a time with independent restarts racing on every process; "
+        "'batch' runs groups of puzzles in lockstep in every process with the vectorized annealer.",
+    )
+    parser.add_argument("--min-temp", type=float, default=1e-7)
+    parser.add_argument("--max-temp", type=float, default=1e8)
+    parser.add_argument("--cooling-rate", type=float, default=0.999)
+    parser.add_argument(
+        "--schedule",
+        choices=SCHEDULES,
+        default="geometric",
+        help="Cooling schedule of the anneal and race modes.",
+    )
+    parser.add_argument(
+        "--schedule-iterations",
+        type=int,
+        help="Length of the linear schedule, in iterations.",
+    )
+    parser.add_argument(
+        "--reheat",
+        type=int,
+        metavar="PATIENCE",
+        help="Reheat after this many iterations without improvement.",
+    )
+    parser.add_argument(
+        "--calibrate",
+        type=float,
+        nargs="?",
+        const=0.8,
+        metavar="ACCEPTANCE",
+        help="Calibrate the starting temperature on each puzzle so that an average worsening move "
+        "is accepted with this probability (default 0.8), instead of using --max-temp.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Seed of the batch in the anneal, race and batch modes; each puzzle (each group in batch mode) "
+        "draws from its own stream, so a run is reproducible whatever the number of processes.",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=available_cpus(),
+        help="Number of worker processes (default: available CPUs).",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=1,
+        help="Number of puzzles sent to a worker at a time.",
+    )
+    parser.add_argument(
+        "--max-iterations",
+        type=int,
+        help="Iteration budget per puzzle.",
+    )
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        help="Wall-clock budget per puzzle, in seconds.",
+    )
+    parser.add_argument(
+        "--trace",
+        choices=TRACE_POLICIES,
+        default="all",
+        help="Which iterations to record in the additional information files.",
+    )
+    parser.add_argument(
+        "--trace-value",
+        type=int,
+        help="Period for 'every', points per decade for 'log', or size for 'ring'.",
+    )
+    parser.add_argument(
+        "--restarts",
+        type=int,
+        help="Number of restarts in race mode (default: the number of processes), "
+        "or of each puzzle in batch mode (default: 1).",
+    )
+    parser.add_argument(
+        "--group-size",
+        type=int,
+        default=64,
+        help="Number of puzzles annealed together by a process in batch mode.",
+    )
+    parser.add_argument(
+        "--replicas",
+        type=int,
+        default=8,
+        help="Number of replicas in tempering mode.",
+    )
+    parser.add_argument(
+        "--sweep",
+        type=int,
+        default=1000,
+        help="Iterations between replica exchanges in tempering mode.",
+    )
+    parser.add_argument(
+        "--ladder",
+        type=float,
+        nargs=2,
+        default=(0.2, 2.0),
+        metavar=("COLDEST", "HOTTEST"),
+        help="Temperatures of the coldest and hottest replicas in tempering mode.",
+    )
+    parser.add_argument(
+        "--presolve",
+        action="store_true",
+        help="Fill the cells deduced by constraint propagation before annealing.",
+    )
+    parser.add_argument(
+        "--finish-below",
+        type=int,
+        metavar="FITNESS",
+        help="In anneal and race modes, complete the runs stalled at a best fitness of at most FITNESS "
+        "with an exact search.",
+    )
+    parser.add_argument(
+        "--finish-patience",
+        type=int,
+        default=10_000,
+        metavar="N",
+        help="Iterations without improvement after which a run near a solution is completed (default: 10000).",
+    )
+    parser.add_argument(
+        "--restart-after",
+        type=int,
+        metavar="PATIENCE",
+        help="In anneal and race modes, restart a chain from a new random board when its best fitness "
+        "has not improved for PATIENCE iterations.",
+    )
+    parser.add_argument(
+        "--max-restarts",
+        type=int,
+        default=3,
+        help="Restarts per run with --restart-after; a run stagnating once more ends (default: 3).",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="In anneal mode, save run counters and timings to additional_info/stats_<id>.json.",
+    )
+    parser.add_argument(
+        "--progress",
+        type=int,
+        metavar="N",
+        help="In anneal mode, print the progress of each run every N iterations.",
+    )
+    parser.add_argument(
+        "--results",
+        default="results.csv",
+        help="CSV file summarizing the outcome of every puzzle.",
+    )
+    parser.add_argument(
+        "--manifest",
+        default="manifest.jsonl",
+        help="File recording the status of every puzzle of the batch.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip the puzzles the manifest records as completed, and resume the checkpointed chains.",
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="With --resume, solve again the puzzles that ended unsolved.",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        metavar="N",
+        help="In anneal mode, checkpoint each chain every N iterations so that --resume continues it.",
+    )
+    parser.add_argument(
+        "--shared",
+        action="store_true",
+        help="In anneal mode, send the puzzles to the workers through shared memory and write all the solutions "
+        "to final_solutions/solutions.sdb at the end, without per-puzzle files.",
+    )
+    parser.add_argument(
+        "--archive",
+        metavar="PATH",
+        help="In anneal mode, write the solutions, traces and run parameters of the whole batch to a single "
+        f"run archive (for example runs{ARCHIVE_EXTENSION}) instead of per-puzzle files.",
+    )
+    parser.add_argument(
+        "--cache",
+        metavar="PATH",
+        help="In anneal mode, SQLite database of solved puzzles: repeated and equivalent puzzles "
+        "are answered from it instead of being annealed.",
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        default="checkpoints",
+        help="Directory of the chain checkpoints.",
+    )
+    args = parser.parse_args(argv)
+    if args.mode == "batch":
+        # The batch annealer cools geometrically and writes one solution file per puzzle.
+        unsupported = [
+            option
+            for option, used in (
+                ("--schedule", args.schedule != "geometric"),
+                ("--schedule-iterations", args.schedule_iterations is not None),
+                ("--reheat", args.reheat is not None),
+                ("--calibrate", args.calibrate is not None),
+                ("--finish-below", args.finish_below is not None),
+                ("--restart-after", args.restart_after is not None),
+                ("--stats", args.stats),
+                ("--progress", args.progress is not None),
+                ("--checkpoint-every", args.checkpoint_every is not None),
+                ("--shared", args.shared),
+                ("--archive", args.archive is not None),
+                ("--cache", args.cache is not None),
+            )
+            if used
+        ]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be used with --mode batch.")
+    return args
 
 
 if __name__ == "__main__":
-    print("Reading Sudoku puzzles from CSV file...")
-    file_path = "../quiz/sudoku_quiz.csv"  # Path to the CSV file with puzzles
-    sudoku_grids = read_sudoku_csv(file_path)
-    print(f"Found {len(sudoku_grids)} puzzles.")
+    args = parse_args()
+
+    print("Reading Sudoku puzzles...")
+    file_path = args.file_path
+    if file_path is None:
+        file_path = "../quiz/sudoku_quiz" + STORE_EXTENSION  # Path to the puzzle store
+        if not os.path.exists(file_path):
+            file_path = (
+                "../quiz/sudoku_quiz.csv"  # Fall back to the CSV file with puzzles
+            )
 
     # Prepare output directories
     os.makedirs("final_solutions", exist_ok=True)
     os.makedirs("additional_info", exist_ok=True)
 
-    # Prepare parameters for each process in multiprocessing
-    processes_parameters = [
-        (sudoku, 1e-7, 1e8, 0.999, i) for i, sudoku in enumerate(sudoku_grids)
-    ]
+    manifest = Manifest(args.manifest, resume=args.resume)
+    if args.resume:
+        print(f"Resuming batch: {manifest.counts()}")
+    elif os.path.isdir(args.checkpoint_dir):
+        clear_checkpoints(args.checkpoint_dir)  # Stale chains of an earlier batch.
 
-    print("Starting simulated annealing process on all puzzles...")
-    with Pool(processes=8) as pool:  # Use 8 parallel processes
-        pool.map(run_simulated_annealing, processes_parameters)
+    trace = make_trace(args.trace, args.trace_value)
+    if args.mode == "tempering":
+        solver_options = {
+            "sweep": args.sweep,
+            "time_limit": args.time_limit,
+            "trace": trace,
+            "presolve": args.presolve,
+        }
+        if args.max_iterations is not None:
+            solver_options["max_rounds"] = max(args.max_iterations // args.sweep, 1)
+        processes_parameters = (
+            (sudoku, *args.ladder, args.replicas, i, solver_options)
+            for i, sudoku in enumerate(iter_puzzles(file_path))
+        )
 
-    print("All solutions and additional information have been successfully saved.")
+        print(f"Starting parallel tempering with {args.replicas} replicas...")
+        results = solve_one_by_one(
+            processes_parameters,
+            min(args.processes, args.replicas),
+            args.results,
+            manifest=manifest,
+            retry_failed=args.retry_failed,
+        )
+    else:
+        solver_options = {
+            "trace": trace,
+            "max_iterations": args.max_iterations,
+            "time_limit": args.time_limit,
+            "presolve": args.presolve,
+            "calibrate": args.calibrate,
+            "seed": args.seed,
+            "finish_below": args.finish_below,
+            "finish_patience": args.finish_patience,
+            "restart_patience": args.restart_after,
+            "max_restarts": args.max_restarts,
+        }
+        if args.schedule != "geometric" or args.reheat:
+            solver_options["schedule"] = make_schedule(
+                args.schedule,
+                args.cooling_rate,
+                args.schedule_iterations,
+                args.reheat,
+            )
+
+        if args.mode == "anneal" and (args.stats or args.progress):
+            solver_options["observer"] = (
+                RunStats(print_progress, args.progress) if args.progress else RunStats()
+            )
+        if args.mode == "anneal" and args.cache:
+            solver_options["cache"] = args.cache
+        if args.mode == "anneal" and args.checkpoint_every:
+            solver_options["checkpoint_dir"] = args.checkpoint_dir
+            solver_options["checkpoint_every"] = args.checkpoint_every
+
+        # Parameters for each process are generated lazily as the pool asks for work
+        processes_parameters = (
+            (sudoku, args.min_temp, args.max_temp, args.cooling_rate, i, solver_options)
+            for i, sudoku in enumerate(iter_puzzles(file_path))
+        )
+
+        if args.mode == "batch":
+            print(
+                f"Starting batch annealing of {args.group_size} puzzles per group on {args.processes} processes..."
+            )
+            results = solve_all(
+                processes_parameters,
+                args.processes,
+                args.chunksize,
+                args.results,
+                run_batch_task,
+                manifest=manifest,
+                retry_failed=args.retry_failed,
+                group=partial(
+                    group_puzzles,
+                    group_size=args.group_size,
+                    restarts=args.restarts or 1,
+                ),
+            )
+        elif args.mode == "race":
+            restarts = args.restarts or args.processes
+            stop_flag = Value("b", 0, lock=False)
+            init_race_worker(stop_flag)
+
+            print(
+                f"Starting {restarts} racing restarts per puzzle on {args.processes} processes..."
+            )
+            results = solve_one_by_one(
+                processes_parameters,
+                args.processes,
+                args.results,
+                partial(race_simulated_annealing, restarts=restarts),
+                init_race_worker,
+                (stop_flag,),
+                manifest=manifest,
+                retry_failed=args.retry_failed,
+            )
+        elif args.shared:
+            print(
+                f"Starting simulated annealing on {args.processes} processes, from shared memory..."
+            )
+            with read_shared_batch(file_path) as batch:
+                results = solve_shared(
+                    batch,
+                    args.processes,
+                    args.min_temp,
+                    args.max_temp,
+                    args.cooling_rate,
+                    solver_options,
+                    args.chunksize,
+                    args.results,
+                    manifest=manifest,
+                    retry_failed=args.retry_failed,
+                )
+        elif args.archive:
+            print(
+                f"Starting simulated annealing on {args.processes} processes, archiving to {args.archive}..."
+            )
+            archive = RunArchiveWriter(
+                args.archive, metadata=batch_metadata(args, file_path)
+            )
+            if args.resume and os.path.exists(args.archive):
+                with RunArchive(args.archive) as previous:
+                    archive.extend(previous)
+            start = time.perf_counter()
+            try:
+                results = solve_all(
+                    processes_parameters,
+                    args.processes,
+                    args.chunksize,
+                    args.results,
+                    run_archived_task,
+                    manifest=manifest,
+                    retry_failed=args.retry_failed,
+                    archive=archive,
+                )
+            finally:
+                # Written even if the batch is interrupted, so that resuming keeps its runs.
+                archive.metadata["elapsed"] = time.perf_counter() - start
+                archive.close()
+        else:
+            print(f"Starting simulated annealing on {args.processes} processes...")
+            results = solve_all(
+                processes_parameters,
+                args.processes,
+                args.chunksize,
+                args.results,
+                manifest=manifest,
+                retry_failed=args.retry_failed,
+            )
+    manifest.close()
+
+    failed = sum(1 for result in results if result.error)
+    solved = sum(1 for result in results if result.fitness == 0)
+    print(
+        f"{len(results)} puzzles processed: {solved} solved, {failed} failed. "
+        f"Summary written to {args.results}."
+    )
+    run_statuses = Counter(
+        result.run_status for result in results if result.run_status is not None
+    )
+    if run_statuses:
+        print(
+            "Runs ended: "
+            + ", ".join(f"{count} {status}" for status, count in run_statuses.items())
+            + "."
+        )
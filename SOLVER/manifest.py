@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+
+MANIFEST_STATUSES = ("pending", "running", "solved", "failed")
+
+
+class Manifest:
+    """
+    This class records the status of every puzzle of a batch, so that an interrupted batch can be resumed.
+    The manifest is a journal in JSON lines: every change of status appends one record, flushed at once,
+    and the last record of a puzzle wins. Appending costs the same whatever the size of the batch, and a batch
+    killed while writing loses at most its last, truncated line, which is ignored when the manifest is read back.
+
+    A puzzle is pending until it is handed to the pool, running until its result comes back,
+    then solved (fitness 0) or failed (a positive fitness, or an error).
+    """
+
+    def __init__(self, path: str, resume: bool = True) -> None:
+        """
+        Args:
+            path (str): The path of the manifest file.
+            resume (bool): Whether to keep the records of a previous batch; otherwise the manifest starts empty.
+        """
+        self.path = path
+        self.entries = {}  # Last record of each puzzle, keyed by process ID.
+        if resume and os.path.exists(path):
+            with open(path) as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Truncated by a kill.
+                    self.entries[record["process_id"]] = record
+        self._file = open(path, "a" if resume else "w")
+        # The pool's feeder thread marks puzzles as running while the main thread records results.
+        self._lock = threading.Lock()
+
+    def mark(self, process_id: int, status: str, **fields) -> None:
+        """
+        Records a new status for a puzzle.
+
+        Args:
+            process_id (int): The process ID of the puzzle.
+            status (str): One of MANIFEST_STATUSES.
+            fields: Extra values stored with the status, such as the fitness or the error.
+        """
+        if status not in MANIFEST_STATUSES:
+            raise ValueError(f"Unknown status {status!r}.")
+        record = {"process_id": process_id, "status": status, **fields}
+        with self._lock:
+            self.entries[process_id] = record
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def record_result(self, result) -> None:
+        """
+        Records the outcome of a puzzle.
+
+        Args:
+            result (PuzzleResult): The result returned by the solver.
+        """
+        self.mark(
+            result.process_id,
+            "solved" if result.status == "solved" else "failed",
+            fitness=result.fitness,
+            iterations=result.iterations,
+            elapsed=result.elapsed,
+            solution=result.final_solution_path,
+            error=result.error,
+            run_status=result.run_status,
+        )
+
+    def status(self, process_id: int) -> str:
+        """
+        Returns the status of a puzzle; puzzles without any record are pending.
+        """
+        return self.entries.get(process_id, {}).get("status", "pending")
+
+    def completed(self, process_id: int, retry_failed: bool = False) -> bool:
+        """
+        Returns whether a rerun can skip a puzzle: it was solved, or it failed with a fitness (the chain ran
+        to its end), and its solution file still exists. Puzzles that raised an error are always retried.
+
+        Args:
+            process_id (int): The process ID of the puzzle.
+            retry_failed (bool): Whether puzzles that failed with a fitness should be solved again.
+        """
+        record = self.entries.get(process_id)
+        if record is None or record["status"] not in ("solved", "failed"):
+            return False
+        if record["status"] == "failed" and (retry_failed or record.get("error")):
+            return False
+        solution = record.get("solution")
+        return solution is not None and os.path.exists(solution)
+
+    def counts(self) -> dict:
+        """
+        Returns the number of puzzles recorded in each status.
+        """
+        counts = dict.fromkeys(MANIFEST_STATUSES, 0)
+        for record in self.entries.values():
+            counts[record["status"]] += 1
+        return counts
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "Manifest":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,201 @@
+import math
+import time
+
+
+class Observer:
+    """
+    This class receives the events of an annealing run. SimulatedAnnealing.run calls its hooks only when an
+    observer is given, so a run without observer pays a single `is None` test per iteration.
+    The base class does nothing; subclasses override the hooks they need.
+    """
+
+    def start(self, temp: float, best_fitness: int) -> None:
+        """
+        Called once the initial board has been generated, before the first iteration.
+
+        Args:
+            temp (float): The starting temperature.
+            best_fitness (int): The fitness of the initial board.
+        """
+
+    def propose(self, state) -> int:
+        """
+        Proposes the move of an iteration on behalf of the annealer; must leave it pending as propose_move() does.
+
+        Args:
+            state (SingleSolution): The current state.
+
+        Returns:
+            int: The change in fitness of the pending move.
+        """
+        return state.propose_move()
+
+    def iteration(
+        self,
+        iteration: int,
+        temp: float,
+        delta: int,
+        accepted: bool,
+        best_fitness: int,
+    ) -> None:
+        """
+        Called at the end of every iteration.
+
+        Args:
+            iteration (int): The iteration number, starting at 1.
+            temp (float): The temperature of the iteration.
+            delta (int): The change in fitness of the proposed move.
+            accepted (bool): Whether the move was accepted.
+            best_fitness (int): The best fitness found so far.
+        """
+
+    def finish(self, iterations: int, best_fitness: int) -> None:
+        """
+        Called once when the run ends.
+
+        Args:
+            iterations (int): The number of iterations performed.
+            best_fitness (int): The best fitness found.
+        """
+
+
+class RunStats(Observer):
+    """
+    An observer that counts what the annealer does and where the time goes:
+    proposals, accepts and uphill accepts, acceptance per temperature band (one band per power of ten),
+    and the time spent drawing moves, evaluating their fitness change, and in the rest of the loop.
+    It can also call a function every `every` iterations, for progress reports or live tuning.
+    """
+
+    def __init__(self, callback=None, every: int = 10_000) -> None:
+        """
+        Args:
+            callback: Optional function called as callback(stats, iteration, temp, best_fitness) every `every` iterations.
+            every (int): The period of the callback, in iterations.
+        """
+        if every < 1:
+            raise ValueError("The callback period must be at least 1.")
+        self.callback = callback
+        self.every = every
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Clears every counter.
+        """
+        self.proposals = 0  # Moves proposed.
+        self.accepts = 0  # Moves accepted.
+        self.uphill_proposals = 0  # Proposed moves that would worsen the fitness.
+        self.uphill_accepts = 0  # Worsening moves accepted.
+        # bands[k] = [proposals, accepts] at temperatures in [10**k, 10**(k+1)).
+        self.bands = {}
+        self.mutation_time = 0.0  # Seconds spent drawing moves.
+        self.fitness_time = 0.0  # Seconds spent computing fitness changes.
+        self.elapsed = 0.0  # Seconds between start() and finish().
+        self.iterations = 0
+        self.start_temp = None
+        self.best_fitness = None
+        self._started = None
+
+    def start(self, temp: float, best_fitness: int) -> None:
+        self.reset()
+        self.start_temp = temp
+        self.best_fitness = best_fitness
+        self._started = time.perf_counter()
+
+    def propose(self, state) -> int:
+        # Same as SingleSolution.propose_move(), timed phase by phase.
+        started = time.perf_counter()
+        row1, col1, row2, col2 = state.moves.draw()
+        drawn = time.perf_counter()
+        delta = state.swap_delta(row1, col1, row2, col2)
+        self.fitness_time += time.perf_counter() - drawn
+        self.mutation_time += drawn - started
+        state.pending_move = (row1, col1, row2, col2, delta)
+        return delta
+
+    def iteration(
+        self,
+        iteration: int,
+        temp: float,
+        delta: int,
+        accepted: bool,
+        best_fitness: int,
+    ) -> None:
+        self.proposals += 1
+        self.accepts += accepted
+        if delta > 0:
+            self.uphill_proposals += 1
+            self.uphill_accepts += accepted
+
+        key = temp_band(temp)
+        band = self.bands.get(key)
+        if band is None:
+            band = self.bands[key] = [0, 0]
+        band[0] += 1
+        band[1] += accepted
+
+        self.iterations = iteration
+        self.best_fitness = best_fitness
+        if self.callback is not None and iteration % self.every == 0:
+            self.callback(self, iteration, temp, best_fitness)
+
+    def finish(self, iterations: int, best_fitness: int) -> None:
+        self.elapsed = time.perf_counter() - self._started
+        self.iterations = iterations
+        self.best_fitness = best_fitness
+
+    @property
+    def bookkeeping_time(self) -> float:
+        """
+        Seconds spent outside move drawing and fitness evaluation: acceptance tests, best-state snapshots,
+        the trace, the schedule and this observer itself.
+        """
+        return max(self.elapsed - self.mutation_time - self.fitness_time, 0.0)
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.accepts / self.proposals if self.proposals else 0.0
+
+    @property
+    def iterations_per_second(self) -> float:
+        return self.iterations / self.elapsed if self.elapsed else 0.0
+
+    def band_rates(self) -> dict:
+        """
+        Returns the acceptance rate of every temperature band, keyed by the lowest temperature of the band.
+        """
+        return {
+            10.0**band: accepts / proposals
+            for band, (proposals, accepts) in sorted(self.bands.items())
+        }
+
+    def as_dict(self) -> dict:
+        """
+        Returns the counters as a dictionary of plain numbers, for logging or JSON output.
+        """
+        return {
+            "iterations": self.iterations,
+            "best_fitness": self.best_fitness,
+            "start_temp": self.start_temp,
+            "proposals": self.proposals,
+            "accepts": self.accepts,
+            "uphill_proposals": self.uphill_proposals,
+            "uphill_accepts": self.uphill_accepts,
+            "acceptance_rate": self.acceptance_rate,
+            "band_acceptance": {
+                f"{temp:g}": rate for temp, rate in self.band_rates().items()
+            },
+            "elapsed": self.elapsed,
+            "mutation_time": self.mutation_time,
+            "fitness_time": self.fitness_time,
+            "bookkeeping_time": self.bookkeeping_time,
+            "iterations_per_second": self.iterations_per_second,
+        }
+
+
+def temp_band(temp: float) -> int:
+    """
+    Returns the power of ten of the temperature band containing temp.
+    """
+    return math.floor(math.log10(temp)) if temp > 0 else -324
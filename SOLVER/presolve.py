@@ -0,0 +1,182 @@
+from solution import box_size_for
+from functools import lru_cache
+
+
+def all_digits(size: int) -> int:
+    """
+    Returns the bitmask of the digits 1..size. Candidate sets are bitmasks: bit d is set when digit d is allowed.
+    """
+    return (1 << (size + 1)) - 2
+
+
+@lru_cache(maxsize=None)
+def units(size: int) -> tuple:
+    """
+    Returns the 3 * size units (rows, columns and boxes) of a grid, as lists of (row, col) cells.
+    """
+    box_size = box_size_for(size)
+    return tuple(
+        [[(row, col) for col in range(size)] for row in range(size)]
+        + [[(row, col) for row in range(size)] for col in range(size)]
+        + [
+            [
+                (box_row + i, box_col + j)
+                for i in range(box_size)
+                for j in range(box_size)
+            ]
+            for box_row in range(0, size, box_size)
+            for box_col in range(0, size, box_size)
+        ]
+    )
+
+
+def box_index(row: int, col: int, box_size: int) -> int:
+    """
+    Returns the index of the box containing a cell, numbered row by row.
+    """
+    return (row // box_size) * box_size + col // box_size
+
+
+def used_masks(table: list[list[int]]) -> tuple:
+    """
+    Computes the digits already used in every row, column and box.
+
+    Args:
+        table (list of list of int): A Sudoku grid, with 0 for empty cells.
+
+    Returns:
+        tuple: Three lists of bitmasks, one per row, column and box.
+    """
+    size = len(table)
+    box_size = box_size_for(size)
+    rows = [0] * size
+    cols = [0] * size
+    boxes = [0] * size
+    for row in range(size):
+        for col in range(size):
+            value = table[row][col]
+            if value:
+                bit = 1 << value
+                rows[row] |= bit
+                cols[col] |= bit
+                boxes[box_index(row, col, box_size)] |= bit
+    return rows, cols, boxes
+
+
+def candidate_masks(table: list[list[int]]) -> list[list[int]]:
+    """
+    Computes the candidate bitmask of every cell: the digits not yet used in its row, column and box.
+
+    Args:
+        table (list of list of int): A Sudoku grid, with 0 for empty cells.
+
+    Returns:
+        list of list of int: The candidate bitmask of each cell, 0 for filled cells.
+    """
+    size = len(table)
+    box_size = box_size_for(size)
+    digits = all_digits(size)
+    rows, cols, boxes = used_masks(table)
+    return [
+        [
+            (
+                0
+                if table[row][col]
+                else digits
+                & ~(rows[row] | cols[col] | boxes[box_index(row, col, box_size)])
+            )
+            for col in range(size)
+        ]
+        for row in range(size)
+    ]
+
+
+def mask_to_set(mask: int) -> set:
+    """
+    Converts a candidate bitmask into the set of digits it contains.
+    """
+    return {digit for digit in range(1, mask.bit_length()) if mask >> digit & 1}
+
+
+def presolve(table: list[list[int]]) -> list[list[int]]:
+    """
+    Fills every cell that can be deduced with naked singles (a cell with a single candidate) and
+    hidden singles (a digit with a single possible cell in a unit), repeating until nothing changes.
+
+    Args:
+        table (list of list of int): A Sudoku grid, with 0 for empty cells. It is not modified.
+
+    Returns:
+        list of list of int: A new grid with the deduced cells filled in.
+
+    Raises:
+        ValueError: If the clues contradict each other, so the puzzle has no solution.
+    """
+    grid = [row[:] for row in table]
+    size = len(grid)
+    box_size = box_size_for(size)
+    digits = all_digits(size)
+    rows, cols, boxes = used_masks(grid)
+
+    def place(row: int, col: int, digit: int) -> None:
+        bit = 1 << digit
+        box = box_index(row, col, box_size)
+        if (rows[row] | cols[col] | boxes[box]) & bit:
+            raise ValueError(f"Digit {digit} cannot be placed at ({row}, {col}).")
+        grid[row][col] = digit
+        rows[row] |= bit
+        cols[col] |= bit
+        boxes[box] |= bit
+
+    changed = True
+    while changed:
+        changed = False
+
+        # Naked singles.
+        for row in range(size):
+            for col in range(size):
+                if grid[row][col]:
+                    continue
+                mask = digits & ~(
+                    rows[row] | cols[col] | boxes[box_index(row, col, box_size)]
+                )
+                if mask == 0:
+                    raise ValueError(f"Cell ({row}, {col}) has no candidates left.")
+                if mask & (mask - 1) == 0:
+                    place(row, col, mask.bit_length() - 1)
+                    changed = True
+
+        # Hidden singles: collect, for every unit, the cells that still accept each digit.
+        for unit in units(size):
+            seen_once = 0  # Digits with at least one possible cell in the unit.
+            seen_twice = 0  # Digits with at least two possible cells in the unit.
+            filled = 0
+            for row, col in unit:
+                if grid[row][col]:
+                    filled |= 1 << grid[row][col]
+                    continue
+                mask = digits & ~(
+                    rows[row] | cols[col] | boxes[box_index(row, col, box_size)]
+                )
+                seen_twice |= seen_once & mask
+                seen_once |= mask
+            if (seen_once | filled) != digits:
+                raise ValueError("A digit has no possible cell left in a unit.")
+            singles = seen_once & ~seen_twice
+            if not singles:
+                continue
+            for row, col in unit:
+                if grid[row][col]:
+                    continue
+                mask = digits & ~(
+                    rows[row] | cols[col] | boxes[box_index(row, col, box_size)]
+                )
+                single = mask & singles
+                if single:
+                    if single & (single - 1):
+                        raise ValueError(
+                            f"Cell ({row}, {col}) is the only place for two digits."
+                        )
+                    place(row, col, single.bit_length() - 1)
+                    changed = True
+    return grid
@@ -0,0 +1,248 @@
+from solution import TABLE_SIZE
+from typing import NamedTuple
+import mmap
+import os
+import struct
+import numpy as np
+
+# Layout of a puzzle store file:
+#   header    16 bytes: magic, format version, table size, flags, padding, puzzle count (little endian)
+#   puzzles   count * table_size**2 bytes, one byte per cell in row-major order, 0 for empty cells
+#   solutions same layout as the puzzles, present only when FLAG_SOLUTIONS is set
+STORE_MAGIC = b"SDKB"
+STORE_VERSION = 1
+STORE_EXTENSION = ".sdb"
+HEADER_FORMAT = "<4sBBBxQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+FLAG_SOLUTIONS = 1
+
+
+class PuzzleStore:
+    """
+    This class gives read-only, memory-mapped access to a binary puzzle store.
+    Opening a store only parses its header; puzzles are exposed as a (count, size, size) uint8 array view
+    over the mapped file, so pages are read from disk only when a puzzle is actually accessed.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Opens and maps a puzzle store.
+
+        Args:
+            path (str): Path of the store file.
+        """
+        self.path = path
+        self.file = open(path, "rb")
+        try:
+            header = self.file.read(HEADER_SIZE)
+            if len(header) != HEADER_SIZE:
+                raise ValueError(f"{path} is too short to be a puzzle store.")
+            magic, version, table_size, flags, count = struct.unpack(
+                HEADER_FORMAT, header
+            )
+            if magic != STORE_MAGIC:
+                raise ValueError(f"{path} is not a puzzle store.")
+            if version != STORE_VERSION:
+                raise ValueError(
+                    f"Unsupported puzzle store version {version} in {path}."
+                )
+
+            self.table_size = table_size
+            self.count = count
+            cells = count * table_size * table_size
+            sections = 2 if flags & FLAG_SOLUTIONS else 1
+            if os.fstat(self.file.fileno()).st_size < HEADER_SIZE + sections * cells:
+                raise ValueError(f"{path} is truncated.")
+
+            shape = (count, table_size, table_size)
+            if count:
+                self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.puzzles = np.frombuffer(
+                    self.mmap, np.uint8, cells, HEADER_SIZE
+                ).reshape(shape)
+                self.solutions = (
+                    np.frombuffer(
+                        self.mmap, np.uint8, cells, HEADER_SIZE + cells
+                    ).reshape(shape)
+                    if sections == 2
+                    else None
+                )
+            else:
+                # mmap cannot map an empty region, and there is nothing to map anyway.
+                self.mmap = None
+                self.puzzles = np.zeros(shape, dtype=np.uint8)
+                self.solutions = self.puzzles if sections == 2 else None
+        except Exception:
+            self.file.close()
+            raise
+
+    def __len__(self) -> int:
+        return self.count
+
+    def puzzle(self, index: int) -> list[list[int]]:
+        """
+        Returns one puzzle as a list of lists of integers, the representation used by SimulatedAnnealing.
+
+        Args:
+            index (int): Index of the puzzle in the store.
+        """
+        return self.puzzles[index].tolist()
+
+    def solution(self, index: int) -> list[list[int]]:
+        """
+        Returns the known solution of one puzzle as a list of lists of integers.
+
+        Args:
+            index (int): Index of the puzzle in the store.
+        """
+        if self.solutions is None:
+            raise ValueError(f"{self.path} does not contain solutions.")
+        return self.solutions[index].tolist()
+
+    def close(self) -> None:
+        """
+        Unmaps and closes the store. Arrays previously returned by the store must not be used afterwards.
+        """
+        self.puzzles = self.solutions = None
+        if self.mmap is not None:
+            self.mmap.close()
+            self.mmap = None
+        self.file.close()
+
+    def __enter__(self) -> "PuzzleStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class PuzzleStoreWriter:
+    """
+    This class writes a puzzle store incrementally, so arbitrarily large datasets can be converted in one pass.
+    Solutions are spooled to a temporary file and appended after the puzzles when the writer is closed.
+    """
+
+    def __init__(
+        self, path: str, with_solutions: bool = False, table_size: int = TABLE_SIZE
+    ) -> None:
+        """
+        Creates the store file and reserves space for its header.
+
+        Args:
+            path (str): Path of the store file to create.
+            with_solutions (bool): Whether a solution is written along with every puzzle.
+            table_size (int): The size of each side of the grids.
+        """
+        self.path = path
+        self.table_size = table_size
+        self.cells = table_size * table_size
+        self.with_solutions = with_solutions
+        self.count = 0
+        self.file = open(path, "wb")
+        self.file.write(bytes(HEADER_SIZE))
+        self.solutions_path = path + ".solutions.tmp"
+        self.solutions_file = (
+            open(self.solutions_path, "wb") if with_solutions else None
+        )
+
+    def write(self, puzzles, solutions=None) -> None:
+        """
+        Appends puzzles, and their solutions if the store has them.
+
+        Args:
+            puzzles: Array-like of shape (N, size, size) or (N, size * size) with one value per cell.
+            solutions: Array-like with the same shape as puzzles, required when the store has solutions.
+        """
+        puzzles = np.ascontiguousarray(puzzles, dtype=np.uint8).reshape(-1, self.cells)
+        if self.with_solutions:
+            if solutions is None:
+                raise ValueError("This store requires a solution for every puzzle.")
+            solutions = np.ascontiguousarray(solutions, dtype=np.uint8).reshape(
+                -1, self.cells
+            )
+            if len(solutions) != len(puzzles):
+                raise ValueError("Every puzzle needs exactly one solution.")
+            self.solutions_file.write(solutions.tobytes())
+        self.file.write(puzzles.tobytes())
+        self.count += len(puzzles)
+
+    def close(self) -> None:
+        """
+        Appends the solutions section, writes the final header and closes the store.
+        """
+        if self.file.closed:
+            return
+        flags = 0
+        if self.with_solutions:
+            flags |= FLAG_SOLUTIONS
+            self.solutions_file.close()
+            with open(self.solutions_path, "rb") as solutions_file:
+                while block := solutions_file.read(1 << 24):
+                    self.file.write(block)
+            os.remove(self.solutions_path)
+        self.file.seek(0)
+        self.file.write(
+            struct.pack(
+                HEADER_FORMAT,
+                STORE_MAGIC,
+                STORE_VERSION,
+                self.table_size,
+                flags,
+                self.count,
+            )
+        )
+        self.file.close()
+
+    def __enter__(self) -> "PuzzleStoreWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_puzzle_store(
+    path: str, puzzles, solutions=None, table_size: int = TABLE_SIZE
+) -> None:
+    """
+    Writes a complete puzzle store in one call.
+
+    Args:
+        path (str): Path of the store file to create.
+        puzzles: Array-like of shape (N, size, size) with one value per cell.
+        solutions: Optional array-like with the same shape, holding the solution of each puzzle.
+        table_size (int): The size of each side of the grids.
+    """
+    with PuzzleStoreWriter(path, solutions is not None, table_size) as writer:
+        writer.write(puzzles, solutions)
+
+
+_open_stores = {}  # Stores opened by this process, keyed by path.
+
+
+def open_store(path: str) -> PuzzleStore:
+    """
+    Returns a PuzzleStore for the given path, reusing the one already opened by this process if any.
+    Workers call this so that each process maps a store only once.
+
+    Args:
+        path (str): Path of the store file.
+    """
+    store = _open_stores.get(path)
+    if store is None:
+        store = _open_stores[path] = PuzzleStore(path)
+    return store
+
+
+class PuzzleRef(NamedTuple):
+    """
+    A lightweight reference to one puzzle of a store, cheap to send to worker processes.
+    """
+
+    path: str
+    index: int
+
+    def load(self) -> list[list[int]]:
+        """
+        Reads the referenced puzzle as a list of lists of integers.
+        """
+        return open_store(self.path).puzzle(self.index)
@@ -0,0 +1,38 @@
+import numpy as np
+
+BLOCK_SIZE = 4096  # Number of draws generated at a time by an annealing chain.
+
+
+def chain_generator(seed, process_id: int) -> np.random.Generator:
+    """
+    Creates the random generator of one annealing chain. The chains of a batch share the batch seed and are told
+    apart by their process ID, through the spawn key of a SeedSequence, so every chain gets an independent stream
+    that does not depend on the worker process or on the order in which the chains are run.
+
+    Args:
+        seed: The seed of the batch: an int, a sequence of ints, or None for fresh entropy.
+        process_id (int): The process ID of the chain.
+
+    Returns:
+        np.random.Generator: The generator of the chain.
+    """
+    return np.random.Generator(
+        np.random.PCG64(np.random.SeedSequence(seed, spawn_key=(process_id,)))
+    )
+
+
+def acceptance_thresholds(generator: np.random.Generator, count: int = BLOCK_SIZE):
+    """
+    Draws a block of acceptance thresholds. A move changing the fitness by delta at temperature temp is accepted
+    when delta < temp * threshold: with threshold = -log(u) for a uniform u, this is the Metropolis test
+    u < exp(-delta / temp), without computing an exponential at every iteration. Moves that do not worsen the
+    fitness are always accepted, since the thresholds are positive.
+
+    Args:
+        generator (np.random.Generator): The generator of the chain.
+        count (int): The number of thresholds.
+
+    Returns:
+        list of float: Exponentially distributed thresholds, as Python floats for fast indexing.
+    """
+    return generator.standard_exponential(count).tolist()
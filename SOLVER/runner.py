@@ -0,0 +1,127 @@
+from SA import SimulatedAnnealing
+from cache import open_cache
+from puzzle_store import PuzzleRef, STORE_EXTENSION, open_store
+import csv
+import os
+
+# The parts of the solver shared by its command line tools (main.py, daemon.py, sweep.py and the benchmarks):
+# reading puzzles, sizing the worker pool, and solving one puzzle without writing any file.
+
+
+def solve_puzzle(
+    sudoku_table: list[list[int]],
+    min_temp: float,
+    max_temp: float,
+    cooling_rate: float,
+    process_id: int,
+    solver_options: dict,
+) -> tuple:
+    """
+    Solves one puzzle with SimulatedAnnealing, without writing anything but the solution cache.
+
+    Args:
+        sudoku_table (list[list[int]]): The puzzle.
+        min_temp, max_temp, cooling_rate, process_id: As in run_simulated_annealing.
+        solver_options (dict): Keyword arguments for SimulatedAnnealing; its "cache" entry, if any,
+                               is the path of a solution cache consulted before annealing.
+
+    Returns:
+        tuple: The best solution found, its fitness, the Trace of the run, and the SimulatedAnnealing instance
+               (None when the cache answered, with an empty trace).
+    """
+    solver_options = dict(solver_options)
+    cache_path = solver_options.pop("cache", None)
+    cache = open_cache(cache_path) if cache_path is not None else None
+    cached = cache.get(sudoku_table) if cache is not None else None
+    if cached is not None:
+        return cached, 0, (), None
+
+    algorithm = SimulatedAnnealing(
+        sudoku_table, min_temp, max_temp, cooling_rate, **solver_options
+    )
+    best_state, fitness, additional_info_data = algorithm.run(process_id)
+    if cache is not None and fitness == 0:
+        cache.put(sudoku_table, best_state)
+    return best_state, fitness, additional_info_data, algorithm
+
+
+def read_sudoku_csv(file_path: str) -> list:
+    """
+    Reads Sudoku puzzles from a CSV file.
+
+    Args:
+        file_path (str): Path to the CSV file containing Sudoku puzzles.
+
+    Returns:
+        A list of Sudoku puzzles, each represented as a list of lists of integers.
+    """
+    return list(iter_sudoku_csv(file_path))
+
+
+def iter_sudoku_csv(file_path: str):
+    """
+    Reads Sudoku puzzles from a CSV file one at a time.
+    A puzzle ends at an empty row, or once it has as many rows as values per row, so 9x9, 16x16 and 25x25
+    puzzles are read alike, with or without separating empty rows.
+
+    Args:
+        file_path (str): Path to the CSV file containing Sudoku puzzles.
+
+    Yields:
+        Each Sudoku puzzle, represented as a list of lists of integers.
+    """
+    with open(file_path, "r") as file:
+        reader = csv.reader(file)
+        sudoku = []
+        for row in reader:
+            if row:  # Non-empty row indicates part of a puzzle
+                sudoku.append([int(num) for num in row])
+                if len(sudoku) == len(sudoku[0]):  # The puzzle is complete
+                    yield sudoku
+                    sudoku = []
+            else:  # Empty row indicates separation between puzzles
+                if sudoku:  # If a puzzle is accumulated, yield it
+                    yield sudoku
+                    sudoku = []
+        if sudoku:  # Yield the last puzzle if the file doesn't end with an empty row
+            yield sudoku
+
+
+def read_puzzles(file_path: str) -> list:
+    """
+    Reads Sudoku puzzles from either a binary puzzle store or a CSV file.
+
+    Args:
+        file_path (str): Path to a puzzle store (STORE_EXTENSION) or to a CSV file containing Sudoku puzzles.
+
+    Returns:
+        A list of puzzles. Puzzles from a store are returned as PuzzleRef objects, so that only the path
+        and index are sent to worker processes, which read the puzzle from the memory-mapped store.
+    """
+    return list(iter_puzzles(file_path))
+
+
+def iter_puzzles(file_path: str):
+    """
+    Lazily reads Sudoku puzzles from either a binary puzzle store or a CSV file.
+
+    Args:
+        file_path (str): Path to a puzzle store (STORE_EXTENSION) or to a CSV file containing Sudoku puzzles.
+
+    Yields:
+        Each puzzle, as a PuzzleRef for stores or as a list of lists of integers for CSV files.
+    """
+    if file_path.endswith(STORE_EXTENSION):
+        for index in range(len(open_store(file_path))):
+            yield PuzzleRef(file_path, index)
+    else:
+        yield from iter_sudoku_csv(file_path)
+
+
+def available_cpus() -> int:
+    """
+    Returns the number of CPUs this process is allowed to run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
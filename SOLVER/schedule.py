@@ -0,0 +1,227 @@
+import math
+
+
+class Schedule:
+    """
+    This class decides the temperature of every iteration of an annealing run.
+    The base class implements geometric cooling: the temperature is multiplied by the cooling rate after each iteration.
+    Subclasses can also react to the outcome of each iteration, which is passed to update().
+    """
+
+    def __init__(self, cooling_rate: float = 0.999) -> None:
+        """
+        Args:
+            cooling_rate (float): The factor applied to the temperature after each iteration.
+        """
+        if not 0 < cooling_rate < 1:
+            raise ValueError("The cooling rate must be between 0 and 1.")
+        self.cooling_rate = cooling_rate
+
+    def reset(self, start_temp: float, min_temp: float) -> None:
+        """
+        Prepares the schedule for a new run.
+
+        Args:
+            start_temp (float): The temperature of the first iteration.
+            min_temp (float): The temperature at which the run stops.
+        """
+        self.start_temp = start_temp
+        self.min_temp = min_temp
+
+    def update(self, temp: float, accepted: bool, improved: bool) -> float:
+        """
+        Returns the temperature of the next iteration.
+
+        Args:
+            temp (float): The temperature of the iteration that just ended.
+            accepted (bool): Whether the move proposed in that iteration was accepted.
+            improved (bool): Whether the best fitness improved in that iteration.
+        """
+        return temp * self.cooling_rate
+
+    def expected_iterations(self, start_temp: float, min_temp: float) -> int:
+        """
+        Estimates the number of iterations needed to cool from start_temp down to min_temp.
+        """
+        if start_temp <= min_temp:
+            return 0
+        return math.ceil(math.log(min_temp / start_temp) / math.log(self.cooling_rate))
+
+
+class LinearSchedule(Schedule):
+    """
+    A schedule that lowers the temperature by the same amount after each iteration,
+    reaching the minimum temperature after a fixed number of iterations.
+    """
+
+    def __init__(self, iterations: int = 100_000) -> None:
+        """
+        Args:
+            iterations (int): The number of iterations from the starting temperature to the minimum one.
+        """
+        if iterations < 1:
+            raise ValueError("A linear schedule needs at least one iteration.")
+        self.iterations = iterations
+
+    def reset(self, start_temp: float, min_temp: float) -> None:
+        super().reset(start_temp, min_temp)
+        self.decrement = (start_temp - min_temp) / self.iterations
+
+    def update(self, temp: float, accepted: bool, improved: bool) -> float:
+        temp -= self.decrement
+        # Snap to the minimum when rounding leaves a sliver above it, so the run ends on schedule.
+        if temp - self.min_temp < self.decrement * 1e-6:
+            return self.min_temp
+        return temp
+
+    def expected_iterations(self, start_temp: float, min_temp: float) -> int:
+        return self.iterations if start_temp > min_temp else 0
+
+
+class AdaptiveSchedule(Schedule):
+    """
+    A geometric schedule whose speed follows the acceptance rate of the chain.
+    The acceptance rate is measured over windows of iterations: while it is above the target the chain is still
+    walking randomly, so the schedule cools twice as fast; below the target it cools twice as slowly,
+    spending more iterations in the range of temperatures where the search actually happens.
+    """
+
+    def __init__(
+        self, cooling_rate: float = 0.999, target: float = 0.3, window: int = 500
+    ) -> None:
+        """
+        Args:
+            cooling_rate (float): The nominal factor applied to the temperature after each iteration.
+            target (float): The acceptance rate that separates fast and slow cooling.
+            window (int): The number of iterations over which the acceptance rate is measured.
+        """
+        super().__init__(cooling_rate)
+        if not 0 < target < 1:
+            raise ValueError("The target acceptance rate must be between 0 and 1.")
+        self.target = target
+        self.window = window
+        self.fast_rate = cooling_rate**2
+        self.slow_rate = math.sqrt(cooling_rate)
+
+    def reset(self, start_temp: float, min_temp: float) -> None:
+        super().reset(start_temp, min_temp)
+        self.rate = self.cooling_rate  # Factor applied during the current window.
+        self.accepted = 0  # Accepted moves in the current window.
+        self.seen = 0  # Iterations in the current window.
+
+    def update(self, temp: float, accepted: bool, improved: bool) -> float:
+        self.accepted += accepted
+        self.seen += 1
+        if self.seen == self.window:
+            too_hot = self.accepted > self.target * self.window
+            self.rate = self.fast_rate if too_hot else self.slow_rate
+            self.accepted = self.seen = 0
+        return temp * self.rate
+
+
+class ReheatingSchedule(Schedule):
+    """
+    A schedule that wraps another one and reheats when the search stagnates.
+    When the best fitness has not improved for `patience` iterations, the temperature is raised back to
+    `factor` times the temperature of the last improvement (capped at the starting temperature),
+    at most `max_reheats` times per run so that the run still ends.
+    """
+
+    def __init__(
+        self,
+        schedule: Schedule,
+        patience: int = 10_000,
+        factor: float = 2.0,
+        max_reheats: int = 5,
+    ) -> None:
+        """
+        Args:
+            schedule (Schedule): The schedule followed between reheats.
+            patience (int): The number of iterations without improvement that triggers a reheat.
+            factor (float): The multiple of the temperature of the last improvement to reheat to.
+            max_reheats (int): The maximum number of reheats per run.
+        """
+        self.schedule = schedule
+        self.patience = patience
+        self.factor = factor
+        self.max_reheats = max_reheats
+
+    def reset(self, start_temp: float, min_temp: float) -> None:
+        super().reset(start_temp, min_temp)
+        self.schedule.reset(start_temp, min_temp)
+        self.reheats = 0  # Reheats performed during the current run.
+        self.stagnation = 0  # Iterations since the last improvement.
+        self.improvement_temp = start_temp  # Temperature of the last improvement.
+
+    def update(self, temp: float, accepted: bool, improved: bool) -> float:
+        if improved:
+            self.stagnation = 0
+            self.improvement_temp = temp
+        else:
+            self.stagnation += 1
+            if self.stagnation >= self.patience and self.reheats < self.max_reheats:
+                self.reheats += 1
+                self.stagnation = 0
+                return min(self.improvement_temp * self.factor, self.start_temp)
+        return self.schedule.update(temp, accepted, improved)
+
+    def expected_iterations(self, start_temp: float, min_temp: float) -> int:
+        return self.schedule.expected_iterations(start_temp, min_temp)
+
+
+def calibrate_temperature(state, acceptance: float = 0.8, samples: int = 200) -> float:
+    """
+    Estimates a starting temperature from the move deltas of the actual puzzle: the temperature at which
+    a worsening move of average size is accepted with the given probability. The state is not modified.
+
+    Args:
+        state (SingleSolution): A generated board of the puzzle, used to sample moves.
+        acceptance (float): The desired initial acceptance probability of worsening moves.
+        samples (int): The number of moves sampled.
+
+    Returns:
+        float: The calibrated temperature, or None if no sampled move made the board worse.
+    """
+    if not 0 < acceptance < 1:
+        raise ValueError("The initial acceptance must be between 0 and 1.")
+    deltas = [state.propose_move() for _ in range(samples)]
+    worsening = [delta for delta in deltas if delta > 0]
+    if not worsening:
+        return None
+    return -(sum(worsening) / len(worsening)) / math.log(acceptance)
+
+
+SCHEDULES = ("geometric", "linear", "adaptive")
+
+
+def make_schedule(
+    policy: str = "geometric",
+    cooling_rate: float = 0.999,
+    iterations: int = None,
+    reheat: int = None,
+) -> Schedule:
+    """
+    Creates a schedule from a policy name, as used on the command line.
+
+    Args:
+        policy (str): One of "geometric", "linear" or "adaptive".
+        cooling_rate (float): The cooling rate of the geometric and adaptive schedules.
+        iterations (int): The length of the linear schedule. Ignored by the other policies.
+        reheat (int): If given, the schedule reheats after this many iterations without improvement.
+
+    Returns:
+        Schedule: A new schedule implementing the policy.
+    """
+    if policy == "geometric":
+        schedule = Schedule(cooling_rate)
+    elif policy == "linear":
+        schedule = LinearSchedule(iterations or 100_000)
+    elif policy == "adaptive":
+        schedule = AdaptiveSchedule(cooling_rate)
+    else:
+        raise ValueError(
+            f"Unknown schedule {policy!r}, expected one of {', '.join(SCHEDULES)}."
+        )
+    if reheat:
+        schedule = ReheatingSchedule(schedule, patience=reheat)
+    return schedule
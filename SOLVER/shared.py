@@ -0,0 +1,156 @@
+from SA import RUN_STATUSES
+from multiprocessing import shared_memory
+import numpy as np
+
+# Codes of the status field of the results: a puzzle is pending until a worker stores its result.
+RESULT_STATUSES = ("pending", "error", *RUN_STATUSES)
+
+
+def result_dtype(table_size: int) -> np.dtype:
+    """
+    Returns the record type of the result of one puzzle: its best board, fitness, number of iterations,
+    solve time in seconds and status code (an index in RESULT_STATUSES).
+    """
+    return np.dtype(
+        [
+            ("solution", np.uint8, (table_size, table_size)),
+            ("fitness", np.int32),
+            ("iterations", np.int64),
+            ("elapsed", np.float64),
+            ("status", np.uint8),
+        ]
+    )
+
+
+class SharedBatch:
+    """
+    This class keeps the puzzles of a batch and the results of their runs in two shared memory blocks, so that
+    the workers of a pool receive only the index of a puzzle, read it from the puzzles block and write its result
+    in place in the results block. Nothing is pickled but the indices, and the parent writes all the solutions
+    at once when the batch ends, instead of every worker writing files of its own.
+
+    Every puzzle is solved by a single worker, which is the only one to write its row of the results, so the blocks
+    need no lock. The batch is sent to the workers by name: unpickling a SharedBatch attaches to the blocks of
+    the parent. The parent, which created the blocks, removes them on close().
+    """
+
+    def __init__(self, count: int, table_size: int, names: tuple = None) -> None:
+        """
+        Args:
+            count (int): The number of puzzles.
+            table_size (int): The size of each side of the grids.
+            names (tuple): The names of the puzzles and results blocks to attach to; None creates new blocks.
+        """
+        self.count = count
+        self.table_size = table_size
+        # Whether this process created the blocks, and removes them on close().
+        self.owner = names is None
+        dtype = result_dtype(table_size)
+        if self.owner:
+            # A block cannot be empty, so an empty batch still gets one byte.
+            self.puzzle_memory = shared_memory.SharedMemory(
+                create=True, size=max(count * table_size * table_size, 1)
+            )
+            self.result_memory = shared_memory.SharedMemory(
+                create=True, size=max(count * dtype.itemsize, 1)
+            )
+        else:
+            self.puzzle_memory = shared_memory.SharedMemory(names[0])
+            self.result_memory = shared_memory.SharedMemory(names[1])
+        self.puzzles = np.ndarray(
+            (count, table_size, table_size), np.uint8, self.puzzle_memory.buf
+        )
+        self.results = np.ndarray((count,), dtype, self.result_memory.buf)
+        if self.owner:
+            self.results.fill(0)
+
+    @classmethod
+    def from_puzzles(cls, puzzles) -> "SharedBatch":
+        """
+        Creates a batch holding the given puzzles.
+
+        Args:
+            puzzles: Array-like of shape (N, size, size), such as a list of tables or the puzzles of a PuzzleStore.
+
+        Raises:
+            ValueError: If the puzzles do not all have the same size.
+        """
+        if len(puzzles) == 0:
+            return cls(0, 9)
+        try:
+            puzzles = np.asarray(puzzles, dtype=np.uint8)
+        except ValueError:
+            puzzles = None  # Ragged: grids of different sizes.
+        if puzzles is None or puzzles.ndim != 3:
+            raise ValueError("The puzzles of a shared batch must have the same size.")
+        batch = cls(len(puzzles), puzzles.shape[1])
+        batch.puzzles[:] = puzzles
+        return batch
+
+    def __getstate__(self) -> tuple:
+        return (
+            self.count,
+            self.table_size,
+            (self.puzzle_memory.name, self.result_memory.name),
+        )
+
+    def __setstate__(self, state: tuple) -> None:
+        self.__init__(*state)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def puzzle(self, index: int) -> list[list[int]]:
+        """
+        Returns one puzzle as a list of lists of integers, the representation used by SimulatedAnnealing.
+        """
+        return self.puzzles[index].tolist()
+
+    def store_result(
+        self,
+        index: int,
+        solution: list[list[int]],
+        fitness: int,
+        iterations: int,
+        elapsed: float,
+        status: str,
+    ) -> None:
+        """
+        Writes the result of one puzzle. The solution may be None, for a puzzle that raised an error.
+
+        Args:
+            status (str): One of RESULT_STATUSES.
+        """
+        result = self.results[index]
+        if solution is not None:
+            result["solution"] = solution
+        result["fitness"] = fitness
+        result["iterations"] = iterations
+        result["elapsed"] = elapsed
+        result["status"] = RESULT_STATUSES.index(status)
+
+    def status(self, index: int) -> str:
+        """
+        Returns the status of one puzzle, one of RESULT_STATUSES.
+        """
+        return RESULT_STATUSES[self.results[index]["status"]]
+
+    def close(self) -> None:
+        """
+        Releases the blocks, and removes them if this process created them. The arrays of the batch
+        must not be used afterwards.
+        """
+        if self.puzzles is None:
+            return
+        self.puzzles = self.results = None
+        self.puzzle_memory.close()
+        self.result_memory.close()
+        if self.owner:
+            self.puzzle_memory.unlink()
+            self.result_memory.unlink()
+
+    def __enter__(self) -> "SharedBatch":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,11 +1,176 @@
 from copy import deepcopy
-from random import shuffle, sample, randint
+from random import shuffle, random
+from rng import BLOCK_SIZE
+import numpy as np
+import math
 
-# Constants for the size of the sudoku table and the smaller 3x3 boxes.
+# Constants for the size of the standard sudoku table and its smaller 3x3 boxes.
+# Other grids (16x16, 25x25, ...) are supported; their size is read from the table itself.
 TABLE_SIZE = 9
 BOX_SIZE = 3
 
 
+def box_size_for(table_size: int) -> int:
+    """
+    Returns the side of the boxes of a grid, which must be a perfect square (4, 9, 16, 25, ...).
+
+    Args:
+        table_size (int): The number of rows (and columns) of the grid.
+
+    Raises:
+        ValueError: If table_size is not the square of an integer greater than 1.
+    """
+    box_size = math.isqrt(table_size)
+    if box_size < 2 or box_size * box_size != table_size:
+        raise ValueError(f"A {table_size}x{table_size} grid has no square boxes.")
+    return box_size
+
+
+class MoveTable:
+    """
+    This class indexes the legal moves of a puzzle: the boxes with at least two mutable cells, and their mutable cells.
+    It depends only on the clues, so it is built once per puzzle and shared by every solution of that puzzle.
+    Cells are stored in flat lists, box after box, so drawing a move is a constant-time lookup without allocations.
+    Moves are drawn with the random module, or in blocks from a NumPy generator once use_generator() is called.
+    """
+
+    def __init__(self, original: list[list[int]]) -> None:
+        """
+        Builds the move index of a puzzle.
+
+        Args:
+            original (list of list of int): The puzzle, with 0 for the mutable cells.
+        """
+        size = len(original)
+        box_size = box_size_for(size)
+        self.rows = []  # Row of each mutable cell, grouped by eligible box.
+        self.cols = []  # Column of each mutable cell, grouped by eligible box.
+        self.starts = []  # Index in rows/cols of the first cell of each eligible box.
+        self.sizes = []  # Number of mutable cells of each eligible box.
+        for row_offset in range(0, size, box_size):
+            for col_offset in range(0, size, box_size):
+                cells = [
+                    (row_offset + i, col_offset + j)
+                    for i in range(box_size)
+                    for j in range(box_size)
+                    if original[row_offset + i][col_offset + j] == 0
+                ]
+                if len(cells) < 2:
+                    continue  # A box with fewer than two mutable cells has no legal swap.
+                self.starts.append(len(self.rows))
+                self.sizes.append(len(cells))
+                for row, col in cells:
+                    self.rows.append(row)
+                    self.cols.append(col)
+        self.num_boxes = len(self.sizes)
+        # The same index as arrays, for draw_block().
+        self.size_array = np.array(self.sizes, dtype=np.intp)
+        self.start_array = np.array(self.starts, dtype=np.intp)
+        self.row_array = np.array(self.rows, dtype=np.intp)
+        self.col_array = np.array(self.cols, dtype=np.intp)
+        self.generator = (
+            None  # NumPy generator of the moves, if any; see use_generator().
+        )
+        self.block = []  # Moves drawn in advance from the generator.
+        self.position = 0  # Index in block of the next move.
+
+    def use_generator(self, generator: np.random.Generator) -> None:
+        """
+        Makes draw() take its moves from blocks drawn with a NumPy generator instead of the random module,
+        for speed and to make the moves reproducible from the seed of the generator.
+
+        Args:
+            generator (np.random.Generator): The generator of the chain using this table.
+        """
+        self.generator = generator
+        self.block = []
+        self.position = 0
+
+    def draw(self) -> tuple:
+        """
+        Draws a uniformly random eligible box, then two distinct mutable cells within it.
+
+        Returns:
+            tuple: The (row1, col1, row2, col2) coordinates of the two cells.
+        """
+        if self.generator is not None:
+            position = self.position
+            if position == len(self.block):
+                self.block = self.draw_block(self.generator, BLOCK_SIZE)
+                position = 0
+            self.position = position + 1
+            return self.block[position]
+
+        box = int(random() * self.num_boxes)
+        size = self.sizes[box]
+        first = int(random() * size)
+        second = int(random() * (size - 1))
+        if second >= first:
+            second += 1
+        start = self.starts[box]
+        first += start
+        second += start
+        return self.rows[first], self.cols[first], self.rows[second], self.cols[second]
+
+    def draw_block(self, generator: np.random.Generator, count: int) -> list[tuple]:
+        """
+        Draws many moves at once, with the same distribution as draw(): a uniformly random eligible box,
+        then two distinct mutable cells within it.
+
+        Args:
+            generator (np.random.Generator): The generator of the moves.
+            count (int): The number of moves.
+
+        Returns:
+            list of tuple: The (row1, col1, row2, col2) coordinates of the cells of each move.
+        """
+        if self.num_boxes == 0:
+            return []
+        uniforms = generator.random((3, count))
+        box = (uniforms[0] * self.num_boxes).astype(np.intp)
+        sizes = self.size_array[box]
+        starts = self.start_array[box]
+        first = (uniforms[1] * sizes).astype(np.intp)
+        second = (uniforms[2] * (sizes - 1)).astype(np.intp)
+        second += second >= first
+        first += starts
+        second += starts
+        rows = self.row_array
+        cols = self.col_array
+        return list(
+            zip(
+                rows[first].tolist(),
+                cols[first].tolist(),
+                rows[second].tolist(),
+                cols[second].tolist(),
+            )
+        )
+
+    def pairs(self) -> list[tuple]:
+        """
+        Enumerates every legal swap of the puzzle.
+
+        Returns:
+            list of tuple: The (row1, col1, row2, col2) coordinates of each pair of mutable cells sharing a box.
+        """
+        pairs = []
+        for start, size in zip(self.starts, self.sizes):
+            for first in range(start, start + size):
+                for second in range(first + 1, start + size):
+                    pairs.append(
+                        (
+                            self.rows[first],
+                            self.cols[first],
+                            self.rows[second],
+                            self.cols[second],
+                        )
+                    )
+        return pairs
+
+    def __len__(self) -> int:
+        return self.num_boxes
+
+
 class SingleSolution:
     """
     This class represents a single solution for a Sudoku puzzle.
@@ -14,7 +179,10 @@ class SingleSolution:
     """
 
     def __init__(
-        self, table: list[list[int]], original: list[list[int]]
+        self,
+        table: list[list[int]],
+        original: list[list[int]],
+        moves: MoveTable = None,
     ) -> list[list[int]]:
         """
         Initializes a new instance of the SingleSolution class.
@@ -22,69 +190,232 @@ class SingleSolution:
         Args:
             table (list of list of int): The current state of the Sudoku puzzle.
             original (list of list of int): The original Sudoku puzzle with some cells filled and others empty.
+            moves (MoveTable): The move index of the original puzzle, built from it when not given.
         """
         self.table = deepcopy(
             table
         )  # The current state of the puzzle, which can be mutated.
+        self.size = len(table)  # Number of rows and columns, and of digits.
+        self.box_size = box_size_for(self.size)  # Side of the boxes.
         self.original_table = original  # The original puzzle state, used to check which cells should not be changed.
+        self.moves = (
+            moves if moves is not None else MoveTable(original)
+        )  # Legal swaps of the puzzle, shared with the other solutions of the same puzzle.
+        self.row_counts = (
+            []
+        )  # row_counts[r][d] is the number of occurrences of digit d in row r.
+        self.col_counts = (
+            []
+        )  # col_counts[c][d] is the number of occurrences of digit d in column c.
+        self.energy = 0  # Cached fitness, kept up to date incrementally by swap().
+        self.pending_move = None  # (row1, col1, row2, col2, delta) of propose_move().
+        self.last_move = None  # Last move performed by apply_move(), for revert_move().
+        self.recount()
+
+    def copy(self) -> "SingleSolution":
+        """
+        Creates an independent copy of this solution, including its count tables and cached energy.
+        Cheaper than building a new instance because nothing has to be recounted.
 
-    def generate_solution(self) -> None:
+        Returns:
+            SingleSolution: A new solution with the same state.
         """
-        Fills empty cells in each 3x3 box of the Sudoku puzzle with random numbers that follow Sudoku rules.
+        clone = SingleSolution.__new__(SingleSolution)
+        clone.table = [row[:] for row in self.table]
+        clone.size = self.size
+        clone.box_size = self.box_size
+        clone.original_table = self.original_table
+        clone.moves = self.moves
+        clone.row_counts = [counts[:] for counts in self.row_counts]
+        clone.col_counts = [counts[:] for counts in self.col_counts]
+        clone.energy = self.energy
+        clone.pending_move = None
+        clone.last_move = None
+        return clone
+
+    def recount(self) -> None:
+        """
+        Rebuilds the per-row and per-column digit count tables and the cached energy from the current table.
+        Must be called whenever the table is modified without going through swap().
+        """
+        self.row_counts = [[0] * (self.size + 1) for _ in range(self.size)]
+        self.col_counts = [[0] * (self.size + 1) for _ in range(self.size)]
+        for row_index, row in enumerate(self.table):
+            row_counts = self.row_counts[row_index]
+            for col_index, value in enumerate(row):
+                row_counts[value] += 1
+                self.col_counts[col_index][value] += 1
+
+        # A row or column with k distinct values contributes size - k, exactly as in fitness().
+        self.energy = sum(
+            self.size - sum(1 for count in counts if count)
+            for counts in self.row_counts + self.col_counts
+        )
+
+    def generate_solution(self, generator: np.random.Generator = None) -> None:
+        """
+        Fills empty cells in each box of the Sudoku puzzle with random numbers that follow Sudoku rules.
         This method modifies the puzzle state in place.
+
+        Args:
+            generator (np.random.Generator): Optional generator of the shuffles; the random module is used otherwise.
         """
-        for row_index in range(0, TABLE_SIZE, BOX_SIZE):
-            for col_index in range(0, TABLE_SIZE, BOX_SIZE):
+        for row_index in range(0, self.size, self.box_size):
+            for col_index in range(0, self.size, self.box_size):
 
                 # Calculate the starting row and column for the current box.
-                row_offset = (row_index // BOX_SIZE) * BOX_SIZE
-                col_offset = (col_index // BOX_SIZE) * BOX_SIZE
+                row_offset = (row_index // self.box_size) * self.box_size
+                col_offset = (col_index // self.box_size) * self.box_size
 
-                nums = [n for n in range(1, TABLE_SIZE + 1)]
+                nums = [n for n in range(1, self.size + 1)]
 
                 # Remove numbers already present in the current box from the list.
-                for i in range(BOX_SIZE):
-                    for j in range(BOX_SIZE):
+                for i in range(self.box_size):
+                    for j in range(self.box_size):
                         if self.original_table[row_offset + i][col_offset + j] != 0:
                             nums.remove(
                                 self.original_table[row_offset + i][col_offset + j]
                             )
 
-                shuffle(nums)  # Shuffle the remaining numbers to randomize their order.
+                # Shuffle the remaining numbers to randomize their order.
+                if generator is None:
+                    shuffle(nums)
+                else:
+                    generator.shuffle(nums)
 
                 # Fill empty cells in the box with the shuffled numbers.
-                for i in range(BOX_SIZE):
-                    for j in range(BOX_SIZE):
+                for i in range(self.box_size):
+                    for j in range(self.box_size):
                         if self.original_table[row_offset + i][col_offset + j] == 0:
                             self.table[row_offset + i][col_offset + j] = nums.pop()
 
+        self.recount()
+
     def mutate(self) -> None:
         """
-        Mutates the solution by swapping two numbers within a single 3x3 box.
+        Mutates the solution by swapping two numbers within a single box.
         This method modifies the puzzle state in place.
         """
-        # Randomly select a 3x3 box.
-        row_offset = (randint(0, TABLE_SIZE - 1) // BOX_SIZE) * BOX_SIZE
-        col_offset = (randint(0, TABLE_SIZE - 1) // BOX_SIZE) * BOX_SIZE
+        self.propose_move()
+        self.apply_move()
 
-        indexes = (
-            []
-        )  # List to hold the positions of mutable (non-original) cells within the box.
+    def propose_move(self) -> int:
+        """
+        Selects two mutable cells within a random box as the pending move, without modifying the table.
+
+        Returns:
+            int: The change in fitness that applying the pending move would cause.
+        """
+        # Randomly select two mutable cells of a box with at least two of them; run() never calls
+        # this method when no such box exists (see has_moves()).
+        row1, col1, row2, col2 = self.moves.draw()
 
-        # Identify mutable cells within the selected box.
-        for i in range(BOX_SIZE):
-            for j in range(BOX_SIZE):
-                if self.original_table[row_offset + i][col_offset + j] == 0:
-                    indexes.append([row_offset + i, col_offset + j])
+        delta = self.swap_delta(row1, col1, row2, col2)
+        self.pending_move = (row1, col1, row2, col2, delta)
+        return delta
 
-        # Randomly select two cells to swap.
-        pair1, pair2 = sample(indexes, 2)
+    def has_moves(self) -> bool:
+        """
+        Checks whether any box has at least two mutable cells, so that propose_move() can find a swap.
 
-        # Perform the swap.
-        self.table[pair1[0]][pair1[1]], self.table[pair2[0]][pair2[1]] = (
-            self.table[pair2[0]][pair2[1]],
-            self.table[pair1[0]][pair1[1]],
-        )
+        Returns:
+            bool: False when every cell is fixed, or each box has at most one empty cell.
+        """
+        return self.moves.num_boxes > 0
+
+    def apply_move(self) -> None:
+        """
+        Performs the pending move chosen by propose_move() in place.
+        """
+        row1, col1, row2, col2, delta = self.pending_move
+        self.swap(row1, col1, row2, col2, delta)
+        self.last_move = self.pending_move
+
+    def revert_move(self) -> None:
+        """
+        Undoes the last move performed by apply_move(), restoring the previous table and energy.
+        """
+        row1, col1, row2, col2, delta = self.last_move
+        self.swap(row1, col1, row2, col2, -delta)
+        self.last_move = None
+
+    def snapshot(self, buffer: list[int]) -> None:
+        """
+        Copies the current table into a flat, preallocated buffer in row-major order.
+
+        Args:
+            buffer (list of int): A list of size * size cells to overwrite.
+        """
+        for row_index, row in enumerate(self.table):
+            start = row_index * self.size
+            buffer[start : start + self.size] = row
+
+    def swap_delta(self, row1: int, col1: int, row2: int, col2: int) -> int:
+        """
+        Calculates the change in fitness that swapping two cells would cause, without modifying the table.
+        Only the (at most) two affected rows and two affected columns are inspected, so the cost is constant.
+
+        Args:
+            row1 (int): Row of the first cell.
+            col1 (int): Column of the first cell.
+            row2 (int): Row of the second cell.
+            col2 (int): Column of the second cell.
+
+        Returns:
+            int: The fitness after the swap minus the fitness before it.
+        """
+        first = self.table[row1][col1]
+        second = self.table[row2][col2]
+        if first == second:
+            return 0
+
+        delta = 0
+        # A line loses a distinct value when its last copy of `first` leaves,
+        # and gains one when `second` was not present in it yet.
+        if row1 != row2:
+            counts1 = self.row_counts[row1]
+            counts2 = self.row_counts[row2]
+            delta += (counts1[first] == 1) - (counts1[second] == 0)
+            delta += (counts2[second] == 1) - (counts2[first] == 0)
+        if col1 != col2:
+            counts1 = self.col_counts[col1]
+            counts2 = self.col_counts[col2]
+            delta += (counts1[first] == 1) - (counts1[second] == 0)
+            delta += (counts2[second] == 1) - (counts2[first] == 0)
+        return delta
+
+    def swap(
+        self, row1: int, col1: int, row2: int, col2: int, delta: int = None
+    ) -> None:
+        """
+        Swaps two cells in place, updating the count tables and the cached energy incrementally.
+
+        Args:
+            row1 (int): Row of the first cell.
+            col1 (int): Column of the first cell.
+            row2 (int): Row of the second cell.
+            col2 (int): Column of the second cell.
+            delta (int): The value of swap_delta() for this swap, if already known.
+        """
+        if delta is None:
+            delta = self.swap_delta(row1, col1, row2, col2)
+
+        first = self.table[row1][col1]
+        second = self.table[row2][col2]
+        if row1 != row2:
+            self.row_counts[row1][first] -= 1
+            self.row_counts[row1][second] += 1
+            self.row_counts[row2][second] -= 1
+            self.row_counts[row2][first] += 1
+        if col1 != col2:
+            self.col_counts[col1][first] -= 1
+            self.col_counts[col1][second] += 1
+            self.col_counts[col2][second] -= 1
+            self.col_counts[col2][first] += 1
+
+        self.table[row1][col1] = second
+        self.table[row2][col2] = first
+        self.energy += delta
 
     def fitness(self) -> int:
         """
@@ -96,12 +427,12 @@ class SingleSolution:
         penalty = 0
 
         # Calculate row conflicts.
-        for row_index in range(TABLE_SIZE):
+        for row_index in range(self.size):
             penalty += len(self.table[row_index]) - len(set(self.table[row_index]))
 
         # Calculate column conflicts.
         transposed_table = list(zip(*self.table))
-        for row_index in range(TABLE_SIZE):
+        for row_index in range(self.size):
             penalty += len(transposed_table[row_index]) - len(
                 set(transposed_table[row_index])
             )
@@ -115,24 +446,36 @@ class SingleSolution:
         Returns:
             list of list of set: A matrix where each cell contains a set of possible numbers that could fit based on the current state of the puzzle.
         """
-        candidates = [
-            [set(range(1, TABLE_SIZE + 1)) for _ in range(TABLE_SIZE)]
-            for _ in range(TABLE_SIZE)
-        ]
-        for i in range(TABLE_SIZE):
-            for j in range(TABLE_SIZE):
+        size, box_size = self.size, self.box_size
+
+        # Digits used in each row, column and box, as bitmasks with bit d set for digit d.
+        rows = [0] * size
+        cols = [0] * size
+        boxes = [0] * size
+        for i in range(size):
+            for j in range(size):
                 if self.table[i][j] != 0:
-                    candidates[i][
-                        j
-                    ] = set()  # Empty the set if the cell is already filled.
+                    bit = 1 << self.table[i][j]
+                    rows[i] |= bit
+                    cols[j] |= bit
+                    boxes[(i // box_size) * box_size + j // box_size] |= bit
+
+        candidates = []
+        for i in range(size):
+            row_candidates = []
+            for j in range(size):
+                if self.table[i][j] != 0:
+                    row_candidates.append(set())  # The cell is already filled.
                     continue
-                # Remove numbers that are already present in the same row, column, and box.
-                for k in range(TABLE_SIZE):
-                    candidates[i][j].discard(self.table[i][k])
-                    candidates[i][j].discard(self.table[k][j])
-                    candidates[i][j].discard(
-                        self.table[3 * (i // 3) + k // 3][3 * (j // 3) + k % 3]
-                    )
+                used = (
+                    rows[i]
+                    | cols[j]
+                    | boxes[(i // box_size) * box_size + j // box_size]
+                )
+                row_candidates.append(
+                    {n for n in range(1, size + 1) if not used >> n & 1}
+                )
+            candidates.append(row_candidates)
         return candidates
 
     def __str__(self) -> str:
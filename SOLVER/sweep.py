@@ -0,0 +1,479 @@
+from runner import available_cpus, iter_puzzles, solve_puzzle
+from puzzle_store import PuzzleRef, STORE_EXTENSION
+from tracing import NoTrace
+from typing import NamedTuple
+import argparse
+import csv
+import itertools
+import math
+import os
+import statistics
+import sys
+import time
+import numpy as np
+from multiprocessing import Pool
+
+SWEEP_HEADER = [
+    "Rung",
+    "Budget",
+    "Min Temp",
+    "Max Temp",
+    "Cooling Rate",
+    "Run Cooling Rate",
+    "Runs",
+    "Solved",
+    "Success Rate",
+    "Median Solve Time",
+    "Time To Solution",
+    "Mean Fitness",
+    "Mean Iterations",
+]
+
+
+class Config(NamedTuple):
+    """
+    The schedule parameters of one configuration of a sweep.
+    """
+
+    min_temp: float
+    max_temp: float
+    cooling_rate: float
+
+    def cooling_rate_at(self, budget: int) -> float:
+        """
+        Returns the cooling rate of the runs of this configuration with an iteration budget. When cooling from
+        max_temp to min_temp takes more than budget iterations, the schedule is compressed to reach min_temp at the
+        budget; otherwise a cheap rung would only see the hot start of slow schedules, and always drop them.
+        """
+        return min(self.cooling_rate, (self.min_temp / self.max_temp) ** (1 / budget))
+
+
+class Score(NamedTuple):
+    """
+    The outcome of a configuration on the puzzles of a sweep, at one iteration budget.
+    """
+
+    config: Config
+    runs: int
+    solved: int
+    # Median time of the solved runs, in seconds; inf if none was solved.
+    median_solve_time: float
+    # Expected seconds per solved puzzle, rerunning the failed runs; inf if none was solved.
+    time_to_solution: float
+    mean_fitness: float  # Mean final fitness of the runs.
+    mean_iterations: float
+    total_time: float  # Seconds spent on the runs of the configuration.
+    # The cooling rate the runs used, lower than that of the configuration when its schedule was compressed.
+    run_cooling_rate: float = None
+
+    @property
+    def success_rate(self) -> float:
+        return self.solved / self.runs if self.runs else 0.0
+
+    def rank_key(self) -> tuple:
+        """
+        Orders configurations by expected time to solution, then, among those that solved nothing,
+        by how close their runs came to a solution.
+        """
+        return (self.time_to_solution, self.mean_fitness, -self.success_rate)
+
+
+def grid_configs(min_temps, max_temps, cooling_rates) -> list:
+    """
+    Returns every combination of the given values, skipping those whose minimum temperature is not below
+    their maximum temperature.
+    """
+    return [
+        Config(min_temp, max_temp, cooling_rate)
+        for max_temp, min_temp, cooling_rate in itertools.product(
+            max_temps, min_temps, cooling_rates
+        )
+        if min_temp < max_temp
+    ]
+
+
+def sample_configs(
+    min_temps, max_temps, cooling_rates, samples: int, seed=None
+) -> list:
+    """
+    Draws configurations at random within the ranges of the given values: the temperatures log-uniformly, and the
+    cooling rate so that 1 - cooling_rate is log-uniform, since 0.999 and 0.9999 differ by ten times in run length.
+    The maximum temperature is drawn first, and the minimum temperature below it.
+
+    Args:
+        min_temps, max_temps, cooling_rates: Values of each parameter; their minimum and maximum bound its range.
+        samples (int): The number of configurations.
+        seed: Seed of the draws.
+
+    Returns:
+        list: The configurations; none, like grid_configs, if every minimum temperature is above every maximum.
+
+    Raises:
+        ValueError: If a cooling rate is not between 0 and 1.
+    """
+    if not all(0 < cooling_rate < 1 for cooling_rate in cooling_rates):
+        raise ValueError("Cooling rates must be between 0 and 1.")
+    if min(min_temps) >= max(max_temps):
+        return []
+    generator = np.random.default_rng(seed)
+
+    def log_uniform(low, high):
+        return float(np.exp(generator.uniform(np.log(low), np.log(high))))
+
+    configs = []
+    for _ in range(samples):
+        max_temp = log_uniform(max(min(max_temps), min(min_temps)), max(max_temps))
+        min_temp = log_uniform(min(min_temps), min(max(min_temps), max_temp))
+        cooling_rate = 1 - log_uniform(1 - max(cooling_rates), 1 - min(cooling_rates))
+        configs.append(Config(min_temp, max_temp, cooling_rate))
+    return configs
+
+
+def init_sweep_worker() -> None:
+    """
+    Prepares a worker of the sweep. The solver prints a line for every solved run, thousands in a sweep,
+    so the workers print to the null device instead.
+    """
+    sys.stdout = open(os.devnull, "w")
+
+
+def run_trial(params: tuple) -> tuple:
+    """
+    Solves one puzzle with one configuration, on a worker, without writing anything.
+
+    Args:
+        params (tuple): The index of the configuration, the configuration, the index of the puzzle (also its
+                        process ID, which selects its random stream), the puzzle, the iteration budget and
+                        the keyword arguments of SimulatedAnnealing. The schedule is compressed to the budget
+                        (see Config.cooling_rate_at).
+
+    Returns:
+        tuple: The index of the configuration, the final fitness, the number of iterations and the solve time
+               in seconds. The fitness is None if solving raised.
+    """
+    config_index, config, process_id, puzzle, budget, solver_options = params
+    options = dict(solver_options, max_iterations=budget, trace=NoTrace())
+    start = time.perf_counter()
+    try:
+        _, fitness, _, algorithm = solve_puzzle(
+            puzzle,
+            config.min_temp,
+            config.max_temp,
+            config.cooling_rate_at(budget),
+            process_id,
+            options,
+        )
+    except Exception:
+        return config_index, None, 0, time.perf_counter() - start
+    return config_index, fitness, algorithm.iterations, time.perf_counter() - start
+
+
+def score(config: Config, trials: list, run_cooling_rate: float = None) -> Score:
+    """
+    Summarizes the trials of a configuration, given as (fitness, iterations, elapsed) tuples,
+    run with the given cooling rate (by default that of the configuration).
+    """
+    solved_times = [elapsed for fitness, _, elapsed in trials if fitness == 0]
+    total_time = sum(elapsed for _, _, elapsed in trials)
+    fitnesses = [fitness for fitness, _, _ in trials if fitness is not None]
+    return Score(
+        config,
+        len(trials),
+        len(solved_times),
+        statistics.median(solved_times) if solved_times else math.inf,
+        total_time / len(solved_times) if solved_times else math.inf,
+        statistics.fmean(fitnesses) if fitnesses else math.inf,
+        statistics.fmean(iterations for _, iterations, _ in trials),
+        total_time,
+        run_cooling_rate if run_cooling_rate is not None else config.cooling_rate,
+    )
+
+
+def evaluate(
+    pool: Pool,
+    configs: list,
+    puzzles: list,
+    budget: int,
+    solver_options: dict = None,
+    chunksize: int = 1,
+) -> list:
+    """
+    Runs every configuration on every puzzle on a process pool. The runs of a puzzle share its random stream
+    across configurations, so configurations are compared on the same draws.
+
+    Args:
+        pool (Pool): The worker pool.
+        configs (list): The configurations.
+        puzzles (list): The puzzles.
+        budget (int): The iteration budget of every run.
+        solver_options (dict): Other keyword arguments of SimulatedAnnealing, such as a seed or presolve.
+        chunksize (int): The number of runs sent to a worker at a time.
+
+    Returns:
+        list: The Score of each configuration, in the order of configs.
+    """
+    solver_options = solver_options or {}
+    tasks = (
+        (config_index, config, process_id, puzzle, budget, solver_options)
+        for config_index, config in enumerate(configs)
+        for process_id, puzzle in enumerate(puzzles)
+    )
+    trials = [[] for _ in configs]
+    for config_index, *trial in pool.imap_unordered(run_trial, tasks, chunksize):
+        trials[config_index].append(tuple(trial))
+    return [
+        score(config, runs, config.cooling_rate_at(budget))
+        for config, runs in zip(configs, trials)
+    ]
+
+
+def successive_halving(
+    configs: list,
+    puzzles: list,
+    min_budget: int,
+    max_budget: int,
+    eta: int = 3,
+    processes: int = None,
+    solver_options: dict = None,
+    chunksize: int = 1,
+    report=None,
+) -> list:
+    """
+    Tunes the schedule by successive halving: every configuration is first run with a small iteration budget,
+    then only the best 1 / eta of them are run again with eta times the budget, and so on until a single
+    configuration is left or the budget reaches max_budget. Poor schedules are dropped after a few cheap runs,
+    and most of the compute goes to the promising ones. Schedules longer than the budget of a rung are compressed
+    to it (see Config.cooling_rate_at), so slow schedules are judged on complete runs rather than on their hot start.
+
+    Args:
+        configs (list): The configurations to compare.
+        puzzles (list): The puzzles every configuration is run on.
+        min_budget (int): The iteration budget of the first rung.
+        max_budget (int): The largest iteration budget.
+        eta (int): The factor by which the budget grows, and the number of configurations shrinks, at each rung.
+        processes (int): The number of worker processes; defaults to the available CPUs.
+        solver_options (dict): Other keyword arguments of SimulatedAnnealing.
+        chunksize (int): The number of runs sent to a worker at a time.
+        report: Optional function called with the rung number, its budget and its ranked scores as each rung ends.
+
+    Returns:
+        list: For each rung, its budget and the scores of its configurations, best first.
+    """
+    if eta < 2:
+        raise ValueError("eta must be at least 2.")
+    rungs = []
+    budget = min_budget
+    with Pool(processes or available_cpus(), init_sweep_worker) as pool:
+        while configs:
+            scores = sorted(
+                evaluate(pool, configs, puzzles, budget, solver_options, chunksize),
+                key=Score.rank_key,
+            )
+            rungs.append((budget, scores))
+            if report is not None:
+                report(len(rungs) - 1, budget, scores)
+            if len(scores) == 1 or budget >= max_budget:
+                break
+            configs = [score.config for score in scores[: max(len(scores) // eta, 1)]]
+            budget = min(budget * eta, max_budget)
+    return rungs
+
+
+def print_rung(rung: int, budget: int, scores: list, top: int = 10) -> None:
+    """
+    Prints the best configurations of a rung.
+    """
+    print(f"Rung {rung}: {len(scores)} configurations, {budget} iterations per run")
+    for score in scores[:top]:
+        min_temp, max_temp, _ = score.config
+        cooling_rate = score.run_cooling_rate
+        timings = (
+            f"median {score.median_solve_time:.3f}s, time to solution {score.time_to_solution:.3f}s"
+            if score.solved
+            else "none solved"
+        )
+        print(
+            f"  min_temp {min_temp:.3g}, max_temp {max_temp:.3g}, cooling_rate {cooling_rate:.6g}: "
+            f"{score.success_rate:.0%} solved, {timings}, mean fitness {score.mean_fitness:.2f}"
+        )
+
+
+def write_sweep_csv(path: str, rungs: list) -> None:
+    """
+    Writes the score of every configuration at every rung to a CSV file.
+    """
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(SWEEP_HEADER)
+        for rung, (budget, scores) in enumerate(rungs):
+            for score in scores:
+                writer.writerow(
+                    [
+                        rung,
+                        budget,
+                        *score.config,
+                        score.run_cooling_rate,
+                        score.runs,
+                        score.solved,
+                        f"{score.success_rate:.3f}",
+                        f"{score.median_solve_time:.4f}",
+                        f"{score.time_to_solution:.4f}",
+                        f"{score.mean_fitness:.3f}",
+                        f"{score.mean_iterations:.0f}",
+                    ]
+                )
+
+
+def load_puzzles(file_path: str, count: int, seed=None) -> list:
+    """
+    Reads the puzzles of a sweep: the first count puzzles of the file, or count puzzles drawn at random
+    among all of them when a seed is given, in the order of the file. The file is streamed, and only the
+    puzzles kept are held in memory.
+    """
+    if seed is None:
+        puzzles = list(itertools.islice(iter_puzzles(file_path), count))
+    else:
+        # Reservoir sampling: the i-th puzzle replaces a random kept one with probability count / (i + 1).
+        generator = np.random.default_rng(seed)
+        reservoir = []
+        for index, puzzle in enumerate(iter_puzzles(file_path)):
+            if index < count:
+                reservoir.append((index, puzzle))
+            else:
+                slot = generator.integers(index + 1)
+                if slot < count:
+                    reservoir[slot] = (index, puzzle)
+        puzzles = [puzzle for _, puzzle in sorted(reservoir, key=lambda item: item[0])]
+    return [
+        puzzle.load() if isinstance(puzzle, PuzzleRef) else puzzle for puzzle in puzzles
+    ]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parses the command line options of the sweep.
+    """
+    parser = argparse.ArgumentParser(
+        description="Tune the annealing schedule on a subset of the puzzles by successive halving."
+    )
+    parser.add_argument(
+        "file_path",
+        nargs="?",
+        help="Puzzle store or CSV file with the puzzles. Defaults to ../quiz/sudoku_quiz"
+        f"{STORE_EXTENSION} if it exists, otherwise ../quiz/sudoku_quiz.csv.",
+    )
+    parser.add_argument(
+        "--puzzles",
+        type=int,
+        default=20,
+        help="Number of puzzles every configuration is run on.",
+    )
+    parser.add_argument("--min-temp", type=float, nargs="+", default=[1e-7, 1e-3, 1e-1])
+    parser.add_argument("--max-temp", type=float, nargs="+", default=[1, 1e2, 1e8])
+    parser.add_argument(
+        "--cooling-rate", type=float, nargs="+", default=[0.99, 0.999, 0.9999]
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        help="Draw this many configurations at random within the ranges of the values above, "
+        "instead of trying every combination.",
+    )
+    parser.add_argument(
+        "--min-budget",
+        type=int,
+        default=10_000,
+        help="Iterations per run in the first rung.",
+    )
+    parser.add_argument(
+        "--max-budget",
+        type=int,
+        default=1_000_000,
+        help="Largest number of iterations per run.",
+    )
+    parser.add_argument(
+        "--eta",
+        type=int,
+        default=3,
+        help="The budget grows and the configurations shrink by this factor at each rung.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the runs, of the sampled configurations and of the puzzle subset.",
+    )
+    parser.add_argument(
+        "--presolve",
+        action="store_true",
+        help="Fill the cells deduced by constraint propagation before annealing.",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=available_cpus(),
+        help="Number of worker processes (default: available CPUs).",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=1,
+        help="Number of runs sent to a worker at a time.",
+    )
+    parser.add_argument(
+        "--output", default="sweep.csv", help="CSV file with the scores of every rung."
+    )
+    args = parser.parse_args(argv)
+    if not all(0 < cooling_rate < 1 for cooling_rate in args.cooling_rate):
+        parser.error("Cooling rates must be between 0 and 1.")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    file_path = args.file_path
+    if file_path is None:
+        file_path = "../quiz/sudoku_quiz" + STORE_EXTENSION
+        if not os.path.exists(file_path):
+            file_path = "../quiz/sudoku_quiz.csv"
+
+    puzzles = load_puzzles(file_path, args.puzzles, args.seed)
+    if args.samples:
+        configs = sample_configs(
+            args.min_temp, args.max_temp, args.cooling_rate, args.samples, args.seed
+        )
+    else:
+        configs = grid_configs(args.min_temp, args.max_temp, args.cooling_rate)
+    if not configs:
+        raise SystemExit(
+            "No configuration has a minimum temperature below its maximum temperature."
+        )
+    print(
+        f"Sweeping {len(configs)} configurations on {len(puzzles)} puzzles "
+        f"with {args.processes} processes..."
+    )
+
+    rungs = successive_halving(
+        configs,
+        puzzles,
+        args.min_budget,
+        args.max_budget,
+        args.eta,
+        args.processes,
+        {"seed": args.seed, "presolve": args.presolve},
+        args.chunksize,
+        print_rung,
+    )
+    write_sweep_csv(args.output, rungs)
+
+    runs = sum(score.runs for _, scores in rungs for score in scores)
+    compute = sum(score.total_time for _, scores in rungs for score in scores)
+    best = rungs[-1][1][0]
+    print(f"{runs} runs in {compute:.1f} CPU seconds. Scores written to {args.output}.")
+    print(
+        f"Best: --min-temp {best.config.min_temp:.3g} --max-temp {best.config.max_temp:.3g} "
+        f"--cooling-rate {best.run_cooling_rate:.6g} ({best.success_rate:.0%} solved, "
+        f"time to solution {best.time_to_solution:.3f}s)"
+        if best.solved
+        else "No configuration solved a puzzle; try larger budgets or other configurations."
+    )
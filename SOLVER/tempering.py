@@ -0,0 +1,206 @@
+from copy import copy, deepcopy
+from solution import SingleSolution, MoveTable
+from tracing import Trace
+from presolve import presolve as deduce_cells
+from rng import chain_generator, acceptance_thresholds
+from multiprocessing import Pool
+import math
+import random
+import time
+import numpy as np
+
+
+class ParallelTempering:
+    """
+    This class implements parallel tempering (replica exchange) for a single Sudoku puzzle.
+    K replicas of the puzzle are annealed at a ladder of fixed temperatures, each on its own worker process.
+    After every sweep, replicas at neighbouring temperatures exchange their states with the Metropolis probability,
+    so good states found at high temperature drift down the ladder while cold replicas can escape local minima.
+    """
+
+    def __init__(
+        self,
+        table: list[list[int]],
+        min_temp: float,
+        max_temp: float,
+        replicas: int = 8,
+        sweep: int = 1000,
+        max_rounds: int = 100,
+        time_limit: float = None,
+        trace: Trace = None,
+        seed: int = None,
+        presolve: bool = False,
+    ) -> None:
+        """
+        Initializes the replicas and the temperature ladder.
+
+        Args:
+            table (list[list[int]]): The initial state of the Sudoku puzzle.
+            min_temp (float): The temperature of the coldest replica.
+            max_temp (float): The temperature of the hottest replica.
+            replicas (int): The number of replicas, spaced geometrically between min_temp and max_temp.
+            sweep (int): The number of iterations each replica runs between two exchange rounds.
+            max_rounds (int): The maximum number of exchange rounds.
+            time_limit (float): Optional wall-clock budget of a run, in seconds, checked after every round.
+            trace (Trace): The policy used to record the run history, one record per round.
+            seed (int): Seed for the initial boards and the random choices, for reproducible runs.
+            presolve (bool): Whether to fix the cells deduced with naked and hidden singles before annealing.
+        """
+        if replicas < 2:
+            raise ValueError("Parallel tempering needs at least two replicas.")
+        if presolve:
+            table = deduce_cells(table)
+        self.original = deepcopy(table)
+        self.sweep = sweep
+        self.max_rounds = max_rounds
+        self.time_limit = time_limit
+        self.trace = trace if trace is not None else Trace()
+        self.random = random.Random(seed)
+        ratio = (max_temp / min_temp) ** (1 / (replicas - 1))
+        self.temperatures = [min_temp * ratio**k for k in range(replicas)]
+        self.moves = MoveTable(self.original)
+        self.states = [
+            SingleSolution(table, original=self.original, moves=self.moves)
+            for _ in range(replicas)
+        ]  # states[k] is the replica currently at temperatures[k].
+        self.exchanges = 0  # Number of accepted exchanges.
+        self.iterations = 0  # Iterations performed by each replica during the last run.
+        self.status = None  # Why the last run ended: "solved", or "budget" when the rounds or the time ran out.
+
+    def run(self, process_id: int, pool: Pool = None) -> tuple:
+        """
+        Executes parallel tempering until a replica solves the puzzle or the budget is exhausted.
+
+        Args:
+            process_id (int): An identifier for the puzzle, useful for debugging or logging.
+            pool (Pool): The worker pool that advances the replicas. Without one, they are advanced in this process.
+
+        Returns:
+            tuple: Contains the best solution found, its fitness, and the Trace of the run.
+        """
+        # The initial boards are drawn from the seed too, so that a seeded run does not depend on the random module.
+        for state in self.states:
+            state.generate_solution(np.random.default_rng(self.random.getrandbits(64)))
+        best_state = min(self.states, key=lambda state: state.energy)
+        best_table = deepcopy(best_state.table)
+        best_fitness = best_state.energy
+        self.trace.reset(self.max_rounds)
+        deadline = (
+            time.perf_counter() + self.time_limit
+            if self.time_limit is not None
+            else None
+        )
+        map_function = pool.map if pool is not None else map
+
+        self.iterations = 0
+        self.status = "budget"
+        for round_index in range(self.max_rounds):
+            if best_fitness == 0 or (
+                deadline is not None and time.perf_counter() > deadline
+            ):
+                break
+
+            tasks = [
+                (
+                    state.table,
+                    self.original,
+                    temp,
+                    self.sweep,
+                    self.random.getrandbits(64),
+                    k,
+                    self.moves,
+                )
+                for k, (state, temp) in enumerate(zip(self.states, self.temperatures))
+            ]
+            improved = False
+            round_steps = 0
+            for k, (table, replica_best, replica_fitness, steps) in enumerate(
+                map_function(advance_replica, tasks)
+            ):
+                self.states[k] = SingleSolution(table, self.original, self.moves)
+                round_steps = max(round_steps, steps)
+                if replica_fitness < best_fitness:
+                    best_fitness = replica_fitness
+                    best_table = replica_best
+                    improved = True
+            self.iterations += round_steps
+
+            self.exchange(round_index)
+            self.trace.record(
+                self.iterations, self.temperatures[0], best_fitness, improved
+            )
+
+        if best_fitness == 0:
+            self.status = "solved"
+            print(f"Optimal solution found at iteration {self.iterations}.")
+        self.trace.finish(self.iterations, self.temperatures[0], best_fitness)
+        return best_table, best_fitness, self.trace
+
+    def exchange(self, round_index: int) -> None:
+        """
+        Proposes state exchanges between neighbouring temperatures, alternating between even and odd pairs.
+
+        Args:
+            round_index (int): The index of the current round, used to pick the pairs.
+        """
+        for k in range(round_index % 2, len(self.states) - 1, 2):
+            cold, hot = self.states[k], self.states[k + 1]
+            exponent = (cold.energy - hot.energy) * (
+                1 / self.temperatures[k] - 1 / self.temperatures[k + 1]
+            )
+            if exponent >= 0 or self.random.random() < math.exp(exponent):
+                self.states[k], self.states[k + 1] = hot, cold
+                self.exchanges += 1
+
+
+def advance_replica(params: tuple) -> tuple:
+    """
+    Runs a replica at a fixed temperature for a number of iterations. Executed on the worker processes.
+
+    Args:
+        params (tuple): The replica table, the original puzzle, the temperature, the number of iterations,
+                        the seed of the round and the index of the replica, which select its random stream
+                        (see rng.chain_generator), and optionally the MoveTable of the puzzle,
+                        built again from the puzzle when not given.
+
+    Returns:
+        tuple: The final table of the replica, the best table it visited, its fitness, and the iterations performed.
+    """
+    table, original, temp, steps, seed, replica, *rest = params
+    # A copy of the table draws the moves, so that a table shared with the caller is left as it is.
+    moves = copy(rest[0]) if rest else MoveTable(original)
+    state = SingleSolution(table, original, moves)
+    # Moves and acceptance thresholds are drawn in blocks from the generator of the replica, as in SimulatedAnnealing.
+    generator = chain_generator(seed, replica)
+    moves.use_generator(generator)
+    thresholds = []
+    next_threshold = 0
+    best_fitness = state.energy
+    size = state.size
+    best_table = [0] * (size * size)
+    state.snapshot(best_table)
+
+    if not state.has_moves():
+        steps = 0
+
+    iterations = 0
+    while iterations < steps and best_fitness > 0:
+        iterations += 1
+        actual_energy = state.energy
+        new_energy = actual_energy + state.propose_move()
+        if next_threshold == len(thresholds):
+            thresholds = acceptance_thresholds(generator)
+            next_threshold = 0
+        # Same test as random() < accept_prob(actual_energy, new_energy, temp), see acceptance_thresholds().
+        accepted = new_energy - actual_energy < temp * thresholds[next_threshold]
+        next_threshold += 1
+        if accepted:
+            state.apply_move()
+            if new_energy < best_fitness:
+                best_fitness = new_energy
+                state.snapshot(best_table)
+
+    best_table = [
+        best_table[start : start + size] for start in range(0, size * size, size)
+    ]
+    return state.table, best_table, best_fitness, iterations
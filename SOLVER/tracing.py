@@ -0,0 +1,268 @@
+import math
+import numpy as np
+
+
+class Trace:
+    """
+    This class records the (iteration, temperature, best fitness) history of an annealing run.
+    Records are kept in preallocated typed arrays rather than a list of tuples; subclasses decide which iterations are kept.
+    The base class keeps every iteration it is given.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty trace. Storage is allocated by reset() once the expected run length is known.
+        """
+        self.iterations = np.zeros(
+            0, dtype=np.int64
+        )  # Iteration number of each record.
+        self.temps = np.zeros(0, dtype=np.float64)  # Temperature of each record.
+        self.best = np.zeros(0, dtype=np.int32)  # Best fitness of each record.
+        self.size = 0  # Number of records stored.
+        self.last_iteration = 0  # Iteration of the most recent record.
+        self.last_best = None  # Best fitness of the most recent record.
+
+    def reset(self, expected_iterations: int) -> None:
+        """
+        Discards any previous records and preallocates storage for a new run.
+
+        Args:
+            expected_iterations (int): The number of iterations the run is expected to take.
+        """
+        self._allocate(self.capacity_for(expected_iterations))
+        self.size = 0
+        self.last_iteration = 0
+        self.last_best = None
+
+    def capacity_for(self, expected_iterations: int) -> int:
+        """
+        Returns the number of records to preallocate for a run of the given length.
+        """
+        return expected_iterations + 1
+
+    def record(
+        self, iteration: int, temp: float, best_fitness: int, improved: bool
+    ) -> None:
+        """
+        Offers the state of one iteration to the trace, which keeps it or not depending on the policy.
+
+        Args:
+            iteration (int): The iteration number, starting at 1.
+            temp (float): The temperature of the iteration.
+            best_fitness (int): The best fitness found so far.
+            improved (bool): Whether the best fitness improved during this iteration.
+        """
+        self._store(iteration, temp, best_fitness)
+
+    def finish(self, iteration: int, temp: float, best_fitness: int) -> None:
+        """
+        Stores the final iteration of a run if the policy skipped it, or if the best fitness changed after the
+        iterations (when the exact search completed the run), so the trace always ends on the final result.
+        """
+        if iteration and (
+            self.last_iteration != iteration or self.last_best != best_fitness
+        ):
+            self._store(iteration, temp, best_fitness)
+
+    def _allocate(self, capacity: int) -> None:
+        self.iterations = np.zeros(capacity, dtype=np.int64)
+        self.temps = np.zeros(capacity, dtype=np.float64)
+        self.best = np.zeros(capacity, dtype=np.int32)
+
+    def _store(self, iteration: int, temp: float, best_fitness: int) -> None:
+        if self.size == len(self.iterations):
+            # The run outlived its estimate; grow geometrically to keep appends amortized O(1).
+            capacity = max(2 * self.size, 16)
+            self.iterations = np.resize(self.iterations, capacity)
+            self.temps = np.resize(self.temps, capacity)
+            self.best = np.resize(self.best, capacity)
+        self.iterations[self.size] = iteration
+        self.temps[self.size] = temp
+        self.best[self.size] = best_fitness
+        self.size += 1
+        self.last_iteration = iteration
+        self.last_best = best_fitness
+
+    def as_arrays(self) -> tuple:
+        """
+        Returns the recorded iterations, temperatures and best fitness values as arrays, in chronological order.
+        """
+        return (
+            self.iterations[: self.size],
+            self.temps[: self.size],
+            self.best[: self.size],
+        )
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self):
+        """
+        Yields the records as (iteration, temperature, best fitness) tuples of Python numbers.
+        """
+        iterations, temps, best = self.as_arrays()
+        return zip(iterations.tolist(), temps.tolist(), best.tolist())
+
+
+class NoTrace(Trace):
+    """
+    A trace that records nothing.
+    """
+
+    def capacity_for(self, expected_iterations: int) -> int:
+        return 0
+
+    def record(
+        self, iteration: int, temp: float, best_fitness: int, improved: bool
+    ) -> None:
+        pass
+
+    def finish(self, iteration: int, temp: float, best_fitness: int) -> None:
+        pass
+
+
+class EveryNTrace(Trace):
+    """
+    A trace that records the first iteration and then every N-th iteration.
+    """
+
+    def __init__(self, every: int) -> None:
+        """
+        Args:
+            every (int): The sampling period, in iterations.
+        """
+        super().__init__()
+        if every < 1:
+            raise ValueError("The trace sampling period must be at least 1.")
+        self.every = every
+
+    def capacity_for(self, expected_iterations: int) -> int:
+        return expected_iterations // self.every + 2
+
+    def record(
+        self, iteration: int, temp: float, best_fitness: int, improved: bool
+    ) -> None:
+        if iteration % self.every == 0 or iteration == 1:
+            self._store(iteration, temp, best_fitness)
+
+
+class ImprovementTrace(Trace):
+    """
+    A trace that records the first iteration and every iteration in which the best fitness improved.
+    """
+
+    def capacity_for(self, expected_iterations: int) -> int:
+        # The best fitness is a non-negative integer that only decreases, so improvements are few.
+        return 64
+
+    def record(
+        self, iteration: int, temp: float, best_fitness: int, improved: bool
+    ) -> None:
+        if improved or iteration == 1:
+            self._store(iteration, temp, best_fitness)
+
+
+class LogSpacedTrace(Trace):
+    """
+    A trace that records iterations spaced evenly on a logarithmic scale, dense at the start of the run and sparse at the end.
+    """
+
+    def __init__(self, points_per_decade: int = 20) -> None:
+        """
+        Args:
+            points_per_decade (int): The number of records kept per factor of ten in the iteration number.
+        """
+        super().__init__()
+        if points_per_decade < 1:
+            raise ValueError("The number of points per decade must be at least 1.")
+        self.points_per_decade = points_per_decade
+        self.ratio = 10 ** (1 / points_per_decade)
+        self.next_iteration = 1
+
+    def reset(self, expected_iterations: int) -> None:
+        super().reset(expected_iterations)
+        self.next_iteration = 1
+
+    def capacity_for(self, expected_iterations: int) -> int:
+        decades = math.log10(max(expected_iterations, 1))
+        return int(self.points_per_decade * (decades + 1)) + 2
+
+    def record(
+        self, iteration: int, temp: float, best_fitness: int, improved: bool
+    ) -> None:
+        if iteration >= self.next_iteration:
+            self._store(iteration, temp, best_fitness)
+            self.next_iteration = max(
+                iteration + 1, math.ceil(self.next_iteration * self.ratio)
+            )
+
+
+class RingBufferTrace(Trace):
+    """
+    A trace that keeps only the most recent iterations in a fixed-size ring buffer.
+    """
+
+    def __init__(self, size: int) -> None:
+        """
+        Args:
+            size (int): The number of most recent iterations to keep.
+        """
+        super().__init__()
+        if size < 1:
+            raise ValueError("The ring buffer size must be at least 1.")
+        self.ring_size = size
+        self.position = 0  # Slot that the next record overwrites.
+
+    def reset(self, expected_iterations: int) -> None:
+        super().reset(expected_iterations)
+        self.position = 0
+
+    def capacity_for(self, expected_iterations: int) -> int:
+        return self.ring_size
+
+    def _store(self, iteration: int, temp: float, best_fitness: int) -> None:
+        self.iterations[self.position] = iteration
+        self.temps[self.position] = temp
+        self.best[self.position] = best_fitness
+        self.position = (self.position + 1) % self.ring_size
+        self.size = min(self.size + 1, self.ring_size)
+        self.last_iteration = iteration
+        self.last_best = best_fitness
+
+    def as_arrays(self) -> tuple:
+        if self.size < self.ring_size:
+            return super().as_arrays()
+        order = np.roll(np.arange(self.ring_size), -self.position)
+        return self.iterations[order], self.temps[order], self.best[order]
+
+
+TRACE_POLICIES = ("all", "off", "every", "improvement", "log", "ring")
+
+
+def make_trace(policy: str = "all", value: int = None) -> Trace:
+    """
+    Creates a trace from a policy name, as used on the command line.
+
+    Args:
+        policy (str): One of "all", "off", "every", "improvement", "log" or "ring".
+        value (int): The parameter of the policy: the period for "every", the points per decade for "log",
+                     or the buffer size for "ring". Ignored by the other policies.
+
+    Returns:
+        Trace: A new trace implementing the policy.
+    """
+    if policy == "all":
+        return Trace()
+    if policy == "off":
+        return NoTrace()
+    if policy == "every":
+        return EveryNTrace(value or 100)
+    if policy == "improvement":
+        return ImprovementTrace()
+    if policy == "log":
+        return LogSpacedTrace(value or 20)
+    if policy == "ring":
+        return RingBufferTrace(value or 1000)
+    raise ValueError(
+        f"Unknown trace policy {policy!r}, expected one of {', '.join(TRACE_POLICIES)}."
+    )
@@ -0,0 +1,384 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+from multiprocessing import Pool
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from SA import SimulatedAnnealing
+from runner import available_cpus
+from solution import SingleSolution, BOX_SIZE
+from tracing import NoTrace
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+BENCHMARK_GROUPS = ("micro", "throughput", "solve", "scaling", "grids")
+
+# The schedule of the command line defaults, used by the end-to-end benchmarks.
+MIN_TEMP = 1e-7
+MAX_TEMP = 1e8
+COOLING_RATE = 0.999
+
+
+def make_puzzles(
+    count: int, clues: int = 36, seed: int = 0, box_size: int = BOX_SIZE
+) -> list:
+    """
+    Generates a fixed set of puzzles, so the benchmarks run offline and always on the same inputs.
+    Each puzzle is a shuffled copy of a valid grid (digits relabelled, rows, columns, bands and stacks permuted)
+    with all but `clues` cells emptied. The puzzles are always solvable, although not necessarily uniquely.
+
+    Args:
+        count (int): The number of puzzles.
+        clues (int): The number of filled cells of each puzzle.
+        seed (int): Seed of the generator.
+        box_size (int): The side of the boxes: 3 for 9x9 puzzles, 4 for 16x16, 5 for 25x25.
+
+    Returns:
+        list: The puzzles, as lists of lists of integers with 0 for the empty cells.
+    """
+    rng = random.Random(seed)
+    size = box_size * box_size
+    puzzles = []
+    for _ in range(count):
+        digits = list(range(1, size + 1))
+        rng.shuffle(digits)
+        rows = _shuffled_lines(rng, box_size)
+        cols = _shuffled_lines(rng, box_size)
+        grid = [
+            [digits[(row * box_size + row // box_size + col) % size] for col in cols]
+            for row in rows
+        ]
+        for cell in rng.sample(range(size * size), size * size - clues):
+            grid[cell // size][cell % size] = 0
+        puzzles.append(grid)
+    return puzzles
+
+
+def _shuffled_lines(rng: random.Random, box_size: int) -> list:
+    # Lines can be permuted within a band, and bands permuted as a whole, without breaking a valid grid.
+    bands = list(range(box_size))
+    rng.shuffle(bands)
+    lines = []
+    for band in bands:
+        offsets = list(range(box_size))
+        rng.shuffle(offsets)
+        lines.extend(band * box_size + offset for offset in offsets)
+    return lines
+
+
+def _metric(value: float, unit: str, better: str) -> dict:
+    return {"value": value, "unit": unit, "better": better}
+
+
+def _time_per_call(statement, setup=None, repeat: int = 5) -> float:
+    """
+    Returns the best time per call of a statement over several repeats, in nanoseconds.
+    """
+    timer = timeit.Timer(statement, setup or "pass")
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e9
+
+
+def bench_micro(quick: bool = False) -> dict:
+    """
+    Measures the cost of the elementary operations of the annealing loop.
+    """
+    random.seed(0)
+    puzzle = make_puzzles(1)[0]
+    state = SingleSolution(puzzle, puzzle)
+    state.generate_solution()
+    repeat = 3 if quick else 5
+    return {
+        "fitness_ns": _metric(
+            _time_per_call(state.fitness, repeat=repeat), "ns", "lower"
+        ),
+        "mutate_ns": _metric(
+            _time_per_call(state.mutate, repeat=repeat), "ns", "lower"
+        ),
+        "propose_move_ns": _metric(
+            _time_per_call(state.propose_move, repeat=repeat), "ns", "lower"
+        ),
+        "generate_solution_ns": _metric(
+            _time_per_call(state.generate_solution, repeat=repeat), "ns", "lower"
+        ),
+        "accept_prob_ns": _metric(
+            _time_per_call(
+                lambda: SimulatedAnnealing.accept_prob(10, 12, 0.5), repeat=repeat
+            ),
+            "ns",
+            "lower",
+        ),
+    }
+
+
+def _anneal(params: tuple) -> tuple:
+    """
+    Runs SimulatedAnnealing on one puzzle with a fixed seed and without trace. Executed on the worker processes
+    by the scaling benchmark.
+
+    Args:
+        params (tuple): The puzzle, the seed, the minimum and maximum temperatures, the cooling rate
+                        and the iteration budget (or None).
+
+    Returns:
+        tuple: The final fitness, the iterations performed and the elapsed time.
+    """
+    puzzle, seed, min_temp, max_temp, cooling_rate, max_iterations = params
+    solver = SimulatedAnnealing(
+        puzzle,
+        min_temp,
+        max_temp,
+        cooling_rate,
+        trace=NoTrace(),
+        max_iterations=max_iterations,
+        seed=seed,
+    )
+    start = time.perf_counter()
+    _, fitness, _ = solver.run(seed)
+    return fitness, solver.iterations, time.perf_counter() - start
+
+
+def _fixed_work(puzzles: list, iterations: int) -> list:
+    # At a constant temperature of 1000 every move is accepted and no run can stop early,
+    # so each task performs exactly `iterations` iterations.
+    return [
+        (puzzle, seed, 1e-3, 1e3, 0.9999999, iterations)
+        for seed, puzzle in enumerate(puzzles)
+    ]
+
+
+def bench_throughput(quick: bool = False) -> dict:
+    """
+    Measures the iterations per second of SimulatedAnnealing.run on seeded puzzles.
+    """
+    tasks = _fixed_work(make_puzzles(3), 20_000 if quick else 100_000)
+    rates = [iterations / elapsed for _, iterations, elapsed in map(_anneal, tasks)]
+    return {"sa_iterations_per_s": _metric(statistics.median(rates), "it/s", "higher")}
+
+
+def bench_solve(quick: bool = False) -> dict:
+    """
+    Solves a fixed puzzle set end to end with the default schedule, and reports the distribution
+    of the time to solution and the success rate.
+    """
+    puzzles = make_puzzles(5 if quick else 20, clues=30)
+    results = [
+        _anneal((puzzle, seed, MIN_TEMP, MAX_TEMP, COOLING_RATE, None))
+        for seed, puzzle in enumerate(puzzles)
+    ]
+    solved_times = [elapsed for fitness, _, elapsed in results if fitness == 0]
+    all_times = sorted(elapsed for _, _, elapsed in results)
+    metrics = {
+        "solve_success_rate": _metric(
+            len(solved_times) / len(results), "fraction", "higher"
+        ),
+        "solve_time_median_s": _metric(statistics.median(all_times), "s", "lower"),
+        "solve_time_p90_s": _metric(
+            all_times[min(int(0.9 * len(all_times)), len(all_times) - 1)], "s", "lower"
+        ),
+    }
+    if solved_times:
+        metrics["time_to_solution_median_s"] = _metric(
+            statistics.median(solved_times), "s", "lower"
+        )
+    return metrics
+
+
+def bench_scaling(quick: bool = False) -> dict:
+    """
+    Measures the puzzle throughput of a process pool for increasing process counts, up to the available CPUs.
+    Every task performs the same number of iterations, so the work per puzzle does not depend on the process count.
+    """
+    cpus = available_cpus()
+    counts = sorted(
+        {1, cpus} | {2**k for k in range(1, cpus.bit_length()) if 2**k < cpus}
+    )
+    iterations = 5_000 if quick else 20_000
+    metrics = {}
+    for processes in counts:
+        tasks = _fixed_work(make_puzzles(4 * processes), iterations)
+        with Pool(processes) as pool:
+            pool.map(_anneal, tasks[:processes])  # Warm the workers up.
+            start = time.perf_counter()
+            pool.map(_anneal, tasks, chunksize=1)
+            elapsed = time.perf_counter() - start
+        metrics[f"scaling_{processes}p_puzzles_per_s"] = _metric(
+            len(tasks) / elapsed, "puzzles/s", "higher"
+        )
+    return metrics
+
+
+def bench_grids(quick: bool = False) -> dict:
+    """
+    Measures how the cost of the hot path grows with the grid: 9x9, 16x16 and 25x25 puzzles with 40% of clues.
+    """
+    iterations = 10_000 if quick else 50_000
+    metrics = {}
+    for box_size in (3, 4, 5):
+        size = box_size * box_size
+        puzzle = make_puzzles(1, clues=size * size * 2 // 5, box_size=box_size)[0]
+        random.seed(0)
+        state = SingleSolution(puzzle, puzzle)
+        state.generate_solution()
+        metrics[f"grid_{size}_fitness_ns"] = _metric(
+            _time_per_call(state.fitness, repeat=3), "ns", "lower"
+        )
+        metrics[f"grid_{size}_propose_move_ns"] = _metric(
+            _time_per_call(state.propose_move, repeat=3), "ns", "lower"
+        )
+        _, done, elapsed = _anneal((puzzle, 0, 1e-3, 1e3, 0.9999999, iterations))
+        metrics[f"grid_{size}_iterations_per_s"] = _metric(
+            done / elapsed, "it/s", "higher"
+        )
+    return metrics
+
+
+BENCHMARKS = {
+    "micro": bench_micro,
+    "throughput": bench_throughput,
+    "solve": bench_solve,
+    "scaling": bench_scaling,
+    "grids": bench_grids,
+}
+
+
+def run_benchmarks(groups=BENCHMARK_GROUPS, quick: bool = False) -> dict:
+    """
+    Runs the selected benchmark groups.
+
+    Args:
+        groups: The names of the groups to run, among BENCHMARK_GROUPS.
+        quick (bool): Whether to use smaller workloads, for a fast but noisier measurement.
+
+    Returns:
+        dict: The results, with a "machine" section describing where they were measured
+              and a "metrics" section mapping each metric name to its value, unit and direction.
+    """
+    metrics = {}
+    for group in groups:
+        print(f"Running {group} benchmarks...")
+        metrics.update(BENCHMARKS[group](quick))
+    return {
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpus": available_cpus(),
+        },
+        "quick": quick,
+        "metrics": metrics,
+    }
+
+
+def compare_results(current: dict, baseline: dict, tolerance: float = 0.25) -> list:
+    """
+    Compares results against a baseline. Metrics missing from either side are skipped.
+
+    Args:
+        current (dict): Results returned by run_benchmarks.
+        baseline (dict): Results of a previous run, usually read from baseline.json.
+        tolerance (float): The relative change allowed before a metric counts as a regression.
+
+    Returns:
+        list: One (name, baseline value, current value, relative change, regressed) tuple per compared metric.
+              The relative change is positive when the metric got better.
+    """
+    rows = []
+    for name, metric in current["metrics"].items():
+        reference = baseline["metrics"].get(name)
+        if reference is None:
+            continue
+        old, new = reference["value"], metric["value"]
+        if old == 0:
+            change = 0.0 if new == old else float("inf")
+            if metric["better"] == "lower":
+                change = -change
+        else:
+            change = (new - old) / abs(old)
+            if metric["better"] == "lower":
+                change = -change
+        rows.append((name, old, new, change, change < -tolerance))
+    return rows
+
+
+def print_comparison(rows: list) -> None:
+    """
+    Prints the output of compare_results as a table.
+    """
+    print(f"{'Metric':32} {'Baseline':>14} {'Current':>14} {'Change':>9}")
+    for name, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:32} {old:14.6g} {new:14.6g} {change:+9.1%}{flag}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parses the command line options of the benchmark suite.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Sudoku solver and compare against a baseline."
+    )
+    parser.add_argument(
+        "--groups",
+        nargs="+",
+        choices=BENCHMARK_GROUPS,
+        default=list(BENCHMARK_GROUPS),
+        help="Benchmark groups to run (default: all).",
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="Use smaller, noisier workloads."
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE_FILE,
+        help="Baseline JSON file to compare against (default: benchmarks/baseline.json).",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Relative slowdown tolerated before a metric fails the comparison.",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Overwrite the baseline with these results instead of comparing.",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run_benchmarks(args.groups, args.quick)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline saved to {args.baseline}.")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline["machine"] != results["machine"]:
+            print("Warning: the baseline was measured on a different machine.")
+        if baseline["quick"] != results["quick"]:
+            print("Warning: the baseline and these results use different workloads.")
+        rows = compare_results(results, baseline, args.tolerance)
+        print_comparison(rows)
+        if any(regressed for *_, regressed in rows):
+            sys.exit(1)
+    else:
+        print(json.dumps(results["metrics"], indent=2))
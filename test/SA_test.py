@@ -82,3 +82,139 @@ def test_mutate_changes_table(single_solution_instance):
             break
 
     assert True
+
+
+def test_run_returns_best_state(sim_anneal_instance, sudoku_puzzle):
+    # The returned table should keep the original clues, and the reported fitness should match it
+    best_table, best_fitness, additional_info_data = sim_anneal_instance.run(0)
+    assert SingleSolution(best_table, sudoku_puzzle).fitness() == best_fitness
+    for row_index in range(9):
+        for col_index in range(9):
+            if sudoku_puzzle[row_index][col_index] != 0:
+                assert (
+                    best_table[row_index][col_index]
+                    == sudoku_puzzle[row_index][col_index]
+                )
+    assert best_fitness == min(data[2] for data in additional_info_data)
+
+
+def test_trace_policies(sudoku_puzzle):
+    # Each trace policy should keep its own subset of iterations and always end on the final result
+    from tracing import make_trace
+
+    full_run = SimulatedAnnealing(sudoku_puzzle, 0.1, 10, 0.95).run(0)[2]
+    iterations = len(full_run)
+    assert [data[0] for data in full_run] == list(range(1, iterations + 1))
+
+    for policy, value, expected_max in [
+        ("off", None, 0),
+        ("every", 10, iterations // 10 + 2),
+        ("log", 5, 20),
+        ("ring", 8, 8),
+        ("improvement", None, iterations),
+    ]:
+        solver = SimulatedAnnealing(
+            sudoku_puzzle, 0.1, 10, 0.95, trace=make_trace(policy, value)
+        )
+        _, best_fitness, trace = solver.run(0)
+        rows = list(trace)
+        assert len(rows) <= expected_max
+        if policy != "off":
+            assert rows[-1][2] == best_fitness
+            assert [row[0] for row in rows] == sorted(row[0] for row in rows)
+
+
+def test_iteration_budget(sudoku_puzzle):
+    solver = SimulatedAnnealing(sudoku_puzzle, 1e-7, 1e8, 0.999, max_iterations=50)
+    _, _, additional_info_data = solver.run(0)
+    assert solver.iterations <= 50
+    assert len(additional_info_data) == solver.iterations
+
+
+def test_time_budget(sudoku_puzzle):
+    solver = SimulatedAnnealing(sudoku_puzzle, 1e-7, 1e8, 0.9999999, time_limit=0.05)
+    solver.run(0)
+    assert solver.iterations < solver.expected_iterations()
+
+
+def test_stop_flag(sudoku_puzzle):
+    # A raised stop flag cancels the run before it starts iterating
+    from multiprocessing import Value
+
+    stop_flag = Value("b", 1, lock=False)
+    solver = SimulatedAnnealing(sudoku_puzzle, 0.1, 10, 0.95, stop_flag=stop_flag)
+    solver.run(0)
+    assert solver.iterations == 0
+
+
+def test_seeded_runs_are_reproducible(sudoku_puzzle):
+    # A run is determined by the seed and the process ID
+    def run(seed, process_id):
+        solver = SimulatedAnnealing(
+            deepcopy(sudoku_puzzle), 0.01, 10, 0.999, max_iterations=2000, seed=seed
+        )
+        table, fitness, trace = solver.run(process_id)
+        return table, fitness, list(trace)
+
+    assert run(5, 1) == run(5, 1)
+    assert run(5, 1) != run(5, 2)
+    assert run(5, 1) != run(6, 1)
+
+
+def test_run_status(sudoku_puzzle):
+    def run(**options):
+        solver = SimulatedAnnealing(deepcopy(sudoku_puzzle), 0.01, 10, 0.999, **options)
+        solver.run(0)
+        return solver
+
+    assert run(max_iterations=10, seed=0).status == "budget"
+    assert run(max_iterations=10, seed=0, finish_below=100).status == "solved"
+    assert run(seed=0).status in ("solved", "cooled")
+
+    # Temperature 10 keeps accepting worsening swaps; the best board stops improving and the chain
+    # restarts twice, then stagnates.
+    solver = SimulatedAnnealing(
+        deepcopy(sudoku_puzzle),
+        9,
+        10,
+        0.99999,
+        restart_patience=200,
+        max_restarts=2,
+        seed=0,
+    )
+    _, fitness, _ = solver.run(0)
+    assert (solver.status, solver.restarts) == ("stagnated", 2)
+    assert fitness > 0
+
+
+def test_exact_finisher(sudoku_puzzle):
+    # A run cut short near a solution is completed by the exact search
+    solver = SimulatedAnnealing(
+        sudoku_puzzle, 1e-7, 1e8, 0.999, max_iterations=10, seed=0, finish_below=100
+    )
+    table, fitness, trace = solver.run(0)
+    assert solver.finished
+    assert fitness == 0
+    assert SingleSolution(table, sudoku_puzzle).fitness() == 0
+    assert all(
+        clue == 0 or value == clue
+        for row, clues in zip(table, sudoku_puzzle)
+        for value, clue in zip(row, clues)
+    )
+    assert list(trace)[-1][2] == 0
+
+
+def test_larger_grid():
+    # A 16x16 puzzle with a few empty cells per box is solved, keeping its clues
+    solution = [
+        [(row * 4 + row // 4 + col) % 16 + 1 for col in range(16)] for row in range(16)
+    ]
+    puzzle = [
+        [0 if (row + col) % 8 == 0 else value for col, value in enumerate(line)]
+        for row, line in enumerate(solution)
+    ]
+    solver = SimulatedAnnealing(puzzle, 1e-3, 2, 0.999, max_iterations=50_000)
+    best_table, best_fitness, _ = solver.run(0)
+    assert solver.size == 16
+    assert best_fitness == 0
+    assert best_table == solution
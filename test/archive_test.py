@@ -0,0 +1,86 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from archive import RunArchive, RunArchiveWriter
+
+
+def make_trace(length, offset=0):
+    iterations = np.arange(1, length + 1, dtype=np.int64) + offset
+    return iterations, 1.0 / iterations, np.arange(length, dtype=np.int32)[::-1]
+
+
+def test_round_trip(tmp_path):
+    # Runs are added in completion order, and read back by process ID
+    path = str(tmp_path / "runs.sda")
+    solution = np.arange(81).reshape(9, 9) % 9 + 1
+    with RunArchiveWriter(path, metadata={"seed": 3}) as writer:
+        writer.add(2, solution, 0, 500, 0.25, "solved", make_trace(7))
+        writer.add(0, None, None, None, 0.1, "error")
+        writer.add(1, solution[::-1], 4, 900, 0.5, "cooled", make_trace(3, 100))
+        writer.metadata["elapsed"] = 1.5
+
+    with RunArchive(path) as archive:
+        assert len(archive) == 3
+        assert list(archive.process_ids) == [0, 1, 2]
+        assert archive.metadata == {"seed": 3, "elapsed": 1.5}
+        assert archive.solution(2) == solution.tolist()
+        assert archive.solution(1) == solution[::-1].tolist()
+        assert archive.result(1) == {
+            "fitness": 4,
+            "iterations": 900,
+            "elapsed": 0.5,
+            "status": "cooled",
+        }
+        assert archive.result(0)["status"] == "error"
+        assert archive.result(0)["fitness"] == -1
+
+        iterations, temps, best = archive.trace(2)
+        assert list(iterations) == list(range(1, 8))
+        assert temps[0] == 1.0 and list(best) == list(range(7))[::-1]
+        assert list(archive.trace(1)[0]) == [101, 102, 103]
+        assert len(archive.trace(0)[0]) == 0
+        assert 3 not in archive
+        with pytest.raises(KeyError):
+            archive.trace(3)
+
+
+def test_extend_keeps_the_last_run(tmp_path):
+    # Resuming copies the previous runs; a puzzle solved again replaces its previous run
+    path = str(tmp_path / "runs.sda")
+    solution = np.ones((4, 4))
+    with RunArchiveWriter(path) as writer:
+        writer.add(0, solution, 2, 10, 0.1, "cooled", make_trace(5))
+        writer.add(1, solution, 0, 10, 0.1, "solved", make_trace(2))
+    with RunArchive(path) as previous, RunArchiveWriter(path) as writer:
+        writer.extend(previous)
+        writer.add(0, solution * 2, 0, 20, 0.2, "solved", make_trace(4, 10))
+
+    with RunArchive(path) as archive:
+        assert archive.table_size == 4
+        assert list(archive.process_ids) == [0, 1]
+        assert archive.result(0)["iterations"] == 20
+        assert archive.solution(0) == (solution * 2).tolist()
+        assert list(archive.trace(0)[0]) == [11, 12, 13, 14]
+        assert len(archive.trace(1)[0]) == 2
+    assert sorted(os.listdir(tmp_path)) == ["runs.sda"]
+
+
+def test_invalid_files(tmp_path):
+    path = tmp_path / "runs.sda"
+    path.write_bytes(b"SDKB" + bytes(28))
+    with pytest.raises(ValueError):
+        RunArchive(str(path))
+    with RunArchiveWriter(str(path)) as writer:
+        writer.add(0, np.ones((9, 9)), 0, 1, 0.1, "solved")
+        with pytest.raises(ValueError):
+            writer.add(1, np.ones((4, 4)), 0, 1, 0.1, "solved")
+    path.write_bytes(path.read_bytes()[:-10])
+    with pytest.raises(ValueError):
+        RunArchive(str(path))
@@ -0,0 +1,124 @@
+import pytest
+import sys
+import os
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from batch_SA import BatchSimulatedAnnealing
+from solution import SingleSolution, TABLE_SIZE, BOX_SIZE
+import numpy as np
+
+
+@pytest.fixture
+def sudoku_puzzle():
+    return [
+        [5, 3, 0, 0, 7, 0, 0, 0, 0],
+        [6, 0, 0, 1, 9, 5, 0, 0, 0],
+        [0, 9, 8, 0, 0, 0, 0, 6, 0],
+        [8, 0, 0, 0, 6, 0, 0, 0, 3],
+        [4, 0, 0, 8, 0, 3, 0, 0, 1],
+        [7, 0, 0, 0, 2, 0, 0, 0, 6],
+        [0, 6, 0, 0, 0, 0, 2, 8, 0],
+        [0, 0, 0, 4, 1, 9, 0, 0, 5],
+        [0, 0, 0, 0, 8, 0, 0, 7, 9],
+    ]
+
+
+@pytest.fixture
+def batch_instance(sudoku_puzzle):
+    empty_puzzle = [[0] * TABLE_SIZE for _ in range(TABLE_SIZE)]
+    return BatchSimulatedAnnealing(
+        [sudoku_puzzle, empty_puzzle],
+        min_temp=0.01,
+        max_temp=2,
+        cooling_rate=0.99,
+        restarts=4,
+        seed=0,
+    )
+
+
+def test_initialization(batch_instance):
+    assert batch_instance.boards.shape == (8, TABLE_SIZE, TABLE_SIZE)
+    assert batch_instance.boards.dtype == np.uint8
+    assert list(batch_instance.puzzle_index) == [0, 0, 0, 0, 1, 1, 1, 1]
+
+
+def test_generate_solutions(batch_instance, sudoku_puzzle):
+    # Every box of every chain should contain 1 to 9, the clues should be kept, and the energies should match a full recount
+    batch_instance.generate_solutions()
+    for chain, board in enumerate(batch_instance.boards):
+        for row_index in range(0, TABLE_SIZE, BOX_SIZE):
+            for col_index in range(0, TABLE_SIZE, BOX_SIZE):
+                box = board[
+                    row_index : row_index + BOX_SIZE, col_index : col_index + BOX_SIZE
+                ]
+                assert set(box.flatten()) == set(range(1, TABLE_SIZE + 1))
+        original = batch_instance.original[chain]
+        assert (board[original != 0] == original[original != 0]).all()
+        assert (
+            SingleSolution(board.tolist(), original.tolist()).fitness()
+            == batch_instance.energy[chain]
+        )
+
+
+def test_run_keeps_energy_consistent(batch_instance):
+    # After the run, the incrementally updated energies should still match the boards
+    best_boards, best_energy, iterations = batch_instance.run()
+    for chain in range(len(best_boards)):
+        original = batch_instance.original[chain].tolist()
+        assert (
+            SingleSolution(batch_instance.boards[chain].tolist(), original).fitness()
+            == batch_instance.energy[chain]
+        )
+        assert (
+            SingleSolution(best_boards[chain].tolist(), original).fitness()
+            == best_energy[chain]
+        )
+    assert (iterations > 0).all()
+
+
+def test_best_per_puzzle(batch_instance):
+    batch_instance.run()
+    best_boards, best_energy, chains = batch_instance.best_per_puzzle()
+    assert best_boards.shape == (2, TABLE_SIZE, TABLE_SIZE)
+    assert best_energy[0] == batch_instance.best_energy[:4].min()
+    assert best_energy[1] == batch_instance.best_energy[4:].min()
+    assert list(batch_instance.puzzle_index[chains]) == [0, 1]
+
+
+def test_larger_grid():
+    # 16x16 boards keep their clues and consistent energies
+    puzzle = [[0] * 16 for _ in range(16)]
+    puzzle[0] = list(range(1, 17))
+    batch = BatchSimulatedAnnealing(
+        [puzzle], min_temp=0.1, max_temp=2, cooling_rate=0.9, restarts=2, seed=0
+    )
+    best_boards, best_energy, _ = batch.run()
+    assert best_boards.shape == (2, 16, 16)
+    for chain in range(2):
+        assert list(best_boards[chain][0]) == puzzle[0]
+        assert (
+            SingleSolution(best_boards[chain].tolist(), puzzle).fitness()
+            == best_energy[chain]
+        )
+
+
+def test_flat_input(sudoku_puzzle):
+    # Flat puzzles of N * N cells are read as N x N grids, and a 2-D array is always a batch of flat puzzles
+    flat = np.array(sudoku_puzzle).reshape(1, -1)
+    batch = BatchSimulatedAnnealing(
+        np.vstack([flat, np.zeros((1, 81))]), min_temp=0.1, max_temp=2
+    )
+    assert batch.size == TABLE_SIZE
+    assert batch.original.shape == (2, TABLE_SIZE, TABLE_SIZE)
+    assert batch.original[0].tolist() == sudoku_puzzle
+    batch = BatchSimulatedAnnealing(np.zeros((81, 81)), 1, 2)
+    assert batch.original.shape == (81, TABLE_SIZE, TABLE_SIZE)
+    assert BatchSimulatedAnnealing(np.zeros((16, 16)), 1, 2).size == 4
+    assert BatchSimulatedAnnealing(np.zeros((1, 16, 16)), 1, 2).num_puzzles == 1
+    for shape in ((2, 80), (81,), (2, 9, 8)):
+        with pytest.raises(ValueError):
+            BatchSimulatedAnnealing(np.zeros(shape), 0.1, 2)
@@ -0,0 +1,59 @@
+import pytest
+import sys
+import os
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+)
+
+from benchmark import make_puzzles, compare_results, run_benchmarks
+from presolve import presolve
+
+
+def test_make_puzzles_is_deterministic_and_valid():
+    puzzles = make_puzzles(5, clues=30, seed=3)
+    assert puzzles == make_puzzles(5, clues=30, seed=3)
+    assert puzzles != make_puzzles(5, clues=30, seed=4)
+    for puzzle in puzzles:
+        assert sum(1 for row in puzzle for value in row if value) == 30
+        presolve(puzzle)  # Raises if the clues contradict each other.
+
+
+def results(**values):
+    return {
+        "metrics": {
+            name: {"value": value, "unit": "", "better": better}
+            for name, (value, better) in values.items()
+        }
+    }
+
+
+def test_compare_results():
+    baseline = results(
+        mutate_ns=(1000, "lower"),
+        sa_iterations_per_s=(1e5, "higher"),
+        gone=(1, "lower"),
+    )
+    current = results(
+        mutate_ns=(1400, "lower"),
+        sa_iterations_per_s=(1.1e5, "higher"),
+        new=(1, "lower"),
+    )
+    rows = {row[0]: row for row in compare_results(current, baseline, tolerance=0.25)}
+    assert set(rows) == {"mutate_ns", "sa_iterations_per_s"}
+    assert rows["mutate_ns"][3] == pytest.approx(-0.4)
+    assert rows["mutate_ns"][4]
+    assert rows["sa_iterations_per_s"][3] == pytest.approx(0.1)
+    assert not rows["sa_iterations_per_s"][4]
+
+
+def test_run_benchmarks_format():
+    output = run_benchmarks(["throughput"], quick=True)
+    metric = output["metrics"]["sa_iterations_per_s"]
+    assert metric["value"] > 0
+    assert metric["better"] == "higher"
+    assert output["machine"]["cpus"] >= 1
@@ -0,0 +1,84 @@
+import pytest
+import sys
+import os
+import random
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from cache import LRU, SolutionCache, solves
+from canonical import Transform
+
+SOLUTION = [
+    [5, 3, 4, 6, 7, 8, 9, 1, 2],
+    [6, 7, 2, 1, 9, 5, 3, 4, 8],
+    [1, 9, 8, 3, 4, 2, 5, 6, 7],
+    [8, 5, 9, 7, 6, 1, 4, 2, 3],
+    [4, 2, 6, 8, 5, 3, 7, 9, 1],
+    [7, 1, 3, 9, 2, 4, 8, 5, 6],
+    [9, 6, 1, 5, 3, 7, 2, 8, 4],
+    [2, 8, 7, 4, 1, 9, 6, 3, 5],
+    [3, 4, 5, 2, 8, 6, 1, 7, 9],
+]
+
+
+@pytest.fixture
+def sudoku_puzzle():
+    return [
+        [5, 3, 0, 0, 7, 0, 0, 0, 0],
+        [6, 0, 0, 1, 9, 5, 0, 0, 0],
+        [0, 9, 8, 0, 0, 0, 0, 6, 0],
+        [8, 0, 0, 0, 6, 0, 0, 0, 3],
+        [4, 0, 0, 8, 0, 3, 0, 0, 1],
+        [7, 0, 0, 0, 2, 0, 0, 0, 6],
+        [0, 6, 0, 0, 0, 0, 2, 8, 0],
+        [0, 0, 0, 4, 1, 9, 0, 0, 5],
+        [0, 0, 0, 0, 8, 0, 0, 7, 9],
+    ]
+
+
+def test_lru():
+    lru = LRU(2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    lru.get("a")
+    lru.put("c", 3)  # Forgets b, the least recently used.
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+    assert len(lru) == 2
+
+
+def test_solves(sudoku_puzzle):
+    assert solves(sudoku_puzzle, SOLUTION)
+    wrong = [row[:] for row in SOLUTION]
+    wrong[0][0], wrong[0][1] = wrong[0][1], wrong[0][0]
+    assert not solves(sudoku_puzzle, wrong)
+
+
+def test_cache_hits(tmp_path, sudoku_puzzle):
+    cache = SolutionCache(str(tmp_path / "cache.db"))
+    assert cache.get(sudoku_puzzle) is None
+    cache.put(sudoku_puzzle, SOLUTION)
+    assert cache.get(sudoku_puzzle) == SOLUTION
+    cache.close()
+
+    # An equivalent puzzle is answered from the database by another cache, through the inverse transform
+    transform = Transform(
+        True,
+        (3, 5, 4, 0, 1, 2, 8, 6, 7),
+        (2, 1, 0, 6, 7, 8, 3, 4, 5),
+        (0, 9, 8, 7, 6, 5, 4, 3, 2, 1),
+    )
+    equivalent = transform.apply(sudoku_puzzle)
+    other = SolutionCache(str(tmp_path / "cache.db"))
+    solution = other.get(equivalent)
+    assert solution == transform.apply(SOLUTION)
+    assert (other.hits, other.misses) == (1, 0)
+
+
+def test_cache_ignores_wrong_solutions(sudoku_puzzle):
+    cache = SolutionCache()
+    cache.put(sudoku_puzzle, [row[::-1] for row in SOLUTION])
+    assert cache.get(sudoku_puzzle) is None
+    assert cache.misses == 1
@@ -0,0 +1,64 @@
+import pytest
+import sys
+import os
+import random
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+)
+
+from canonical import Transform, canonicalize, format_table, parse_puzzle
+from benchmark import make_puzzles
+
+
+def random_transform(size, box_size, rng):
+    bands = rng.sample(range(box_size), box_size)
+    stacks = rng.sample(range(box_size), box_size)
+    rows = [
+        band * box_size + row
+        for band in bands
+        for row in rng.sample(range(box_size), box_size)
+    ]
+    cols = [
+        stack * box_size + col
+        for stack in stacks
+        for col in rng.sample(range(box_size), box_size)
+    ]
+    labels = rng.sample(range(1, size + 1), size)
+    return Transform(rng.random() < 0.5, tuple(rows), tuple(cols), (0, *labels))
+
+
+@pytest.mark.parametrize("box_size, clues", [(3, 17), (3, 30), (4, 100)])
+def test_equivalent_puzzles_share_the_canonical_form(box_size, clues):
+    rng = random.Random(box_size * clues)
+    size = box_size * box_size
+    for puzzle in make_puzzles(10, clues=clues, seed=clues, box_size=box_size):
+        key, transform = canonicalize(puzzle)
+        assert format_table(transform.apply(puzzle)) == key
+        assert transform.invert(transform.apply(puzzle)) == puzzle
+        for _ in range(3):
+            equivalent = random_transform(size, box_size, rng).apply(puzzle)
+            assert canonicalize(equivalent)[0] == key
+
+
+def test_different_puzzles_have_different_forms():
+    puzzles = make_puzzles(20, clues=30, seed=1)
+    assert len({canonicalize(puzzle)[0] for puzzle in puzzles}) == 20
+
+
+def test_symmetric_puzzles_are_not_canonicalized():
+    # Every transform of the empty grid gives the same grid: far too many candidates to compare
+    assert canonicalize([[0] * 9 for _ in range(9)]) is None
+
+
+def test_puzzle_strings():
+    puzzle = "53..7....6..195....98....6.8...6...34..8.3..17...2...6.6....28....419..5....8..79"
+    table = parse_puzzle(puzzle)
+    assert table[0] == [5, 3, 0, 0, 7, 0, 0, 0, 0]
+    assert format_table(table) == puzzle.replace(".", "0")
+    with pytest.raises(ValueError):
+        parse_puzzle("X" + puzzle[1:])
@@ -0,0 +1,87 @@
+import pytest
+import sys
+import os
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from checkpoint import checkpoint_path, save_checkpoint, load_checkpoint
+from observer import Observer
+from SA import SimulatedAnnealing
+
+
+@pytest.fixture
+def sudoku_puzzle():
+    return [
+        [5, 3, 0, 0, 7, 0, 0, 0, 0],
+        [6, 0, 0, 1, 9, 5, 0, 0, 0],
+        [0, 9, 8, 0, 0, 0, 0, 6, 0],
+        [8, 0, 0, 0, 6, 0, 0, 0, 3],
+        [4, 0, 0, 8, 0, 3, 0, 0, 1],
+        [7, 0, 0, 0, 2, 0, 0, 0, 6],
+        [0, 6, 0, 0, 0, 0, 2, 8, 0],
+        [0, 0, 0, 4, 1, 9, 0, 0, 5],
+        [0, 0, 0, 0, 8, 0, 0, 7, 9],
+    ]
+
+
+class Kill(Observer):
+    # Interrupts the run at a given iteration, as if the process had been killed
+    def __init__(self, at):
+        self.at = at
+
+    def iteration(self, iteration, temp, delta, accepted, best_fitness):
+        if iteration == self.at:
+            raise KeyboardInterrupt
+
+
+def solver(puzzle, tmp_path, **options):
+    return SimulatedAnnealing(
+        [row[:] for row in puzzle],
+        1e-7,
+        1e3,
+        0.9999,
+        max_iterations=300,
+        checkpoint_dir=str(tmp_path),
+        checkpoint_every=100,
+        **options,
+    )
+
+
+def test_save_and_load(tmp_path):
+    path = checkpoint_path(str(tmp_path), 3)
+    assert load_checkpoint(path) is None
+    save_checkpoint(path, {"temp": 1.5})
+    assert load_checkpoint(path)["temp"] == 1.5
+    assert os.listdir(tmp_path) == ["checkpoint_3.pkl"]
+
+
+def test_resume_continues_the_chain(tmp_path, sudoku_puzzle):
+    # A chain killed after its first checkpoint resumes where the checkpoint left it,
+    # ending exactly as the uninterrupted chain with the same seed
+    expected_table, expected_fitness, expected_trace = solver(
+        sudoku_puzzle, tmp_path / "reference", seed=1
+    ).run(0)
+
+    with pytest.raises(KeyboardInterrupt):
+        solver(sudoku_puzzle, tmp_path, observer=Kill(130), seed=1).run(0)
+    assert load_checkpoint(checkpoint_path(str(tmp_path), 0))["iterations"] == 100
+
+    # The seed is overridden by the state of the checkpoint.
+    resumed = solver(sudoku_puzzle, tmp_path, seed=2)
+    table, fitness, trace = resumed.run(0)
+    assert resumed.resumed
+    assert resumed.iterations == 300
+    assert (table, fitness) == (expected_table, expected_fitness)
+    assert list(trace) == list(expected_trace)
+    assert not os.path.exists(checkpoint_path(str(tmp_path), 0))
+
+
+def test_checkpoint_of_another_puzzle(tmp_path, sudoku_puzzle):
+    with pytest.raises(KeyboardInterrupt):
+        solver(sudoku_puzzle, tmp_path, observer=Kill(130)).run(0)
+    sudoku_puzzle[0][2] = 1
+    with pytest.raises(ValueError):
+        solver(sudoku_puzzle, tmp_path).run(0)
@@ -0,0 +1,111 @@
+import pytest
+import asyncio
+import json
+import sys
+import os
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from daemon import SolverDaemon, format_table, parse_puzzle, parse_request
+
+SOLUTION = (
+    "534678912672195348198342567859761423426853791713924856961537284287419635345286179"
+)
+# The solution with its diagonal emptied: a run solves it within a few iterations.
+PUZZLE = "".join(
+    "0" if index % 10 == 0 else value for index, value in enumerate(SOLUTION)
+)
+
+
+@pytest.fixture(scope="module")
+def daemon():
+    daemon = SolverDaemon(1, {"min_temp": 0.01, "max_temp": 2, "cooling_rate": 0.99})
+    daemon.start()
+    yield daemon
+    daemon.close()
+
+
+def test_parse_puzzle():
+    table = parse_puzzle(PUZZLE.replace("0", ".", 3))
+    assert table[0][:3] == [0, 3, 4]
+    assert format_table(table) == PUZZLE
+    assert parse_puzzle([[0] * 4 for _ in range(4)]) == [[0] * 4] * 4
+    assert format_table(parse_puzzle("G" + "0" * 255))[0] == "G"
+    for puzzle in (PUZZLE[:80], "X" + PUZZLE[1:], "0" * 8 + "5" * 8 + "0" * 9, 42):
+        with pytest.raises(ValueError):
+            parse_puzzle(puzzle)
+
+
+def test_parse_request():
+    assert parse_request(PUZZLE + "\n", 4) == (4, parse_puzzle(PUZZLE), {})
+    request_id, table, options = parse_request(
+        json.dumps({"id": "a", "puzzle": PUZZLE, "seed": 3}), 4
+    )
+    assert (request_id, table, options) == ("a", parse_puzzle(PUZZLE), {"seed": 3})
+    with pytest.raises(ValueError):
+        parse_request(json.dumps({"puzzle": PUZZLE, "sed": 3}), 0)
+    with pytest.raises(ValueError):
+        parse_request("{not json", 0)
+
+
+def test_handle_streams_responses(daemon):
+    async def lines():
+        yield PUZZLE.encode() + b"\n"
+        yield b"\n"  # Blank lines are not requests.
+        yield json.dumps({"id": "b", "puzzle": PUZZLE, "max_iterations": 5}).encode()
+        yield b"bad request\n"
+
+    responses = []
+    asyncio.run(daemon.handle(lines(), responses.append))
+    responses = {response["id"]: response for response in map(json.loads, responses)}
+
+    assert set(responses) == {0, "b", 2}
+    assert responses[0]["status"] == "solved"
+    assert responses[0]["solution"] == SOLUTION
+    assert responses[0]["latency"] >= responses[0]["elapsed"]
+    assert responses[0]["run_status"] == "solved"
+    assert responses["b"]["iterations"] <= 5
+    assert responses[2]["status"] == "error"
+
+
+def test_unix_socket(daemon, tmp_path):
+    path = str(tmp_path / "solver.sock")
+
+    async def session():
+        stop = asyncio.Event()
+        server = asyncio.create_task(daemon.serve_unix(path, stop))
+        while not os.path.exists(path):
+            await asyncio.sleep(0.01)
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(f"{PUZZLE}\n{PUZZLE}\n".encode())
+        writer.write_eof()
+        responses = [json.loads(line) async for line in reader]
+        writer.close()
+        stop.set()
+        await server
+        return responses
+
+    responses = asyncio.run(session())
+    assert sorted(response["id"] for response in responses) == [0, 1]
+    assert all(response["solution"] == SOLUTION for response in responses)
+    assert not os.path.exists(path)
+
+
+def test_seeded_streams_differ_across_connections(daemon):
+    # The n-th request of every connection gets its own random stream
+    request = json.dumps({"puzzle": "0" * 81, "seed": 1, "max_iterations": 10})
+
+    async def lines():
+        yield request.encode()
+
+    received = daemon.received
+    responses = []
+    for _ in range(2):
+        asyncio.run(daemon.handle(lines(), responses.append))
+    first, second = map(json.loads, responses)
+    assert first["id"] == second["id"] == 0
+    assert first["solution"] != second["solution"]
+    assert daemon.received == received + 2
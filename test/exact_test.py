@@ -0,0 +1,46 @@
+import pytest
+import sys
+import os
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from exact import solve_exact, consistent, consistent_cells, finish
+from cache import solves
+
+
+@pytest.fixture
+def hard_puzzle():
+    digits = "800000000003600000070090200050007000000045700000100030001000068008500010090000400"
+    return [[int(c) for c in digits[start : start + 9]] for start in range(0, 81, 9)]
+
+
+def test_solve_exact(hard_puzzle):
+    solution = solve_exact(hard_puzzle)
+    assert solves(hard_puzzle, solution)
+    assert hard_puzzle[0][1] == 0  # The input is not modified.
+    assert solve_exact(hard_puzzle, max_nodes=10) is None
+
+
+def test_solve_exact_larger_grid():
+    empty = [[0] * 16 for _ in range(16)]
+    assert solves(empty, solve_exact(empty))
+
+
+def test_contradictions(hard_puzzle):
+    hard_puzzle[0][1] = 8  # Twice in the first row.
+    assert not consistent(hard_puzzle)
+    assert solve_exact(hard_puzzle) is None
+
+
+def test_finish_near_solution(hard_puzzle):
+    solution = solve_exact(hard_puzzle)
+    # Swapping two mutable cells of a box leaves a state with a few conflicts, as the annealing would.
+    state = [row[:] for row in solution]
+    state[0][1], state[0][2] = state[0][2], state[0][1]
+    kept = consistent_cells(hard_puzzle, state)
+    assert kept[0][1] == kept[0][2] == 0
+    assert kept[0][0] == 8 and kept[8][8] == solution[8][8]
+    assert finish(hard_puzzle, state) == solution
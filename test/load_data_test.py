@@ -0,0 +1,167 @@
+import csv
+import io
+import pytest
+import sys
+import os
+import numpy as np
+
+# Fix import
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "utils")))
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from load_data import (
+    convert_dataset,
+    count_rows,
+    format_grids,
+    parse_args,
+    process_row,
+    shard_path,
+    to_cells,
+)
+from puzzle_store import open_store
+
+
+def make_dataset(path, count, size=9, seed=0):
+    """
+    Writes a dataset of random puzzle and solution strings, and returns the strings.
+    """
+    rng = np.random.default_rng(seed)
+    characters = np.array(list("0123456789ABCDEFGHIJKLMNOP"))
+    rows = [
+        (
+            "".join(rng.choice(characters[: size + 1], size * size)),
+            "".join(rng.choice(characters[1 : size + 1], size * size)),
+        )
+        for _ in range(count)
+    ]
+    path.write_text("quizzes,solutions\n" + "".join(f"{p},{s}\n" for p, s in rows))
+    return rows
+
+
+def written_by_process_row(strings):
+    """
+    The CSV text written for the strings by process_row and csv.writer.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+    for string in strings:
+        process_row(string, writer)
+    return output.getvalue().encode()
+
+
+@pytest.mark.parametrize("size", [4, 9, 16])
+def test_format_grids_matches_process_row(size, tmp_path):
+    rows = make_dataset(tmp_path / "data.csv", 5, size)
+    puzzles = [puzzle for puzzle, _ in rows]
+    cells = np.stack([to_cells(puzzle) for puzzle in puzzles])
+    assert format_grids(cells, size) == written_by_process_row(puzzles)
+
+
+def test_convert_dataset(tmp_path):
+    rows = make_dataset(tmp_path / "data.csv", 50)
+    converted = convert_dataset(
+        tmp_path / "data.csv",
+        tmp_path / "quiz" / "sudoku_quiz.csv",
+        tmp_path / "solutions" / "sudoku_solutions.csv",
+        str(tmp_path / "quiz" / "sudoku_quiz.sdb"),
+        block_size=1000,  # Many blocks, cut in the middle of rows.
+    )
+
+    assert converted == 50
+    assert (tmp_path / "quiz" / "sudoku_quiz.csv").read_bytes() == (
+        written_by_process_row([puzzle for puzzle, _ in rows])
+    )
+    assert (tmp_path / "solutions" / "sudoku_solutions.csv").read_bytes() == (
+        written_by_process_row([solution for _, solution in rows])
+    )
+    store = open_store(str(tmp_path / "quiz" / "sudoku_quiz.sdb"))
+    assert len(store) == 50
+    assert np.array_equal(np.ravel(store.puzzle(7)), to_cells(rows[7][0]))
+
+
+def test_convert_range_and_shards(tmp_path):
+    rows = make_dataset(tmp_path / "data.csv", 30)
+    converted = convert_dataset(
+        tmp_path / "data.csv",
+        str(tmp_path / "quiz.csv"),
+        str(tmp_path / "solutions.csv"),
+        start=5,
+        stop=25,
+        shards=3,
+        block_size=500,
+    )
+
+    assert converted == 20
+    for shard in range(3):
+        expected = [
+            puzzle for i, (puzzle, _) in enumerate(rows[5:25], 5) if i % 3 == shard
+        ]
+        path = shard_path(str(tmp_path / "quiz.csv"), shard, 3)
+        assert path.endswith(f"quiz_{shard}.csv")
+        assert open(path, "rb").read() == written_by_process_row(expected)
+
+
+def test_convert_sample(tmp_path):
+    rows = make_dataset(tmp_path / "data.csv", 40)
+    assert count_rows(tmp_path / "data.csv") == 40
+
+    def sample(seed, processes=1):
+        convert_dataset(
+            tmp_path / "data.csv",
+            str(tmp_path / "quiz.csv"),
+            str(tmp_path / "solutions.csv"),
+            sample=10,
+            seed=seed,
+            processes=processes,
+            block_size=300,
+        )
+        return (tmp_path / "quiz.csv").read_bytes()
+
+    first = sample(1)
+    # Ten distinct puzzles of the dataset, in input order.
+    expected = [
+        puzzle for puzzle, _ in rows if written_by_process_row([puzzle]) in first
+    ]
+    assert len(expected) == 10
+    assert first == written_by_process_row(expected)
+    assert sample(1, processes=2) == first
+    assert sample(2) != first
+
+    with pytest.raises(ValueError):
+        convert_dataset(
+            tmp_path / "data.csv",
+            str(tmp_path / "quiz.csv"),
+            str(tmp_path / "solutions.csv"),
+            sample=41,
+        )
+
+
+def test_blank_lines_are_not_counted(tmp_path):
+    rows = make_dataset(tmp_path / "data.csv", 12)
+    lines = (tmp_path / "data.csv").read_text().splitlines(keepends=True)
+    # Blank lines between and after the puzzles, which read_blocks skips.
+    (tmp_path / "data.csv").write_text(
+        lines[0] + "".join(line + "\n \n" for line in lines[1:]) + "\n"
+    )
+    assert count_rows(tmp_path / "data.csv") == 12
+
+    converted = convert_dataset(
+        tmp_path / "data.csv",
+        str(tmp_path / "quiz.csv"),
+        str(tmp_path / "solutions.csv"),
+        sample=12,
+        block_size=200,
+    )
+    assert converted == 12
+    expected = [puzzle for puzzle, _ in rows]
+    assert (tmp_path / "quiz.csv").read_bytes() == written_by_process_row(expected)
+
+
+def test_parse_range():
+    assert parse_args([]).range == [0, None]
+    assert parse_args(["--range", "5"]).range == [5, None]
+    assert parse_args(["--range", "5", "9"]).range == [5, 9]
+    with pytest.raises(SystemExit):
+        parse_args(["--range", "1", "2", "3"])
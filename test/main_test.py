@@ -0,0 +1,239 @@
+import pytest
+import sys
+import os
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from main import (
+    run_task,
+    PuzzleResult,
+    race_simulated_annealing,
+    init_race_worker,
+    solve_all,
+    solve_shared,
+    run_archived_task,
+    run_batch_task,
+    group_puzzles,
+    parse_args,
+)
+from archive import RunArchive, RunArchiveWriter
+from manifest import Manifest
+from multiprocessing import Pool, Value
+from observer import RunStats
+import json
+from functools import partial
+from puzzle_store import write_puzzle_store, PuzzleRef, PuzzleStore, STORE_EXTENSION
+from runner import read_sudoku_csv
+from shared import SharedBatch
+
+
+@pytest.fixture
+def sudoku_puzzle():
+    return [
+        [5, 3, 0, 0, 7, 0, 0, 0, 0],
+        [6, 0, 0, 1, 9, 5, 0, 0, 0],
+        [0, 9, 8, 0, 0, 0, 0, 6, 0],
+        [8, 0, 0, 0, 6, 0, 0, 0, 3],
+        [4, 0, 0, 8, 0, 3, 0, 0, 1],
+        [7, 0, 0, 0, 2, 0, 0, 0, 6],
+        [0, 6, 0, 0, 0, 0, 2, 8, 0],
+        [0, 0, 0, 4, 1, 9, 0, 0, 5],
+        [0, 0, 0, 0, 8, 0, 0, 7, 9],
+    ]
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    # run_simulated_annealing writes relative to the working directory, like main.py
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("final_solutions")
+    os.makedirs("additional_info")
+    return tmp_path
+
+
+def test_run_task(output_dir, sudoku_puzzle):
+    result = run_task((sudoku_puzzle, 0.1, 10, 0.95, 7, {"max_iterations": 20}))
+    assert isinstance(result, PuzzleResult)
+    assert result.error is None
+    assert result.iterations <= 20
+    solution = read_sudoku_csv(result.final_solution_path)[0]
+    assert solution[0][:2] == [5, 3], "The saved solution should keep the clues."
+    assert os.path.exists(result.additional_info_path)
+    assert result.row()[:2] == [7, "solved" if result.fitness == 0 else "unsolved"]
+    assert result.run_status in ("solved", "budget")
+
+
+def test_run_task_saves_stats(output_dir, sudoku_puzzle):
+    options = {"max_iterations": 20, "observer": RunStats()}
+    run_task((sudoku_puzzle, 0.1, 10, 0.95, 4, options))
+    with open(os.path.join("additional_info", "stats_4.json")) as file:
+        stats = json.load(file)
+    assert stats["proposals"] == stats["iterations"] <= 20
+
+
+def test_run_task_captures_errors(output_dir, sudoku_puzzle):
+    # A puzzle with a duplicated clue in a box cannot be initialized; the error is reported instead of raised
+    sudoku_puzzle[0][1] = 5
+    result = run_task((sudoku_puzzle, 0.1, 10, 0.95, 3))
+    assert result.error is not None
+    assert result.row()[1] == "error"
+
+
+def test_solve_all_resumes_from_manifest(output_dir, sudoku_puzzle):
+    # A rerun skips the puzzles completed by the first run, and appends the others to the results file
+    options = {"max_iterations": 20}
+    tasks = [(sudoku_puzzle, 0.1, 10, 0.95, i, options) for i in range(3)]
+    with Manifest("manifest.jsonl", resume=False) as manifest:
+        manifest.mark(2, "running")  # Left running by a killed batch.
+        results = solve_all(tasks[:2], 1, manifest=manifest)
+    assert sorted(result.process_id for result in results) == [0, 1]
+
+    with Manifest("manifest.jsonl") as manifest:
+        results = solve_all(tasks, 1, manifest=manifest)
+        assert [result.process_id for result in results] == [2]
+        assert manifest.counts()["running"] == 0
+    with open("results.csv") as file:
+        assert len(file.readlines()) == 4
+
+
+def test_run_task_uses_the_cache(output_dir, sudoku_puzzle):
+    # A solved puzzle is stored, and the same puzzle is then answered without annealing
+    first = run_task(
+        (sudoku_puzzle, 0.01, 2, 0.9999, 0, {"seed": 0, "cache": "cache.db"})
+    )
+    assert first.fitness == 0
+    second = run_task(
+        (sudoku_puzzle, 0.01, 2, 0.9999, 1, {"seed": 0, "cache": "cache.db"})
+    )
+    assert (second.fitness, second.iterations, second.additional_info_path) == (
+        0,
+        0,
+        None,
+    )
+    assert read_sudoku_csv(second.final_solution_path) == read_sudoku_csv(
+        first.final_solution_path
+    )
+
+
+def test_solve_shared(output_dir, sudoku_puzzle):
+    # Workers get indices; all the solutions are written to one store, kept for the puzzles skipped on resume
+    broken = [row[:] for row in sudoku_puzzle]
+    broken[0][1] = 5  # A duplicated clue in a box cannot be initialized.
+    options = {"seed": 0, "presolve": True}
+    with SharedBatch.from_puzzles([sudoku_puzzle, broken, sudoku_puzzle]) as batch:
+        with Manifest("manifest.jsonl", resume=False) as manifest:
+            results = solve_shared(batch, 1, 0.01, 2, 0.999, options, manifest=manifest)
+        results = {result.process_id: result for result in results}
+        assert results[0].row()[1:3] == ["solved", 0]
+        assert results[0].run_status == "solved"
+        assert results[1].error is not None
+        assert batch.status(1) == "error"
+        assert os.listdir("final_solutions") == ["solutions" + STORE_EXTENSION]
+
+        batch.results.fill(0)
+        with Manifest("manifest.jsonl") as manifest:
+            results = solve_shared(batch, 1, 0.01, 2, 0.999, options, manifest=manifest)
+        assert [result.process_id for result in results] == [1]
+
+    with PuzzleStore(
+        os.path.join("final_solutions", "solutions" + STORE_EXTENSION)
+    ) as store:
+        assert store.puzzle(2) == sudoku_puzzle
+        solution = store.solution(2)
+        assert solution == store.solution(0)
+        assert all(all(row) for row in solution)
+        assert not any(map(any, store.solution(1)))
+
+
+def test_solve_all_to_archive(output_dir, sudoku_puzzle):
+    # Workers return their boards and traces to the parent, which writes them to the archive only
+    broken = [row[:] for row in sudoku_puzzle]
+    broken[0][1] = 5
+    options = {"seed": 0, "max_iterations": 2000}
+    tasks = [
+        (puzzle, 0.01, 2, 0.999, i, options)
+        for i, puzzle in enumerate([sudoku_puzzle, broken])
+    ]
+    with RunArchiveWriter("runs.sda", metadata={"seed": 0}) as archive:
+        results = solve_all(tasks, 1, task=run_archived_task, archive=archive)
+    results = {result.process_id: result for result in results}
+    assert results[0].final_solution_path == "runs.sda"
+    assert results[1].error is not None
+    assert os.listdir("final_solutions") == os.listdir("additional_info") == []
+
+    with RunArchive("runs.sda") as archive:
+        assert archive.result(0)["fitness"] == results[0].fitness
+        assert archive.result(0)["status"] == results[0].run_status
+        assert archive.result(1)["status"] == "error"
+        assert archive.solution(0)[0][:2] == [5, 3]
+        iterations, _, best = archive.trace(0)
+        assert iterations[-1] == results[0].iterations
+        assert best[-1] == results[0].fitness
+
+
+def test_solve_all_in_groups(output_dir, sudoku_puzzle):
+    # Groups of puzzles go through the pool, the results file and the manifest like single puzzles,
+    # and a group that cannot be solved reports an error for each of its puzzles
+    options = {"seed": 0}
+    tasks = [(sudoku_puzzle, 0.01, 2, 0.99, i, options) for i in range(3)]
+    tasks.append(([[0] * 4 for _ in range(4)], 0.01, 2, 0.99, 3, options))
+    group = partial(group_puzzles, group_size=2, restarts=2)
+    with Manifest("manifest.jsonl", resume=False) as manifest:
+        results = solve_all(
+            tasks, 2, task=run_batch_task, manifest=manifest, group=group
+        )
+        assert manifest.counts()["running"] == 0
+    results = {result.process_id: result for result in results}
+    assert sorted(results) == [0, 1, 2, 3]
+    assert results[2].error is not None
+    assert results[3].error == results[2].error
+    for process_id in (0, 1):
+        result = results[process_id]
+        assert result.run_status == ("solved" if result.fitness == 0 else "cooled")
+        solution = read_sudoku_csv(result.final_solution_path)[0]
+        assert solution[0][:2] == [5, 3]
+    with open("results.csv") as file:
+        assert len(file.readlines()) == 5
+
+    # The same seed gives the same boards
+    first = run_batch_task(next(group(tasks[:2])))
+    assert [result.fitness for result in first] == [
+        results[0].fitness,
+        results[1].fitness,
+    ]
+
+
+def test_batch_budgets_and_options(output_dir, sudoku_puzzle):
+    # The iteration budget and the presolve option reach the batch annealer
+    empty = [[0] * 9 for _ in range(9)]
+    options = {"seed": 0, "max_iterations": 5, "presolve": True}
+    budget, presolved = run_batch_task(
+        ([empty, sudoku_puzzle], 0.01, 2, 0.99, 1, [0, 1], options)
+    )
+    assert budget.run_status == "budget"
+    assert budget.iterations == 5
+    assert (presolved.fitness, presolved.iterations) == (0, 0)
+    assert presolved.run_status == "solved"
+
+    # Options the batch annealer does not support are rejected
+    assert parse_args(["quiz.csv", "--mode", "batch", "--max-iterations", "5"])
+    for option in (["--schedule", "linear"], ["--calibrate"], ["--archive", "a"]):
+        with pytest.raises(SystemExit):
+            parse_args(["quiz.csv", "--mode", "batch", *option])
+
+
+def test_race(output_dir, sudoku_puzzle):
+    # Only the best restart is written, and the shared flag is raised when a restart solves the puzzle
+    stop_flag = Value("b", 0, lock=False)
+    init_race_worker(stop_flag)
+    with Pool(2, init_race_worker, (stop_flag,)) as pool:
+        result = race_simulated_annealing(
+            (sudoku_puzzle, 0.01, 3, 0.999, 5), pool, restarts=3
+        )
+    assert result.process_id == 5
+    assert os.listdir("final_solutions") == ["solution_5.csv"]
+    assert os.listdir("additional_info") == ["additional_info_5.csv"]
+    assert bool(stop_flag.value) == (result.fitness == 0)
@@ -0,0 +1,67 @@
+import pytest
+import sys
+import os
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from manifest import Manifest
+
+
+@pytest.fixture
+def solution(tmp_path):
+    path = tmp_path / "solution_0.csv"
+    path.write_text("1\n")
+    return str(path)
+
+
+def test_statuses_survive_a_restart(tmp_path, solution):
+    path = str(tmp_path / "manifest.jsonl")
+    with Manifest(path) as manifest:
+        manifest.mark(0, "running")
+        manifest.mark(1, "running")
+        manifest.mark(2, "running")
+        manifest.mark(0, "solved", fitness=0, solution=solution)
+        manifest.mark(1, "failed", fitness=4, solution=solution)
+        manifest.mark(2, "failed", fitness=None, error="ValueError: bad puzzle")
+    with open(path, "a") as file:
+        file.write('{"process_id": 3, "sta')  # Truncated by a kill.
+
+    with Manifest(path) as manifest:
+        assert [manifest.status(i) for i in range(5)] == [
+            "solved",
+            "failed",
+            "failed",
+            "pending",
+            "pending",
+        ]
+        assert manifest.completed(0)
+        assert manifest.completed(1)
+        assert not manifest.completed(1, retry_failed=True)
+        assert not manifest.completed(2), "Errors are always retried."
+        assert not manifest.completed(3)
+        assert manifest.counts() == {
+            "pending": 0,
+            "running": 0,
+            "solved": 1,
+            "failed": 2,
+        }
+
+
+def test_missing_solution_is_not_completed(tmp_path, solution):
+    with Manifest(str(tmp_path / "manifest.jsonl")) as manifest:
+        manifest.mark(0, "solved", fitness=0, solution=solution)
+        os.remove(solution)
+        assert not manifest.completed(0)
+
+
+def test_fresh_manifest_forgets_previous_batch(tmp_path, solution):
+    path = str(tmp_path / "manifest.jsonl")
+    with Manifest(path) as manifest:
+        manifest.mark(0, "solved", fitness=0, solution=solution)
+    with Manifest(path, resume=False) as manifest:
+        assert manifest.status(0) == "pending"
+    with pytest.raises(ValueError):
+        Manifest(path).mark(0, "done")
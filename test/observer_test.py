@@ -0,0 +1,76 @@
+import pytest
+import sys
+import os
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from observer import Observer, RunStats, temp_band
+from SA import SimulatedAnnealing
+
+
+@pytest.fixture
+def sudoku_puzzle():
+    return [
+        [5, 3, 0, 0, 7, 0, 0, 0, 0],
+        [6, 0, 0, 1, 9, 5, 0, 0, 0],
+        [0, 9, 8, 0, 0, 0, 0, 6, 0],
+        [8, 0, 0, 0, 6, 0, 0, 0, 3],
+        [4, 0, 0, 8, 0, 3, 0, 0, 1],
+        [7, 0, 0, 0, 2, 0, 0, 0, 6],
+        [0, 6, 0, 0, 0, 0, 2, 8, 0],
+        [0, 0, 0, 4, 1, 9, 0, 0, 5],
+        [0, 0, 0, 0, 8, 0, 0, 7, 9],
+    ]
+
+
+def test_run_stats_counters(sudoku_puzzle):
+    stats = RunStats()
+    solver = SimulatedAnnealing(sudoku_puzzle, 0.01, 100, 0.99, observer=stats, seed=0)
+    _, fitness, _ = solver.run(0)
+
+    assert stats.iterations == stats.proposals == solver.iterations
+    assert stats.best_fitness == fitness
+    assert 0 < stats.accepts <= stats.proposals
+    assert stats.uphill_accepts <= min(stats.uphill_proposals, stats.accepts)
+    assert sum(proposals for proposals, _ in stats.bands.values()) == stats.proposals
+    assert set(stats.band_rates()) <= {0.01, 0.1, 1.0, 10.0, 100.0}
+    assert stats.elapsed >= stats.mutation_time + stats.fitness_time
+    assert stats.iterations_per_second > 0
+    assert stats.as_dict()["accepts"] == stats.accepts
+
+
+def test_run_stats_callback(sudoku_puzzle):
+    calls = []
+    stats = RunStats(
+        lambda stats, iteration, temp, best: calls.append(iteration), every=10
+    )
+    solver = SimulatedAnnealing(
+        sudoku_puzzle, 1e-3, 1e3, 0.9999, max_iterations=55, observer=stats
+    )
+    solver.run(0)
+    assert calls == list(range(10, solver.iterations + 1, 10))
+
+
+def test_base_observer_does_not_change_the_run(sudoku_puzzle):
+    results = []
+    for observer in (None, Observer()):
+        solver = SimulatedAnnealing(
+            sudoku_puzzle,
+            0.01,
+            10,
+            0.99,
+            max_iterations=300,
+            observer=observer,
+            seed=3,
+        )
+        results.append(solver.run(0)[:2])
+    assert results[0] == results[1]
+
+
+def test_temp_band():
+    assert temp_band(5.0) == 0
+    assert temp_band(0.05) == -2
+    assert temp_band(1e8) == 8
@@ -0,0 +1,107 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+# Fix import
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "utils")))
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from plot_result_info import (
+    lttb,
+    load_improvements,
+    fitness_percentiles,
+    generate_and_save_plots,
+    plot_overview,
+)
+from plot_final_solution import generate_and_save_matrix_images
+from archive import RunArchiveWriter
+
+
+def write_trace(path, iterations, fitness):
+    rows = "\n".join(
+        f"{iteration},{1.0 / iteration},{value}"
+        for iteration, value in zip(iterations, fitness)
+    )
+    path.write_text("Iteration,Temperature,Best Fitness\n" + rows + "\n")
+
+
+def test_lttb_keeps_ends_and_peaks():
+    x = np.arange(10_000)
+    y = np.sin(x / 500.0)
+    y[4321] = 5.0  # A spike must survive the downsampling.
+    indices = lttb(x, y, 200)
+    assert len(indices) == 200
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert (np.diff(indices) > 0).all()
+    assert 4321 in indices
+    assert (lttb(x[:50], y[:50], 200) == np.arange(50)).all()
+
+
+def test_load_improvements(tmp_path):
+    path = tmp_path / "trace.csv"
+    write_trace(path, [1, 2, 3, 4, 5], [9, 9, 4, 4, 4])
+    iterations, fitness = load_improvements(str(path))
+    assert list(iterations) == [1, 3, 5]
+    assert list(fitness) == [9, 4, 4]
+    assert load_improvements(str(tmp_path / "missing.csv")) is None
+
+
+def test_fitness_percentiles():
+    # A run that ends early keeps its final best fitness until the end of the grid
+    traces = [
+        (np.array([0, 50]), np.array([10, 0])),
+        (np.array([0, 100]), np.array([20, 5])),
+    ]
+    grid, (low, median, high) = fitness_percentiles(traces, points=3)
+    assert list(grid) == [0, 50, 100]
+    assert list(median) == [15, 10, 2.5]
+    assert low[2] == pytest.approx(0.5)
+    assert high[0] == pytest.approx(19)
+
+
+def test_plots_are_saved(tmp_path):
+    for i in range(2):
+        write_trace(tmp_path / f"trace_{i}.csv", range(1, 5001), np.arange(5000)[::-1])
+    pattern = str(tmp_path / "trace_{}.csv")
+    saved = generate_and_save_plots(pattern, str(tmp_path / "plots"), 0, 2, processes=1)
+    assert [os.path.basename(path) for path in saved] == [
+        "additional_info_plot_0.png",
+        "additional_info_plot_1.png",
+    ]
+    overview = plot_overview(pattern, str(tmp_path / "overview.png"), 0, 2, processes=1)
+    assert os.path.exists(overview)
+
+
+def test_plots_from_archive(tmp_path):
+    # Traces and solutions are read from the archive; runs without them are skipped
+    path = str(tmp_path / "runs.sda")
+    iterations = np.arange(1, 5001)
+    with RunArchiveWriter(path) as writer:
+        writer.add(
+            0,
+            np.ones((9, 9)),
+            0,
+            5000,
+            1.0,
+            "solved",
+            (iterations, 1.0 / iterations, np.arange(5000)[::-1]),
+        )
+        writer.add(1, None, None, None, 0.1, "error")
+    assert load_improvements((path, 0))[1][-1] == 0
+    assert load_improvements((path, 1)) is None
+
+    saved = generate_and_save_plots(
+        None, str(tmp_path / "plots"), 0, 1, processes=1, archive_path=path
+    )
+    assert [os.path.basename(path) for path in saved] == ["additional_info_plot_0.png"]
+    overview = plot_overview(
+        None, str(tmp_path / "overview.png"), 0, 1, processes=1, archive_path=path
+    )
+    assert os.path.exists(overview)
+    images = generate_and_save_matrix_images(
+        None, str(tmp_path / "images"), 0, 2, processes=1, archive_path=path
+    )
+    assert [os.path.basename(path) for path in images] == ["matrix_image_0.png"]
@@ -0,0 +1,95 @@
+import pytest
+import sys
+import os
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from presolve import presolve, candidate_masks, mask_to_set, all_digits
+from solution import SingleSolution
+from SA import SimulatedAnnealing
+
+
+@pytest.fixture
+def sudoku_puzzle():
+    return [
+        [5, 3, 0, 0, 7, 0, 0, 0, 0],
+        [6, 0, 0, 1, 9, 5, 0, 0, 0],
+        [0, 9, 8, 0, 0, 0, 0, 6, 0],
+        [8, 0, 0, 0, 6, 0, 0, 0, 3],
+        [4, 0, 0, 8, 0, 3, 0, 0, 1],
+        [7, 0, 0, 0, 2, 0, 0, 0, 6],
+        [0, 6, 0, 0, 0, 0, 2, 8, 0],
+        [0, 0, 0, 4, 1, 9, 0, 0, 5],
+        [0, 0, 0, 0, 8, 0, 0, 7, 9],
+    ]
+
+
+@pytest.fixture
+def hard_puzzle():
+    digits = "800000000003600000070090200050007000000045700000100030001000068008500010090000400"
+    return [[int(c) for c in digits[start : start + 9]] for start in range(0, 81, 9)]
+
+
+def test_presolve_solves_easy_puzzle(sudoku_puzzle):
+    grid = presolve(sudoku_puzzle)
+    solution = SingleSolution(grid, grid)
+    assert all(all(row) for row in grid)
+    assert solution.fitness() == 0
+    assert sudoku_puzzle[0][2] == 0  # The input is not modified.
+
+
+def test_presolve_keeps_clues(hard_puzzle):
+    grid = presolve(hard_puzzle)
+    for row, original_row in zip(grid, hard_puzzle):
+        for value, clue in zip(row, original_row):
+            assert clue == 0 or value == clue
+    assert any(0 in row for row in grid)  # Singles alone cannot solve this one.
+
+
+def test_presolve_contradiction():
+    table = [[0] * 9 for _ in range(9)]
+    table[0][1:] = [1, 2, 3, 4, 5, 6, 7, 8]
+    table[5][0] = 9
+    with pytest.raises(ValueError):
+        presolve(table)
+
+
+def test_candidate_masks_match_find_candidates(hard_puzzle):
+    candidates = SingleSolution(hard_puzzle, hard_puzzle).find_candidates()
+    masks = candidate_masks(hard_puzzle)
+    for i in range(9):
+        for j in range(9):
+            assert mask_to_set(masks[i][j]) == candidates[i][j]
+
+
+def test_sa_with_presolve_skips_annealing(sudoku_puzzle):
+    sa = SimulatedAnnealing(sudoku_puzzle, 0.001, 1.0, 0.99, presolve=True)
+    best_table, fitness, trace = sa.run(0)
+    assert fitness == 0
+    assert sa.iterations == 0
+    assert best_table == presolve(sudoku_puzzle)
+
+
+def test_sa_with_presolve_fixes_deduced_cells(hard_puzzle):
+    sa = SimulatedAnnealing(hard_puzzle, 0.001, 1.0, 0.99, presolve=True)
+    assert sa.original == presolve(hard_puzzle)
+    best_table, fitness, trace = sa.run(0)
+    for row, original_row in zip(best_table, sa.original):
+        for value, fixed in zip(row, original_row):
+            assert fixed == 0 or value == fixed
+
+
+def test_presolve_larger_grid():
+    # A 16x16 grid missing one cell per box is completed by naked singles
+    solution = [
+        [(row * 4 + row // 4 + col) % 16 + 1 for col in range(16)] for row in range(16)
+    ]
+    puzzle = [row[:] for row in solution]
+    for box in range(16):
+        puzzle[box // 4 * 4 + box % 4][box % 4 * 4 + box // 4] = 0
+    assert presolve(puzzle) == solution
+    assert mask_to_set(candidate_masks(puzzle)[0][0]) == {solution[0][0]}
+    assert mask_to_set(all_digits(16)) == set(range(1, 17))
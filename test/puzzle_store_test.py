@@ -0,0 +1,67 @@
+import pytest
+import sys
+import os
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from puzzle_store import (
+    PuzzleStore,
+    PuzzleStoreWriter,
+    PuzzleRef,
+    write_puzzle_store,
+    STORE_EXTENSION,
+)
+import numpy as np
+
+
+@pytest.fixture
+def puzzles():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 10, size=(5, 9, 9), dtype=np.uint8)
+
+
+@pytest.fixture
+def solutions():
+    rng = np.random.default_rng(1)
+    return rng.integers(1, 10, size=(5, 9, 9), dtype=np.uint8)
+
+
+def test_round_trip(tmp_path, puzzles, solutions):
+    path = str(tmp_path / ("quiz" + STORE_EXTENSION))
+    write_puzzle_store(path, puzzles, solutions)
+    with PuzzleStore(path) as store:
+        assert len(store) == 5
+        assert store.table_size == 9
+        assert (store.puzzles == puzzles).all()
+        assert (store.solutions == solutions).all()
+        assert store.puzzle(3) == puzzles[3].tolist()
+        assert store.solution(3) == solutions[3].tolist()
+    assert os.path.getsize(path) == 16 + 2 * 5 * 81
+
+
+def test_incremental_writer_without_solutions(tmp_path, puzzles):
+    path = str(tmp_path / ("quiz" + STORE_EXTENSION))
+    with PuzzleStoreWriter(path) as writer:
+        for puzzle in puzzles:
+            writer.write(puzzle.reshape(1, 81))
+    with PuzzleStore(path) as store:
+        assert (store.puzzles == puzzles).all()
+        assert store.solutions is None
+        with pytest.raises(ValueError):
+            store.solution(0)
+
+
+def test_puzzle_ref(tmp_path, puzzles):
+    path = str(tmp_path / ("quiz" + STORE_EXTENSION))
+    write_puzzle_store(path, puzzles)
+    assert PuzzleRef(path, 2).load() == puzzles[2].tolist()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "quiz.csv"
+    path.write_text("5,3,0,0,7,0,0,0,0\n" * 9)
+    with pytest.raises(ValueError):
+        PuzzleStore(str(path))
@@ -0,0 +1,32 @@
+import pytest
+import sys
+import os
+import math
+import numpy as np
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from rng import chain_generator, acceptance_thresholds
+
+
+def test_chain_generator_streams():
+    # Same seed and process ID give the same stream; other process IDs or seeds give others
+    first = chain_generator(7, 3).random(5)
+    assert np.array_equal(first, chain_generator(7, 3).random(5))
+    assert not np.array_equal(first, chain_generator(7, 4).random(5))
+    assert not np.array_equal(first, chain_generator(8, 3).random(5))
+    assert not np.array_equal(first, chain_generator([7, 1], 3).random(5))
+
+
+def test_acceptance_thresholds_match_metropolis():
+    # delta < temp * threshold happens with probability exp(-delta / temp) for worsening moves,
+    # and always for the others
+    thresholds = np.array(acceptance_thresholds(chain_generator(0, 0), 200_000))
+    assert (thresholds > 0).all()
+    for delta, temp in ((1, 1.0), (2, 0.5), (3, 10.0)):
+        rate = np.mean(delta < temp * thresholds)
+        assert rate == pytest.approx(math.exp(-delta / temp), abs=0.005)
+    assert np.mean(0 < thresholds) == 1.0
@@ -0,0 +1,62 @@
+import pytest
+import sys
+import os
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from runner import available_cpus, iter_puzzles, solve_puzzle
+from puzzle_store import write_puzzle_store, PuzzleRef, STORE_EXTENSION
+from solution import SingleSolution
+from tracing import NoTrace
+
+
+@pytest.fixture
+def sudoku_puzzle():
+    return [
+        [5, 3, 0, 0, 7, 0, 0, 0, 0],
+        [6, 0, 0, 1, 9, 5, 0, 0, 0],
+        [0, 9, 8, 0, 0, 0, 0, 6, 0],
+        [8, 0, 0, 0, 6, 0, 0, 0, 3],
+        [4, 0, 0, 8, 0, 3, 0, 0, 1],
+        [7, 0, 0, 0, 2, 0, 0, 0, 6],
+        [0, 6, 0, 0, 0, 0, 2, 8, 0],
+        [0, 0, 0, 4, 1, 9, 0, 0, 5],
+        [0, 0, 0, 0, 8, 0, 0, 7, 9],
+    ]
+
+
+def test_iter_puzzles(tmp_path, sudoku_puzzle):
+    csv_path = tmp_path / "quiz.csv"
+    rows = "\n".join(",".join(str(cell) for cell in row) for row in sudoku_puzzle)
+    csv_path.write_text(rows + "\n\n" + rows + "\n")
+    assert list(iter_puzzles(str(csv_path))) == [sudoku_puzzle, sudoku_puzzle]
+
+    store_path = str(tmp_path / ("quiz" + STORE_EXTENSION))
+    write_puzzle_store(store_path, [sudoku_puzzle, sudoku_puzzle])
+    references = list(iter_puzzles(store_path))
+    assert references == [PuzzleRef(store_path, 0), PuzzleRef(store_path, 1)]
+    assert references[1].load() == sudoku_puzzle
+
+
+def test_iter_puzzles_larger_grid(tmp_path):
+    # The size of a puzzle is read from its first row, with or without separating empty rows
+    puzzle = [
+        [(row * 4 + row // 4 + col) % 16 + 1 for col in range(16)] for row in range(16)
+    ]
+    csv_path = tmp_path / "quiz.csv"
+    rows = "\n".join(",".join(str(cell) for cell in row) for row in puzzle)
+    csv_path.write_text(rows + "\n" + rows + "\n")
+    assert list(iter_puzzles(str(csv_path))) == [puzzle, puzzle]
+
+
+def test_solve_puzzle(sudoku_puzzle):
+    best_state, fitness, trace, algorithm = solve_puzzle(
+        sudoku_puzzle, 0.01, 2, 0.99, 0, {"seed": 0, "trace": NoTrace()}
+    )
+    assert SingleSolution(best_state, sudoku_puzzle).fitness() == fitness
+    assert algorithm.status in ("solved", "cooled")
+    assert len(trace) == 0
+    assert available_cpus() >= 1
@@ -0,0 +1,102 @@
+import pytest
+import random
+import sys
+import os
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from schedule import (
+    Schedule,
+    LinearSchedule,
+    AdaptiveSchedule,
+    ReheatingSchedule,
+    calibrate_temperature,
+    make_schedule,
+)
+from solution import SingleSolution
+from SA import SimulatedAnnealing
+
+
+@pytest.fixture
+def sudoku_puzzle():
+    return [
+        [5, 3, 0, 0, 7, 0, 0, 0, 0],
+        [6, 0, 0, 1, 9, 5, 0, 0, 0],
+        [0, 9, 8, 0, 0, 0, 0, 6, 0],
+        [8, 0, 0, 0, 6, 0, 0, 0, 3],
+        [4, 0, 0, 8, 0, 3, 0, 0, 1],
+        [7, 0, 0, 0, 2, 0, 0, 0, 6],
+        [0, 6, 0, 0, 0, 0, 2, 8, 0],
+        [0, 0, 0, 4, 1, 9, 0, 0, 5],
+        [0, 0, 0, 0, 8, 0, 0, 7, 9],
+    ]
+
+
+def run_schedule(schedule, start_temp, min_temp, accepted=True, improved=False):
+    schedule.reset(start_temp, min_temp)
+    temp, iterations = start_temp, 0
+    while temp > min_temp:
+        temp = schedule.update(temp, accepted, improved)
+        iterations += 1
+    return iterations
+
+
+def test_geometric_schedule():
+    schedule = Schedule(0.9)
+    assert run_schedule(schedule, 10.0, 1.0) == schedule.expected_iterations(10.0, 1.0)
+
+
+def test_linear_schedule():
+    schedule = LinearSchedule(50)
+    assert run_schedule(schedule, 10.0, 1.0) == 50
+
+
+def test_adaptive_schedule_follows_acceptance():
+    hot = run_schedule(AdaptiveSchedule(0.99, window=10), 10.0, 1.0, accepted=True)
+    cold = run_schedule(AdaptiveSchedule(0.99, window=10), 10.0, 1.0, accepted=False)
+    assert hot < Schedule(0.99).expected_iterations(10.0, 1.0) < cold
+
+
+def test_reheating_schedule():
+    schedule = ReheatingSchedule(Schedule(0.9), patience=5, max_reheats=2)
+    iterations = run_schedule(schedule, 10.0, 1.0)
+    assert schedule.reheats == 2
+    assert iterations > Schedule(0.9).expected_iterations(10.0, 1.0)
+
+
+def test_make_schedule():
+    assert type(make_schedule("geometric")) is Schedule
+    assert isinstance(make_schedule("linear", iterations=10), LinearSchedule)
+    assert isinstance(make_schedule("adaptive", reheat=100), ReheatingSchedule)
+    with pytest.raises(ValueError):
+        make_schedule("exponential")
+
+
+def test_calibrate_temperature(sudoku_puzzle):
+    random.seed(0)
+    state = SingleSolution(sudoku_puzzle, sudoku_puzzle)
+    state.generate_solution()
+    table = [row[:] for row in state.table]
+    temp = calibrate_temperature(state, 0.8)
+    assert 0 < temp < 100
+    assert state.table == table
+    assert calibrate_temperature(state, 0.5) < temp
+
+
+def test_sa_with_schedule_and_calibration(sudoku_puzzle):
+    solver = SimulatedAnnealing(
+        sudoku_puzzle,
+        0.01,
+        1e8,
+        schedule=make_schedule("linear", iterations=2000),
+        calibrate=0.8,
+        seed=0,
+    )
+    _, _, trace = solver.run(0)
+    assert solver.start_temp < 1e8
+    assert solver.iterations <= 2000
+    _, temps, _ = trace.as_arrays()
+    assert temps[0] == solver.start_temp
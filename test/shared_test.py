@@ -0,0 +1,58 @@
+import pytest
+import sys
+import os
+import pickle
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from shared import SharedBatch, RESULT_STATUSES
+
+
+@pytest.fixture
+def sudoku_puzzle():
+    return [
+        [5, 3, 0, 0, 7, 0, 0, 0, 0],
+        [6, 0, 0, 1, 9, 5, 0, 0, 0],
+        [0, 9, 8, 0, 0, 0, 0, 6, 0],
+        [8, 0, 0, 0, 6, 0, 0, 0, 3],
+        [4, 0, 0, 8, 0, 3, 0, 0, 1],
+        [7, 0, 0, 0, 2, 0, 0, 0, 6],
+        [0, 6, 0, 0, 0, 0, 2, 8, 0],
+        [0, 0, 0, 4, 1, 9, 0, 0, 5],
+        [0, 0, 0, 0, 8, 0, 0, 7, 9],
+    ]
+
+
+def test_results_are_shared(sudoku_puzzle):
+    # A batch unpickled by a worker attaches to the blocks of the parent, and only the block names are pickled
+    with SharedBatch.from_puzzles([sudoku_puzzle, sudoku_puzzle]) as batch:
+        assert batch.status(1) == "pending"
+        data = pickle.dumps(batch)
+        assert len(data) < 200
+
+        worker = pickle.loads(data)
+        assert not worker.owner
+        assert worker.puzzle(1) == sudoku_puzzle
+        solution = [[9] * 9 for _ in range(9)]
+        worker.store_result(1, solution, 3, 1000, 0.5, "stagnated")
+        worker.close()
+
+        record = batch.results[1]
+        assert batch.results["solution"][1].tolist() == solution
+        assert (record["fitness"], record["iterations"], record["elapsed"]) == (
+            3,
+            1000,
+            0.5,
+        )
+        assert batch.status(1) == "stagnated"
+        assert batch.status(0) == RESULT_STATUSES[0]
+
+
+def test_from_puzzles(sudoku_puzzle):
+    with pytest.raises(ValueError):
+        SharedBatch.from_puzzles([sudoku_puzzle, [[0] * 16 for _ in range(16)]])
+    with SharedBatch.from_puzzles([]) as batch:
+        assert len(batch) == 0
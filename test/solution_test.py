@@ -8,7 +8,9 @@ sys.path.append(
     os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
 )
 
-from solution import SingleSolution, TABLE_SIZE, BOX_SIZE
+from solution import SingleSolution, MoveTable, TABLE_SIZE, BOX_SIZE, box_size_for
+from rng import BLOCK_SIZE, chain_generator
+from collections import Counter
 
 
 @pytest.fixture
@@ -69,3 +71,136 @@ def test_find_candidates(single_solution_instance):
     assert (
         candidates[0][0] == expected_candidates
     ), "Empty cells should have all numbers as candidates."
+
+
+def test_swap_delta_matches_fitness(single_solution_instance):
+    # Applies a series of random mutations and checks that the incrementally maintained energy always matches a full fitness recount
+    single_solution_instance.generate_solution()
+    assert single_solution_instance.energy == single_solution_instance.fitness()
+    for _ in range(200):
+        before = single_solution_instance.fitness()
+        single_solution_instance.mutate()
+        assert (
+            single_solution_instance.energy == single_solution_instance.fitness()
+        ), "Cached energy should match the recomputed fitness after a swap."
+        assert single_solution_instance.energy - before in range(-4, 5)
+
+
+def test_swap_delta_does_not_modify_table(single_solution_instance):
+    # Checks that evaluating a swap leaves the table untouched and predicts the fitness of actually performing it
+    single_solution_instance.generate_solution()
+    original_table = deepcopy(single_solution_instance.table)
+    delta = single_solution_instance.swap_delta(0, 0, 2, 2)
+    assert single_solution_instance.table == original_table
+    before = single_solution_instance.fitness()
+    single_solution_instance.swap(0, 0, 2, 2)
+    assert single_solution_instance.fitness() - before == delta
+
+
+def test_propose_apply_revert(single_solution_instance):
+    # Proposing a move leaves the table untouched, applying it changes the table, and reverting restores both table and energy
+    single_solution_instance.generate_solution()
+    original_table = deepcopy(single_solution_instance.table)
+    original_energy = single_solution_instance.energy
+    delta = single_solution_instance.propose_move()
+    assert single_solution_instance.table == original_table
+    single_solution_instance.apply_move()
+    assert single_solution_instance.table != original_table
+    assert single_solution_instance.energy == original_energy + delta
+    single_solution_instance.revert_move()
+    assert single_solution_instance.table == original_table
+    assert single_solution_instance.energy == original_energy
+
+
+def test_snapshot(single_solution_instance):
+    # The snapshot buffer should hold the table in row-major order
+    single_solution_instance.generate_solution()
+    buffer = [0] * (TABLE_SIZE * TABLE_SIZE)
+    single_solution_instance.snapshot(buffer)
+    assert buffer == [cell for row in single_solution_instance.table for cell in row]
+
+
+def test_move_table_skips_nearly_full_boxes():
+    # Only the top-left box (one empty cell) and the top-middle box (two empty cells) have empty cells,
+    # so the only legal swap is in the top-middle box
+    original = [[1] * TABLE_SIZE for _ in range(TABLE_SIZE)]
+    original[0][0] = 0
+    original[0][3] = original[2][5] = 0
+
+    moves = MoveTable(original)
+    assert len(moves) == 1
+    assert moves.pairs() == [(0, 3, 2, 5)]
+    for _ in range(20):
+        assert moves.draw() in {(0, 3, 2, 5), (2, 5, 0, 3)}
+
+    state = SingleSolution(original, original, moves)
+    assert state.has_moves()
+    state.propose_move()
+
+
+def test_move_table_draws_legal_pairs(single_solution_instance):
+    moves = single_solution_instance.moves
+    assert len(moves) == TABLE_SIZE
+    assert len(moves.pairs()) == TABLE_SIZE * 36
+    for _ in range(200):
+        row1, col1, row2, col2 = moves.draw()
+        assert (row1, col1) != (row2, col2)
+        assert (row1 // BOX_SIZE, col1 // BOX_SIZE) == (
+            row2 // BOX_SIZE,
+            col2 // BOX_SIZE,
+        )
+
+
+def test_move_table_draws_blocks():
+    # Moves drawn in blocks are legal, cover every pair evenly, and follow the seed of the generator
+    original = [[0] * TABLE_SIZE for _ in range(TABLE_SIZE)]
+    original[0][0] = original[4][4] = 5
+    moves = MoveTable(original)
+    block = moves.draw_block(chain_generator(0, 0), 50_000)
+    pairs = set(moves.pairs())
+    counts = Counter(
+        (
+            (row1, col1, row2, col2)
+            if (row1, col1, row2, col2) in pairs
+            else (row2, col2, row1, col1)
+        )
+        for row1, col1, row2, col2 in block
+    )
+    assert set(counts) == pairs
+    # The box is uniform, then the pair is uniform within the box: boxes with 8 cells have 28 pairs, the others 36
+    assert counts[(0, 1, 0, 2)] / 50_000 == pytest.approx(1 / (9 * 28), rel=0.3)
+    assert counts[(0, 3, 0, 4)] / 50_000 == pytest.approx(1 / (9 * 36), rel=0.3)
+
+    expected = moves.draw_block(chain_generator(0, 0), BLOCK_SIZE)
+    moves.use_generator(chain_generator(0, 0))
+    assert [moves.draw() for _ in range(BLOCK_SIZE + 10)][:BLOCK_SIZE] == expected
+
+
+def test_larger_grid():
+    # A 16x16 puzzle with the first row given: boxes of 4x4, digits 1 to 16, and an energy matching a full recount
+    puzzle = [[0] * 16 for _ in range(16)]
+    puzzle[0] = list(range(1, 17))
+    state = SingleSolution(deepcopy(puzzle), puzzle)
+    assert (state.size, state.box_size) == (16, 4)
+    assert state.find_candidates()[1][0] == set(range(5, 17))
+    state.generate_solution()
+    assert state.table[0] == puzzle[0]
+    for row_index in range(0, 16, 4):
+        for col_index in range(0, 16, 4):
+            box = {
+                state.table[row_index + i][col_index + j]
+                for i in range(4)
+                for j in range(4)
+            }
+            assert box == set(range(1, 17))
+    assert state.energy == state.fitness()
+    for _ in range(100):
+        state.propose_move()
+        state.apply_move()
+        assert state.energy == state.fitness()
+
+
+def test_box_size_for():
+    assert [box_size_for(size) for size in (4, 9, 16, 25)] == [2, 3, 4, 5]
+    with pytest.raises(ValueError):
+        box_size_for(10)
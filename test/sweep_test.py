@@ -0,0 +1,130 @@
+import pytest
+import sys
+import os
+import csv
+import math
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from sweep import (
+    Config,
+    grid_configs,
+    load_puzzles,
+    sample_configs,
+    score,
+    successive_halving,
+    write_sweep_csv,
+    SWEEP_HEADER,
+)
+
+
+@pytest.fixture
+def sudoku_puzzle():
+    return [
+        [5, 3, 0, 0, 7, 0, 0, 0, 0],
+        [6, 0, 0, 1, 9, 5, 0, 0, 0],
+        [0, 9, 8, 0, 0, 0, 0, 6, 0],
+        [8, 0, 0, 0, 6, 0, 0, 0, 3],
+        [4, 0, 0, 8, 0, 3, 0, 0, 1],
+        [7, 0, 0, 0, 2, 0, 0, 0, 6],
+        [0, 6, 0, 0, 0, 0, 2, 8, 0],
+        [0, 0, 0, 4, 1, 9, 0, 0, 5],
+        [0, 0, 0, 0, 8, 0, 0, 7, 9],
+    ]
+
+
+def test_configs():
+    configs = grid_configs([1e-3, 10], [1, 100], [0.99, 0.999])
+    assert len(configs) == 6, "A minimum temperature above the maximum is skipped."
+    assert Config(10, 100, 0.99) in configs
+
+    configs = sample_configs([1e-7, 1e-1], [1, 1e8], [0.99, 0.9999], 50, seed=1)
+    assert len(configs) == 50
+    assert configs == sample_configs([1e-7, 1e-1], [1, 1e8], [0.99, 0.9999], 50, 1)
+    for min_temp, max_temp, cooling_rate in configs:
+        assert 1e-7 <= min_temp <= 1e-1 and 1 <= max_temp <= 1e8
+        assert min_temp < max_temp
+        assert 0.99 <= cooling_rate <= 0.9999
+
+
+def test_configs_without_valid_pairs():
+    # Ranges without any minimum temperature below a maximum give no configuration instead of looping
+    assert sample_configs([10.0], [1.0], [0.999], 3, seed=0) == []
+    assert grid_configs([10.0], [1.0], [0.999]) == []
+    configs = sample_configs([1, 100], [10], [0.9], 20, seed=0)
+    assert all(min_temp < max_temp for min_temp, max_temp, _ in configs)
+    with pytest.raises(ValueError):
+        sample_configs([1e-3], [1], [0.99, 1.0], 3)
+
+
+def test_schedule_is_compressed_to_the_budget():
+    # Cooling from 1e8 to 1e-7 at 0.9999 takes about 345k iterations: a 10k budget cools faster
+    slow = Config(1e-7, 1e8, 0.9999)
+    rate = slow.cooling_rate_at(10_000)
+    assert rate < slow.cooling_rate
+    assert 1e8 * rate**10_000 == pytest.approx(1e-7)
+    assert slow.cooling_rate_at(1_000_000) == 0.9999
+    assert Config(1e-3, 1, 0.9).cooling_rate_at(1000) == 0.9
+
+
+def test_load_puzzles(tmp_path, sudoku_puzzle):
+    rows = []
+    for index in range(10):
+        puzzle = [row[:] for row in sudoku_puzzle]
+        puzzle[0][2] = index
+        rows.append("\n".join(",".join(map(str, row)) for row in puzzle))
+    path = tmp_path / "quiz.csv"
+    path.write_text("\n\n".join(rows) + "\n")
+
+    first = load_puzzles(str(path), 3)
+    assert [puzzle[0][2] for puzzle in first] == [0, 1, 2]
+    sample = [puzzle[0][2] for puzzle in load_puzzles(str(path), 4, seed=1)]
+    assert len(set(sample)) == 4 and sample == sorted(sample)
+    assert sample == [puzzle[0][2] for puzzle in load_puzzles(str(path), 4, seed=1)]
+    assert len(load_puzzles(str(path), 20, seed=1)) == 10
+
+
+def test_score():
+    # The expected time to solution charges the failed runs to the solved ones
+    result = score(Config(0.1, 1, 0.99), [(0, 100, 1.0), (2, 500, 3.0), (None, 0, 0.0)])
+    assert result.solved == 1 and result.success_rate == pytest.approx(1 / 3)
+    assert result.time_to_solution == 4.0
+    assert result.mean_fitness == 1.0
+    assert math.isinf(score(Config(0.1, 1, 0.99), [(3, 10, 1.0)]).time_to_solution)
+
+
+def test_successive_halving(tmp_path, sudoku_puzzle):
+    # Each rung keeps a third of the configurations and triples the budget
+    configs = grid_configs([1e-3], [0.5, 2, 1e8], [0.9, 0.99, 0.999])
+    reported = []
+    rungs = successive_halving(
+        configs,
+        [sudoku_puzzle, sudoku_puzzle],
+        1000,
+        20_000,
+        processes=1,
+        solver_options={"seed": 0},
+        report=lambda rung, budget, scores: reported.append((rung, budget)),
+    )
+    assert reported == [(0, 1000), (1, 3000), (2, 9000)]
+    assert [len(scores) for _, scores in rungs] == [9, 3, 1]
+    assert rungs[1][1][0].config in [score.config for score in rungs[0][1][:3]]
+    for budget, scores in rungs:
+        assert all(
+            score.run_cooling_rate == score.config.cooling_rate_at(budget)
+            for score in scores
+        )
+    for _, scores in rungs:
+        keys = [score.rank_key() for score in scores]
+        assert keys == sorted(keys)
+        assert all(score.runs == 2 for score in scores)
+
+    path = str(tmp_path / "sweep.csv")
+    write_sweep_csv(path, rungs)
+    with open(path) as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == SWEEP_HEADER
+    assert len(rows) == 1 + 9 + 3 + 1
@@ -0,0 +1,86 @@
+import pytest
+import sys
+import os
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from tempering import ParallelTempering, advance_replica
+from solution import SingleSolution
+import random
+
+
+@pytest.fixture
+def sudoku_puzzle():
+    return [
+        [5, 3, 0, 0, 7, 0, 0, 0, 0],
+        [6, 0, 0, 1, 9, 5, 0, 0, 0],
+        [0, 9, 8, 0, 0, 0, 0, 6, 0],
+        [8, 0, 0, 0, 6, 0, 0, 0, 3],
+        [4, 0, 0, 8, 0, 3, 0, 0, 1],
+        [7, 0, 0, 0, 2, 0, 0, 0, 6],
+        [0, 6, 0, 0, 0, 0, 2, 8, 0],
+        [0, 0, 0, 4, 1, 9, 0, 0, 5],
+        [0, 0, 0, 0, 8, 0, 0, 7, 9],
+    ]
+
+
+def test_ladder(sudoku_puzzle):
+    solver = ParallelTempering(sudoku_puzzle, 0.1, 1.0, replicas=5)
+    assert solver.temperatures[0] == pytest.approx(0.1)
+    assert solver.temperatures[-1] == pytest.approx(1.0)
+    assert solver.temperatures == sorted(solver.temperatures)
+
+
+def test_advance_replica(sudoku_puzzle):
+    state = SingleSolution(sudoku_puzzle, sudoku_puzzle)
+    state.generate_solution()
+    random.seed(1)
+    expected = random.random()
+    random.seed(1)
+    params = (state.table, sudoku_puzzle, 0.5, 200, 0, 3, state.moves)
+    table, best_table, best_fitness, iterations = advance_replica(params)
+    # The replica draws from its own generator: the random module and the shared move table are untouched
+    assert random.random() == expected
+    assert state.moves.generator is None
+    assert advance_replica(params) == (table, best_table, best_fitness, iterations)
+    assert iterations <= 200
+    assert SingleSolution(best_table, sudoku_puzzle).fitness() == best_fitness
+    assert best_fitness <= state.energy
+
+
+def test_run(sudoku_puzzle):
+    solver = ParallelTempering(
+        sudoku_puzzle, 0.2, 2.0, replicas=4, sweep=200, max_rounds=5, seed=0
+    )
+    best_table, best_fitness, additional_info_data = solver.run(0)
+    assert SingleSolution(best_table, sudoku_puzzle).fitness() == best_fitness
+    assert solver.iterations <= 5 * 200
+    assert additional_info_data.as_arrays()[2][-1] == best_fitness
+    assert solver.status == ("solved" if best_fitness == 0 else "budget")
+    # Exchanging replicas only permutes them between temperatures
+    assert len(solver.states) == 4
+
+
+def test_run_is_reproducible(sudoku_puzzle):
+    # The seed alone determines the run, whatever the state of the random module
+    runs = []
+    for module_seed in (1, 2):
+        random.seed(module_seed)
+        solver = ParallelTempering(
+            sudoku_puzzle, 0.2, 2.0, replicas=4, sweep=100, max_rounds=3, seed=0
+        )
+        best_table, best_fitness, _ = solver.run(0)
+        runs.append((best_table, best_fitness, solver.iterations, solver.exchanges))
+    assert runs[0] == runs[1]
+
+
+def test_run_stops_at_the_time_limit(sudoku_puzzle):
+    solver = ParallelTempering(
+        sudoku_puzzle, 0.2, 2.0, replicas=2, sweep=1, time_limit=0, seed=0
+    )
+    _, best_fitness, _ = solver.run(0)
+    assert best_fitness > 0
+    assert solver.status == "budget"
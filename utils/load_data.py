@@ -1,5 +1,17 @@
-import csv
+import argparse
+import math
 import os
+import sys
+import threading
+import numpy as np
+from multiprocessing import Pool
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from puzzle_store import PuzzleStoreWriter, STORE_EXTENSION
 
 # Paths for the input CSV file, quiz, and solutions directories
 file_to_read = "../sudoku.csv"
@@ -9,19 +21,22 @@ solutions_folder = "../solutions"
 # Constructing file paths for the output sudoku quiz and solutions CSV files
 sudoku_file = os.path.join(quiz_folder, "sudoku_quiz.csv")
 solutions_file = os.path.join(solutions_folder, "sudoku_solutions.csv")
+store_file = os.path.join(quiz_folder, "sudoku_quiz" + STORE_EXTENSION)
 
-# Define the size of the Sudoku table
-TABLE_SIZE = 9
+# Value of each character of a puzzle string: "1"-"9" are the digits 1-9 and letters (in either case)
+# continue from 10, so 16x16 and 25x25 puzzles fit one character per cell. Anything else, such as "0" or ".",
+# is an empty cell.
+CELL_VALUES = np.zeros(256, dtype=np.uint8)
+for value, character in enumerate("123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ", start=1):
+    CELL_VALUES[ord(character)] = CELL_VALUES[ord(character.lower())] = value
 
-# Create quiz and solutions folders if they don't already exist
-if not os.path.exists(quiz_folder):
-    os.makedirs(quiz_folder)
-if not os.path.exists(solutions_folder):
-    os.makedirs(solutions_folder)
+BLOCK_SIZE = (
+    1 << 24
+)  # Bytes of input read at a time; about 100k puzzles of a 9x9 dataset.
 
 
 def read_and_process_csv(
-    file_to_read: str, sudoku_file: str, solutions_file: str
+    file_to_read: str, sudoku_file: str, solutions_file: str, store_file: str = None
 ) -> None:
     """
     Reads the input CSV file containing Sudoku puzzles and their solutions,
@@ -31,46 +46,418 @@ def read_and_process_csv(
     file_to_read (str): Path to the input CSV file.
     sudoku_file (str): Path to the output CSV file for Sudoku puzzles.
     solutions_file (str): Path to the output CSV file for Sudoku solutions.
+    store_file (str): Optional path of a binary puzzle store to write in the same pass, with the solutions paired.
+    """
+    convert_dataset(file_to_read, sudoku_file, solutions_file, store_file)
+
+
+def convert_dataset(
+    file_to_read: str,
+    sudoku_file: str,
+    solutions_file: str,
+    store_file: str = None,
+    start: int = 0,
+    stop: int = None,
+    sample: int = None,
+    seed: int = 0,
+    shards: int = 1,
+    processes: int = 1,
+    block_size: int = BLOCK_SIZE,
+) -> int:
+    """
+    Converts a dataset of puzzle and solution strings (one "puzzle,solution" row per puzzle, after a header row)
+    into the formatted CSV files and, optionally, a binary puzzle store.
+
+    The input is read in blocks of block_size bytes, and each block is converted with array operations, so the
+    cost per puzzle is a few bytes of NumPy work rather than a csv.writer call per grid line. The blocks can be
+    converted on several processes; the output is written in input order by this process.
+
+    Args:
+    file_to_read (str): Path to the input CSV file.
+    sudoku_file (str): Path to the output CSV file for Sudoku puzzles.
+    solutions_file (str): Path to the output CSV file for Sudoku solutions.
+    store_file (str): Optional path of a binary puzzle store to write in the same pass, with the solutions paired.
+    start (int): Index of the first puzzle to convert, counting from 0 after the header.
+    stop (int): Index after the last puzzle to convert; defaults to the end of the input.
+    sample (int): If given, only a uniformly random sample of this many puzzles of the range is converted,
+                  kept in input order.
+    seed (int): Seed of the sample.
+    shards (int): Number of files to split the output into, puzzle i going to shard i % shards. With more than one
+                  shard, every output path gets the shard number before its extension, as in sudoku_quiz_0.csv.
+    processes (int): Number of processes converting the blocks.
+    block_size (int): Approximate number of bytes read at a time.
+
+    Returns:
+    int: The number of puzzles converted.
+
+    Raises:
+    ValueError: If the sample is larger than the range, or a row cannot be converted.
+    """
+    if stop is None and sample is not None:
+        stop = count_rows(file_to_read)
+    selected = None
+    if sample is not None:
+        if sample > stop - start:
+            raise ValueError(f"Cannot sample {sample} puzzles out of {stop - start}.")
+        rng = np.random.default_rng(seed)
+        selected = np.sort(rng.choice(stop - start, sample, replace=False)) + start
+
+    outputs = [
+        ShardWriter(
+            shard_path(sudoku_file, shard, shards),
+            shard_path(solutions_file, shard, shards),
+            shard_path(store_file, shard, shards) if store_file else None,
+        )
+        for shard in range(shards)
+    ]
+
+    def tasks(file):
+        # Blocks waiting to be converted or written are bounded, so the input is never loaded whole.
+        for task in read_blocks(file, start, stop, selected, shards, block_size):
+            in_flight.acquire()
+            yield task
+
+    in_flight = threading.BoundedSemaphore(max(2 * processes, 1))
+    converted = 0
+    with open(file_to_read, "rb") as file:
+        header = file.readline().decode().strip()
+        print(f"Column names are {', '.join(header.split(','))}")
+        if processes > 1:
+            with Pool(processes) as pool:
+                for shard_blocks in pool.imap(convert_block, tasks(file)):
+                    in_flight.release()
+                    converted += write_blocks(outputs, shard_blocks)
+        else:
+            for task in tasks(file):
+                in_flight.release()
+                converted += write_blocks(outputs, convert_block(task))
+    for output in outputs:
+        output.close()
+    print(f"Processed {converted} lines.")
+    if store_file:
+        for shard in range(shards):
+            print(f"Puzzle store written to {shard_path(store_file, shard, shards)}.")
+    return converted
+
+
+def count_rows(file_to_read: str) -> int:
     """
-    with open(file_to_read) as csv_file, open(
-        sudoku_file, "w", newline=""
-    ) as sudoku_csv, open(solutions_file, "w", newline="") as solutions_csv:
-        csv_reader = csv.reader(csv_file, delimiter=",")
-        sudoku_writer = csv.writer(sudoku_csv)
-        solutions_writer = csv.writer(solutions_csv)
-        line_count = 0
-        for row in csv_reader:
-            if line_count == 0:
-                print(f'Column names are {", ".join(row)}')
-                line_count += 1
+    Counts the puzzles of an input CSV file, that is its lines after the header, without the blank lines that
+    read_blocks() skips.
+    """
+    with open(file_to_read, "rb") as file:
+        file.readline()
+        return sum(
+            len(lines) for lines, *_ in read_blocks(file, 0, None, None, 1, BLOCK_SIZE)
+        )
+
+
+def read_blocks(file, start, stop, selected, shards, block_size):
+    """
+    Reads the rows of the input in blocks ending on a line boundary, keeping only the selected ones.
+
+    Yields:
+    tuple: The task of convert_block: the lines of the block, the index of its first row, the positions of the
+           selected rows within the block, and the number of shards.
+    """
+    first = 0  # Index of the first row of the next block.
+    rest = b""
+    while True:
+        data = file.read(block_size)
+        block = rest + data
+        if data:
+            cut = block.rfind(b"\n") + 1
+            block, rest = block[:cut], block[cut:]
+        if block.strip():
+            lines = block.splitlines()
+            # Blank lines, such as a trailing one, are not puzzles.
+            lines = [line for line in lines if line.strip()]
+            count = len(lines)
+            rows = np.arange(count)
+            if selected is not None:
+                low, high = np.searchsorted(selected, [first, first + count])
+                rows = selected[low:high] - first
             else:
-                # Process each row for sudoku puzzles and solutions
-                process_row(row[0], sudoku_writer)
-                process_row(row[1], solutions_writer)
-                line_count += 1
-        print(f"Processed {line_count - 1} lines.")
+                low = max(start - first, 0)
+                high = count if stop is None else min(stop - first, count)
+                rows = rows[low:high]
+            if len(rows):
+                yield lines, first, rows, shards
+            first += count
+            if stop is not None and first >= stop:
+                return
+        if not data:
+            return
+
+
+def convert_block(task: tuple) -> list:
+    """
+    Converts the selected rows of a block of input lines.
+
+    Args:
+    task (tuple): The lines of the block, the index of its first row, the positions of the selected rows,
+                  and the number of shards.
+
+    Returns:
+    list: For every shard, a tuple with the puzzle cells and the solution cells (arrays of shape (N, size * size)),
+          and the bytes of the two formatted CSV outputs.
+    """
+    lines, first, rows, shards = task
+    puzzles = []
+    solutions = []
+    for row in rows.tolist():
+        fields = lines[row].split(b",")
+        if len(fields) < 2:
+            raise ValueError(
+                f"Row {first + row} does not have a puzzle and a solution."
+            )
+        puzzles.append(fields[0].strip())
+        solutions.append(fields[1].strip())
+
+    cells = len(puzzles[0])
+    table_size = grid_size(cells)
+    puzzle_bytes = b"".join(puzzles)
+    solution_bytes = b"".join(solutions)
+    if len(puzzle_bytes) != cells * len(rows) or len(solution_bytes) != len(
+        puzzle_bytes
+    ):
+        raise ValueError(
+            f"The rows {first + rows[0]} to {first + rows[-1]} do not all have {cells} cells."
+        )
+    puzzle_cells = CELL_VALUES[np.frombuffer(puzzle_bytes, dtype=np.uint8)].reshape(
+        -1, cells
+    )
+    solution_cells = CELL_VALUES[np.frombuffer(solution_bytes, dtype=np.uint8)].reshape(
+        -1, cells
+    )
+
+    shard_of_row = (first + rows) % shards
+    results = []
+    for shard in range(shards):
+        mine = shard_of_row == shard
+        results.append(
+            (
+                puzzle_cells[mine],
+                solution_cells[mine],
+                format_grids(puzzle_cells[mine], table_size),
+                format_grids(solution_cells[mine], table_size),
+            )
+        )
+    return results
 
 
-def process_row(sudoku_string: str, writer: str) -> None:
+def format_grids(cells: np.ndarray, table_size: int) -> bytes:
+    """
+    Formats grids as written by process_row: one CSV line per grid row and an empty line after each grid,
+    with the "\\r\\n" line terminator of csv.writer.
+
+    Args:
+    cells (np.ndarray): The grids, of shape (N, table_size * table_size).
+    table_size (int): The number of rows of the grids.
+
+    Returns:
+    bytes: The CSV text of the grids.
+    """
+    if table_size > 9:
+        # Values above 9 take two characters, so lines have different lengths; format them one by one.
+        lines = []
+        for grid in cells.reshape(-1, table_size, table_size).tolist():
+            lines.extend(",".join(map(str, row)) for row in grid)
+            lines.append("")
+        return "".join(line + "\r\n" for line in lines).encode("ascii")
+
+    # Every grid row is "d,d,...,d\r\n": the digits at even positions, commas in between.
+    count = len(cells)
+    row_length = 2 * table_size + 1
+    rows = np.empty((count, table_size, row_length), dtype=np.uint8)
+    rows[:, :, 0 : 2 * table_size : 2] = cells.reshape(
+        count, table_size, table_size
+    ) + ord("0")
+    rows[:, :, 1 : 2 * table_size - 1 : 2] = ord(",")
+    rows[:, :, -2] = ord("\r")
+    rows[:, :, -1] = ord("\n")
+    grids = np.empty((count, table_size * row_length + 2), dtype=np.uint8)
+    grids[:, :-2] = rows.reshape(count, table_size * row_length)
+    grids[:, -2] = ord("\r")
+    grids[:, -1] = ord("\n")
+    return grids.tobytes()
+
+
+class ShardWriter:
+    """
+    The output files of one shard: the puzzle and solution CSV files, and optionally a puzzle store.
+    Their directories are created when the shard is opened.
+    """
+
+    def __init__(
+        self, sudoku_file: str, solutions_file: str, store_file: str = None
+    ) -> None:
+        for path in (sudoku_file, solutions_file, store_file):
+            if path:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.sudoku_csv = open(sudoku_file, "wb")
+        self.solutions_csv = open(solutions_file, "wb")
+        self.store_file = store_file
+        self.store_writer = None  # Created with the grid size of the first puzzle.
+
+    def write(self, puzzles, solutions, puzzles_text, solutions_text) -> None:
+        self.sudoku_csv.write(puzzles_text)
+        self.solutions_csv.write(solutions_text)
+        if self.store_file is not None and len(puzzles):
+            if self.store_writer is None:
+                self.store_writer = PuzzleStoreWriter(
+                    self.store_file, True, grid_size(puzzles.shape[1])
+                )
+            self.store_writer.write(puzzles, solutions)
+
+    def close(self) -> None:
+        self.sudoku_csv.close()
+        self.solutions_csv.close()
+        if self.store_file is not None:
+            if self.store_writer is None:
+                self.store_writer = PuzzleStoreWriter(self.store_file, True)
+            self.store_writer.close()
+
+
+def write_blocks(outputs: list, shard_blocks: list) -> int:
+    """
+    Writes the converted block of every shard, and returns the number of puzzles written.
+    """
+    for output, block in zip(outputs, shard_blocks):
+        output.write(*block)
+    return sum(len(block[0]) for block in shard_blocks)
+
+
+def shard_path(path: str, shard: int, shards: int) -> str:
+    """
+    Returns the path of one shard of an output file: the path itself without sharding,
+    otherwise the path with the shard number before its extension.
+    """
+    if shards == 1:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}_{shard}{extension}"
+
+
+def grid_size(cells: int) -> int:
+    """
+    Returns the number of rows of a square grid with the given number of cells.
+
+    Args:
+    cells (int): The number of cells of the grid, such as 81 for a 9x9 puzzle.
+
+    Raises:
+    ValueError: If the cells cannot form a square grid.
+    """
+    size = math.isqrt(cells)
+    if size * size != cells:
+        raise ValueError(f"{cells} cells do not form a square grid.")
+    return size
+
+
+def to_cells(sudoku_string: str) -> np.ndarray:
+    """
+    Converts a string of digits into an array with one byte per cell.
+
+    Args:
+    sudoku_string (str): A string representation of a Sudoku puzzle or solution.
+
+    Returns:
+    np.ndarray: The cell values, in row-major order.
+    """
+    return CELL_VALUES[np.frombuffer(sudoku_string.encode("ascii"), dtype=np.uint8)]
+
+
+def process_row(sudoku_string: str, writer: str, table_size: int = None) -> None:
     """
     Processes a single row of Sudoku string, converting it into a grid format
     and writing it to the specified CSV writer.
 
     Args:
-    sudoku_string (str): A string representation of a Sudoku puzzle or solution.
+    sudoku_string (str): A string representation of a Sudoku puzzle or solution, one character per cell.
     writer (csv.writer): The CSV writer object to write the grid to.
+    table_size (int): The number of rows of the grid, inferred from the length of the string when not given.
     """
+    if table_size is None:
+        table_size = grid_size(len(sudoku_string))
+    values = to_cells(sudoku_string).tolist()
+
     # Split the Sudoku string into a grid format
-    grid = [
-        sudoku_string[i : i + TABLE_SIZE]
-        for i in range(0, len(sudoku_string), TABLE_SIZE)
-    ]
+    grid = [values[i : i + table_size] for i in range(0, len(values), table_size)]
 
     # Write each row of the grid to the CSV file
     for row in grid:
-        writer.writerow(list(row))
+        writer.writerow(row)
     writer.writerow([])  # Add an empty row for separation between puzzles/solutions
 
 
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parses the command line options of the converter.
+    """
+    parser = argparse.ArgumentParser(
+        description="Convert a dataset of puzzle and solution strings into the formats read by the solver."
+    )
+    parser.add_argument("file_to_read", nargs="?", default=file_to_read)
+    parser.add_argument("--sudoku-file", default=sudoku_file)
+    parser.add_argument("--solutions-file", default=solutions_file)
+    parser.add_argument(
+        "--store-file",
+        default=store_file,
+        help="Puzzle store written along the CSV files; pass an empty string to skip it.",
+    )
+    parser.add_argument(
+        "--range",
+        type=int,
+        nargs="+",
+        default=[0],
+        metavar=("START", "STOP"),
+        help="Convert only the puzzles START to STOP - 1, counting from 0; without STOP, up to the end.",
+    )
+    parser.add_argument(
+        "--sample",
+        type=int,
+        help="Convert only a random sample of this many puzzles of the range.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the sample.")
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Split every output into this many files, for parallel consumption.",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="Number of processes converting the blocks of the input.",
+    )
+    parser.add_argument(
+        "--block-size",
+        type=int,
+        default=BLOCK_SIZE >> 20,
+        metavar="MB",
+        help="Size of the blocks read from the input, in megabytes.",
+    )
+    args = parser.parse_args(argv)
+    if len(args.range) > 2:
+        parser.error("--range takes a START and an optional STOP.")
+    args.range = (args.range + [None])[:2]
+    return args
+
+
 if __name__ == "__main__":
-    read_and_process_csv(file_to_read, sudoku_file, solutions_file)
+    args = parse_args()
+    convert_dataset(
+        args.file_to_read,
+        args.sudoku_file,
+        args.solutions_file,
+        args.store_file or None,
+        start=args.range[0],
+        stop=args.range[1],
+        sample=args.sample,
+        seed=args.seed,
+        shards=args.shards,
+        processes=args.processes,
+        block_size=args.block_size << 20,
+    )
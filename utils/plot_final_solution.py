@@ -1,73 +1,198 @@
-import pandas as pd
+import matplotlib
+
+# Render to files only: no display is needed, and worker processes cannot open one.
+matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
+import argparse
 import os
 import numpy as np
+from plot_result_info import describe, open_archive, run_in_pool, sources
 
+# Define the background and text colors
+BACKGROUND_COLOR = "#f5f5f5"  # Soft gray
+TEXT_COLOR = "#000000"  # Black for good contrast
 
-def generate_and_save_matrix_images(file_pattern, output_dir, start_index, end_index):
-    """
-    Generates and saves images of matrices for each CSV file specified by a range of indices.
 
-    Parameters:
-    - file_pattern (str): The pattern of the file path with a placeholder for the index.
-    - output_dir (str): Directory to save the generated images.
-    - start_index (int): Starting index of the files.
-    - end_index (int): Ending index of the files.
+class MatrixFigure:
+    """
+    The figure of the solution images for one grid size. Like the trace plots, it is built once per process
+    (with one text per cell, and the bounding box computed once) and reused for every solution of that size.
     """
-    # Ensure the directory for images exists
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Define the background and text colors
-    background_color = "#f5f5f5"  # Soft gray
-    text_color = "#000000"  # Black for good contrast
-
-    for i in range(start_index, end_index):
-        file_path = file_pattern.format(i)
-        matrix = pd.read_csv(file_path, header=None).values
 
+    def __init__(self, size: int) -> None:
         # Create a figure with specific background color
-        fig, ax = plt.subplots(figsize=(8, 8))
-        fig.patch.set_facecolor(
-            background_color
+        self.fig, ax = plt.subplots(figsize=(8, 8))
+        self.fig.patch.set_facecolor(
+            BACKGROUND_COLOR
         )  # Set the background color for the entire figure
 
         # Set the axes' background color
-        ax.set_facecolor(background_color)
+        ax.set_facecolor(BACKGROUND_COLOR)
 
-        # Annotate the matrix with the numerical values
-        for (j, k), value in np.ndenumerate(matrix):
+        # One text per cell, shrinking the font for grids larger than 9x9
+        fontsize = min(12, 108 / size)
+        self.texts = [
             ax.text(
                 k,
                 j,
-                int(value),
+                "",
                 ha="center",
                 va="center",
-                color=text_color,
-                fontsize=12,
+                color=TEXT_COLOR,
+                fontsize=fontsize,
             )
+            for j in range(size)
+            for k in range(size)
+        ]
 
         # Set the limits and remove the axes
-        ax.set_xlim(-0.5, len(matrix[0]) - 0.5)
-        ax.set_ylim(-0.5, len(matrix) - 0.5)
-        plt.axis("off")
+        ax.set_xlim(-0.5, size - 0.5)
+        ax.set_ylim(-0.5, size - 0.5)
+        ax.axis("off")
 
         # Invert the y-axis to have the origin at the top left corner as in a matrix
         ax.invert_yaxis()
+        self.bbox = None  # Tight bounding box of the image, computed on the first save.
+
+    def save(self, matrix, image_filename: str) -> None:
+        """
+        Annotates the cells with the values of a matrix and saves the image.
+        """
+        for text, value in zip(self.texts, np.ravel(matrix)):
+            text.set_text(str(int(value)))
+        if self.bbox is None:
+            # Equivalent to bbox_inches="tight" with pad_inches=0.1, which would draw the figure twice on every save.
+            renderer = self.fig.canvas.get_renderer()
+            self.bbox = self.fig.get_tightbbox(renderer).padded(0.1)
 
         # Save the matrix as an image ensuring background color is saved
-        image_filename = f"{output_dir}/matrix_image_{i}.png"
-        plt.savefig(
+        self.fig.savefig(
             image_filename,
-            bbox_inches="tight",
-            pad_inches=0.1,
-            facecolor=fig.get_facecolor(),
+            bbox_inches=self.bbox,
+            facecolor=self.fig.get_facecolor(),
         )
-        plt.close(fig)
 
-        print(f"Matrix image saved as {image_filename}")
+
+_matrix_figures = (
+    {}
+)  # The MatrixFigure of each grid size, built by the first image of that size.
+
+
+def read_solution(source) -> np.ndarray:
+    """
+    Reads a solution, from its CSV file or from a run archive.
+
+    Parameters:
+    - source: The path of a solution CSV file, or a (run archive path, process ID) pair.
+
+    Returns:
+    - np.ndarray: The solution, or None if it does not exist.
+    """
+    if isinstance(source, tuple):
+        archive = open_archive(source[0])
+        if source[1] not in archive or archive.result(source[1])["fitness"] < 0:
+            return None
+        return archive.solutions[archive.position(source[1])]
+    if not os.path.exists(source):
+        return None
+    return np.loadtxt(source, delimiter=",", dtype=np.int64, ndmin=2)
+
+
+def save_matrix_image(task: tuple) -> str:
+    """
+    Renders the image of one solution.
+
+    Parameters:
+    - task (tuple): The index of the solution, its source (see read_solution) and the output directory.
+
+    Returns:
+    - str: The path of the image, or None if the solution does not exist.
+    """
+    i, source, output_dir = task
+    matrix = read_solution(source)
+    if matrix is None:
+        return None
+
+    figure = _matrix_figures.get(len(matrix))
+    if figure is None:
+        figure = _matrix_figures[len(matrix)] = MatrixFigure(len(matrix))
+    image_filename = f"{output_dir}/matrix_image_{i}.png"
+    figure.save(matrix, image_filename)
+    return image_filename
+
+
+def generate_and_save_matrix_images(
+    file_pattern, output_dir, start_index, end_index, processes=None, archive_path=None
+):
+    """
+    Generates and saves images of matrices for each CSV file specified by a range of indices,
+    or each run of a run archive. The images are rendered in parallel, and missing solutions are skipped.
+
+    Parameters:
+    - file_pattern (str): The pattern of the file path with a placeholder for the index.
+    - output_dir (str): Directory to save the generated images.
+    - start_index (int): Starting index of the files.
+    - end_index (int): Ending index of the files.
+    - processes (int): Number of worker processes; defaults to the number of CPUs.
+    - archive_path (str): Path of a run archive to read the solutions from, instead of the CSV files.
+
+    Returns:
+    - list: The paths of the images saved.
+    """
+    # Ensure the directory for images exists
+    os.makedirs(output_dir, exist_ok=True)
+
+    tasks = [
+        (i, source, output_dir)
+        for i, source in enumerate(
+            sources(file_pattern, archive_path, start_index, end_index), start_index
+        )
+    ]
+    image_filenames = []
+    for (i, source, _), image_filename in zip(
+        tasks, run_in_pool(save_matrix_image, tasks, processes)
+    ):
+        if image_filename is None:
+            print(f"Skipped {describe(source)}: solution not found")
+        else:
+            print(f"Matrix image saved as {image_filename}")
+            image_filenames.append(image_filename)
+    return image_filenames
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parses the command line options of the image generator.
+    """
+    parser = argparse.ArgumentParser(description="Render the solutions as images.")
+    parser.add_argument(
+        "--pattern",
+        default="../SOLVER/final_solutions/solution_{}.csv",
+        help="Path of the solutions, with {} in place of the index.",
+    )
+    parser.add_argument(
+        "--archive",
+        help="Run archive written by main.py --archive, read instead of the CSV solutions.",
+    )
+    parser.add_argument("--output-dir", default="../matrix_images")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=100, help="Last index, excluded.")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        help="Number of worker processes (default: the number of CPUs).",
+    )
+    return parser.parse_args(argv)
 
 
-# Usage example
-generate_and_save_matrix_images(
-    "../SOLVER/final_solutions/solution_{}.csv", "../matrix_images", 0, 100
-)
+if __name__ == "__main__":
+    args = parse_args()
+    generate_and_save_matrix_images(
+        args.pattern,
+        args.output_dir,
+        args.start,
+        args.end,
+        args.processes,
+        args.archive,
+    )
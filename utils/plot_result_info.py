@@ -1,88 +1,495 @@
+import matplotlib
+
+# Render to files only: no display is needed, and worker processes cannot open one.
+matplotlib.use("Agg")
+
 import pandas as pd
 import matplotlib.pyplot as plt
+import numpy as np
+import argparse
 import os
+import sys
+from multiprocessing import Pool
+
+# Fix import
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "SOLVER"))
+)
+
+from archive import RunArchive
+
+STYLE = {"axes.facecolor": "lightgray", "figure.facecolor": "lightgray"}
+
+DEFAULT_POINTS = 2000  # Points kept per plotted series; more are not visible at the size of the figures.
+
+
+def lttb(x, y, threshold: int) -> np.ndarray:
+    """
+    Downsamples a series with the Largest-Triangle-Three-Buckets algorithm, which keeps its visual shape:
+    the first and last points are kept, the others are split into threshold - 2 buckets, and from each bucket
+    the point forming the largest triangle with the previously kept point and the average of the next bucket is kept.
+
+    Parameters:
+    - x (array): The abscissae of the series, in increasing order.
+    - y (array): The ordinates of the series.
+    - threshold (int): The number of points to keep.
+
+    Returns:
+    - np.ndarray: The sorted indices of the points kept; every index when the series is not longer than threshold.
+    """
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket b holds the points edges[b] to edges[b + 1] - 1; the last point forms a bucket of its own.
+    edges = np.append(
+        np.linspace(1, length - 1, threshold - 1).astype(np.int64), length
+    )
+    sizes = np.diff(edges)
+    average_x = (np.add.reduceat(x, edges[:-1]) / sizes).tolist()
+    average_y = (np.add.reduceat(y, edges[:-1]) / sizes).tolist()
+
+    # Buckets hold a handful of points, where plain floats are faster than NumPy calls.
+    x = x.tolist()
+    y = y.tolist()
+    edges = edges.tolist()
+    indices = [0]
+    kept = 0
+    for bucket in range(threshold - 2):
+        # Twice the area of the triangle (kept, point, next average) is |a * y + b * x + c|.
+        next_x = average_x[bucket + 1]
+        next_y = average_y[bucket + 1]
+        a = x[kept] - next_x
+        b = next_y - y[kept]
+        c = next_x * y[kept] - x[kept] * next_y
+        largest = -1.0
+        for point in range(edges[bucket], edges[bucket + 1]):
+            area = abs(a * y[point] + b * x[point] + c)
+            if area > largest:
+                largest = area
+                kept = point
+        indices.append(kept)
+    indices.append(length - 1)
+    return np.array(indices, dtype=np.int64)
+
+
+def run_in_pool(function, tasks, processes: int = None) -> list:
+    """
+    Applies a function to every task on a process pool, or in this process when a single process is requested.
+
+    Parameters:
+    - function: A picklable function of one argument.
+    - tasks (iterable): The arguments of the calls.
+    - processes (int): The number of worker processes; defaults to the number of CPUs.
+
+    Returns:
+    - list: The results, in the order of the tasks.
+    """
+    tasks = list(tasks)
+    if processes == 1 or len(tasks) <= 1:
+        return [function(task) for task in tasks]
+    with Pool(processes) as pool:
+        return pool.map(function, tasks)
+
+
+class TraceFigure:
+    """
+    The figure of the trace plots. Building and laying out a figure costs more than drawing it, so each process
+    builds one and reuses it for all its plots, only replacing the data and the title.
+    """
+
+    def __init__(self) -> None:
+        with plt.rc_context(STYLE):
+            self.fig, ax1 = plt.subplots(figsize=(10, 6))
+
+            # Plot Best Fitness with a slightly thicker line
+            (self.fitness_line,) = ax1.plot(
+                [], [], label="Best Fitness", color="C1", linewidth=1.5
+            )
+            ax1.set_xlabel("Best Fitness", color="black")
+            ax1.set_ylabel("Iteration", color="black")
+            ax1.tick_params(axis="x", colors="black")
+            ax1.tick_params(axis="y", colors="black")
+
+            # Create a twin Axes sharing the y-axis for Temperature
+            ax2 = ax1.twiny()
+            (self.temperature_line,) = ax2.plot(
+                [],
+                [],
+                label="Temperature",
+                color="C0",
+                linestyle="--",
+                linewidth=1.5,
+            )
+            ax2.set_xlabel("Temperature", color="black")
+            ax2.tick_params(axis="x", colors="black")
+
+            # Set all axis labels and title colors to black
+            ax1.xaxis.label.set_color("black")
+            ax1.yaxis.label.set_color("black")
+            ax2.xaxis.label.set_color("black")
+            ax1.title.set_color("black")
+            ax1.grid(True)
+
+            # Set the legend inside the plot
+            ax1.legend(
+                loc="upper right", frameon=True, facecolor="white", edgecolor="black"
+            )
+            ax2.legend(
+                loc="upper right",
+                frameon=True,
+                facecolor="white",
+                edgecolor="black",
+                bbox_to_anchor=(1, 0.9),
+            )
+        self.axes = (ax1, ax2)
+        self.laid_out = False
+
+    def save(self, title, fitness, temperature, plot_filename) -> None:
+        """
+        Draws one trace and saves it as a PNG file.
+
+        Parameters:
+        - title (str): The title of the plot.
+        - fitness (tuple): The best fitness values and their iterations.
+        - temperature (tuple): The temperatures and their iterations.
+        - plot_filename (str): The path of the PNG file.
+        """
+        self.fitness_line.set_data(*fitness)
+        self.temperature_line.set_data(*temperature)
+        for ax in self.axes:
+            ax.relim()
+            ax.autoscale_view()
+        self.axes[0].set_title(title)
+        if not self.laid_out:
+            # The layout depends on the labels rather than the data, so it is computed on the first plot only.
+            self.fig.tight_layout()
+            self.laid_out = True
+        self.fig.savefig(plot_filename)
+
+
+_trace_figure = None  # The TraceFigure of this process, built by its first plot.
+_archives = {}  # The run archives opened by this process, by path.
+
+
+def open_archive(archive_path: str) -> RunArchive:
+    """
+    Returns the run archive at a path, mapping it on first use; each process maps it once for all its plots.
+    """
+    archive = _archives.get(archive_path)
+    if archive is None:
+        archive = _archives[archive_path] = RunArchive(archive_path)
+    return archive
+
+
+def sources(file_pattern, archive_path, start_index, end_index) -> list:
+    """
+    Lists the traces or solutions of a range of indices, read from files or from a run archive.
+
+    Parameters:
+    - file_pattern (str): The pattern of the file path with a placeholder for the index.
+    - archive_path (str): The path of a run archive to read instead of the files, or None.
+    - start_index (int): Starting index.
+    - end_index (int): Ending index, excluded.
+
+    Returns:
+    - list: A path for each index, or a (run archive path, process ID) pair.
+    """
+    if archive_path is not None:
+        return [(archive_path, i) for i in range(start_index, end_index)]
+    return [file_pattern.format(i) for i in range(start_index, end_index)]
+
+
+def describe(source) -> str:
+    """
+    Names a trace or solution source in the messages.
+    """
+    if isinstance(source, tuple):
+        return f"run {source[1]} of {source[0]}"
+    return source
+
+
+def read_trace(source) -> tuple:
+    """
+    Reads a trace, from its CSV file or from a run archive.
+
+    Parameters:
+    - source: The path of a trace CSV file, or a (run archive path, process ID) pair.
+
+    Returns:
+    - tuple: Three arrays (iterations, temperatures, best fitness), or None if the trace does not exist.
+      The arrays of an archive are views of the mapped file.
+    """
+    if isinstance(source, tuple):
+        archive = open_archive(source[0])
+        if source[1] not in archive:
+            return None
+        trace = archive.trace(source[1])
+        return trace if len(trace[0]) else None
+    if not os.path.exists(source):
+        return None
+    df = pd.read_csv(source)
+    return (
+        df["Iteration"].to_numpy(),
+        df["Temperature"].to_numpy(),
+        df["Best Fitness"].to_numpy(),
+    )
+
 
+def plot_trace(task: tuple) -> str:
+    """
+    Renders the plot of one trace. Each series is downsampled with LTTB before plotting.
+
+    Parameters:
+    - task (tuple): The index of the trace, its source (see read_trace), the output directory and the number
+      of points to keep.
 
-def generate_and_save_plots(file_pattern, output_dir, start_index, end_index):
+    Returns:
+    - str: The path of the plot, or None if the trace does not exist.
+    """
+    global _trace_figure
+    i, source, output_dir, points = task
+    trace = read_trace(source)
+    if trace is None:
+        return None
+    iterations, temperatures, fitness = trace
+    fitness_kept = lttb(iterations, fitness, points)
+    temperature_kept = lttb(iterations, temperatures, points)
+
+    if _trace_figure is None:
+        _trace_figure = TraceFigure()
+    plot_filename = f"{output_dir}/additional_info_plot_{i}.png"
+    _trace_figure.save(
+        f"File {i} - Best Fitness and Temperature over Iterations",
+        (fitness[fitness_kept], iterations[fitness_kept]),
+        (temperatures[temperature_kept], iterations[temperature_kept]),
+        plot_filename,
+    )
+    return plot_filename
+
+
+def generate_and_save_plots(
+    file_pattern,
+    output_dir,
+    start_index,
+    end_index,
+    processes=None,
+    points=DEFAULT_POINTS,
+    archive_path=None,
+):
     """
     Generates and saves plots with a consistent gray background for each CSV file
-    specified by a range of indices
+    specified by a range of indices, or each run of a run archive. The plots are rendered in parallel,
+    and missing traces are skipped.
 
     Parameters:
     - file_pattern (str): The pattern of the file path with a placeholder for the index.
     - output_dir (str): Directory to save the generated plots.
     - start_index (int): Starting index of the files.
     - end_index (int): Ending index of the files.
+    - processes (int): Number of worker processes; defaults to the number of CPUs.
+    - points (int): Number of points kept per series by the LTTB downsampling.
+    - archive_path (str): Path of a run archive to read the traces from, instead of the CSV files.
+
+    Returns:
+    - list: The paths of the plots saved.
     """
     # Ensure the directory for plots exists
     os.makedirs(output_dir, exist_ok=True)
 
-    plt.rcParams["axes.facecolor"] = "lightgray"
-    plt.rcParams["figure.facecolor"] = "lightgray"
+    tasks = [
+        (i, source, output_dir, points)
+        for i, source in enumerate(
+            sources(file_pattern, archive_path, start_index, end_index + 1),
+            start_index,
+        )
+    ]
+    plot_filenames = []
+    for (i, source, _, _), plot_filename in zip(
+        tasks, run_in_pool(plot_trace, tasks, processes)
+    ):
+        if plot_filename is None:
+            print(f"Skipped {describe(source)}: trace not found")
+        else:
+            print(f"Plot saved as {plot_filename}")
+            plot_filenames.append(plot_filename)
+    return plot_filenames
+
+
+def load_improvements(source) -> tuple:
+    """
+    Reads the best fitness of a trace as a step function: the iterations at which it changed, and its new values.
+    The last record is kept too, so that the step function spans the whole run.
+
+    Parameters:
+    - source: The path of the trace CSV file, or a (run archive path, process ID) pair.
+
+    Returns:
+    - tuple: Two arrays (iterations, best fitness), or None if the trace does not exist or is empty.
+    """
+    if isinstance(source, tuple):
+        trace = read_trace(source)
+        if trace is None:
+            return None
+        iterations, _, fitness = trace
+    else:
+        if not os.path.exists(source):
+            return None
+        df = pd.read_csv(source, usecols=["Iteration", "Best Fitness"])
+        if df.empty:
+            return None
+        iterations = df["Iteration"].to_numpy()
+        fitness = df["Best Fitness"].to_numpy()
+    changed = np.flatnonzero(np.diff(fitness, prepend=fitness[0] + 1))
+    if changed[-1] != len(fitness) - 1:
+        changed = np.append(changed, len(fitness) - 1)
+    return iterations[changed], fitness[changed]
+
+
+def fitness_percentiles(traces: list, points: int = 500) -> tuple:
+    """
+    Evaluates the best fitness of every run on a common grid of iterations and computes its percentiles.
+    A run that ended before the last iteration of the grid keeps its final best fitness.
+
+    Parameters:
+    - traces (list): The (iterations, best fitness) step functions of the runs, as returned by load_improvements.
+    - points (int): The number of iterations of the grid.
+
+    Returns:
+    - tuple: The grid of iterations and an array with the 10th, 50th and 90th percentiles of the best fitness on it.
+    """
+    last_iteration = max(iterations[-1] for iterations, _ in traces)
+    grid = np.linspace(0, last_iteration, points)
+    values = np.empty((len(traces), points))
+    for row, (iterations, fitness) in enumerate(traces):
+        steps = np.searchsorted(iterations, grid, side="right") - 1
+        values[row] = fitness[np.maximum(steps, 0)]
+    return grid, np.percentile(values, [10, 50, 90], axis=0)
+
+
+def plot_overview(
+    file_pattern,
+    output_path,
+    start_index,
+    end_index,
+    processes=None,
+    points=500,
+    archive_path=None,
+):
+    """
+    Renders a single plot summarizing every trace of a range: the median best fitness over the iterations,
+    within the band between the 10th and the 90th percentiles across the runs.
 
-    for i in range(start_index, end_index + 1):
-        file_path = file_pattern.format(i)
-        df = pd.read_csv(file_path)
+    Parameters:
+    - file_pattern (str): The pattern of the file path with a placeholder for the index.
+    - output_path (str): Path of the PNG file to save.
+    - start_index (int): Starting index of the files.
+    - end_index (int): Ending index of the files.
+    - processes (int): Number of worker processes reading the traces; defaults to the number of CPUs.
+    - points (int): Number of iterations at which the percentiles are evaluated.
+    - archive_path (str): Path of a run archive to read the traces from, instead of the CSV files.
 
-        fig, ax1 = plt.subplots(figsize=(10, 6))
+    Returns:
+    - str: The path of the plot, or None if no trace was found.
+    """
+    traces = run_in_pool(
+        load_improvements,
+        sources(file_pattern, archive_path, start_index, end_index + 1),
+        processes,
+    )
+    traces = [trace for trace in traces if trace is not None]
+    if not traces:
+        print("No trace found, overview not saved")
+        return None
+    grid, (low, median, high) = fitness_percentiles(traces, points)
+    solved = sum(1 for _, fitness in traces if fitness[-1] == 0)
 
-        # Plot Best Fitness with a slightly thicker line
-        (line1,) = ax1.plot(
-            df["Best Fitness"],
-            df["Iteration"],
-            label="Best Fitness",
+    with plt.rc_context(STYLE):
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.fill_between(
+            grid,
+            low,
+            high,
             color="C1",
-            linewidth=1.5,
-        )
-        ax1.set_xlabel("Best Fitness", color="black")
-        ax1.set_ylabel("Iteration", color="black")
-        ax1.tick_params(axis="x", colors="black")
-        ax1.tick_params(axis="y", colors="black")
-
-        # Create a twin Axes sharing the y-axis for Temperature
-        ax2 = ax1.twiny()
-        (line2,) = ax2.plot(
-            df["Temperature"],
-            df["Iteration"],
-            label="Temperature",
-            color="C0",
-            linestyle="--",
-            linewidth=1.5,
+            alpha=0.3,
+            step="post",
+            label="10th-90th percentile",
         )
-        ax2.set_xlabel("Temperature", color="black")
-        ax2.tick_params(axis="x", colors="black")
-
-        # Set all axis labels and title colors to black
-        ax1.xaxis.label.set_color("black")
-        ax1.yaxis.label.set_color("black")
-        ax2.xaxis.label.set_color("black")
-        ax1.title.set_color("black")
-
-        # Improve layout and title to enhance clarity
-        ax1.set_title(f"File {i} - Best Fitness and Temperature over Iterations")
-        ax1.grid(True)
-        ax1.figure.tight_layout()
-
-        # Set the legend inside the plot
-        ax1.legend(
-            loc="upper right", frameon=True, facecolor="white", edgecolor="black"
-        )
-        ax2.legend(
-            loc="upper right",
-            frameon=True,
-            facecolor="white",
-            edgecolor="black",
-            bbox_to_anchor=(1, 0.9),
+        ax.step(grid, median, where="post", color="C1", linewidth=1.5, label="Median")
+        ax.set_xlabel("Iteration", color="black")
+        ax.set_ylabel("Best Fitness", color="black")
+        ax.set_title(
+            f"Best Fitness over Iterations - {len(traces)} runs, {solved} solved"
         )
+        ax.grid(True)
+        ax.legend(loc="upper right", frameon=True, facecolor="white", edgecolor="black")
+        fig.tight_layout()
 
-        plot_filename = f"{output_dir}/additional_info_plot_{i}.png"
-        plt.savefig(plot_filename)
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        fig.savefig(output_path)
         plt.close(fig)
+    print(f"Overview saved as {output_path}")
+    return output_path
 
-        print(f"Plot saved as {plot_filename}")
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parses the command line options of the plot generator.
+    """
+    parser = argparse.ArgumentParser(
+        description="Plot the traces of the annealing runs."
+    )
+    parser.add_argument(
+        "--pattern",
+        default="../SOLVER/additional_info/additional_info_{}.csv",
+        help="Path of the traces, with {} in place of the index.",
+    )
+    parser.add_argument(
+        "--archive",
+        help="Run archive written by main.py --archive, read instead of the CSV traces.",
+    )
+    parser.add_argument("--output-dir", default="../plots")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=100, help="Last index, included.")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        help="Number of worker processes (default: the number of CPUs).",
+    )
+    parser.add_argument(
+        "--points",
+        type=int,
+        default=DEFAULT_POINTS,
+        help="Points kept per series after downsampling.",
+    )
+    parser.add_argument(
+        "--overview",
+        action="store_true",
+        help="Render a single percentile plot of all the runs instead of one plot per run.",
+    )
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    generate_and_save_plots(
-        "../SOLVER/additional_info/additional_info_{}.csv", "../plots", 0, 100
-    )
+    args = parse_args()
+    if args.overview:
+        plot_overview(
+            args.pattern,
+            os.path.join(args.output_dir, "overview.png"),
+            args.start,
+            args.end,
+            args.processes,
+            archive_path=args.archive,
+        )
+    else:
+        generate_and_save_plots(
+            args.pattern,
+            args.output_dir,
+            args.start,
+            args.end,
+            args.processes,
+            args.points,
+            args.archive,
+        )